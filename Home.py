@@ -25,6 +25,7 @@ Use the sidebar menu to access each section:
 2. 📊 Mbappé - Summary: full statistical analysis for Mbappé.
 3. 📊 Player Comparison: individual analysis for Mbappé, Vinicius, and Rodrygo.
 4. 📊 Global Comparison: comparative table and bar charts across all three players.
+5. 🎚️ Threshold Sweep: sensitivity of the recovery window and the near / pressure radii.
 
 ---
 
@@ -0,0 +1,2 @@
+# counterpress/__init__.py
+# Capa de datos compartida por las páginas de Streamlit y los scripts offline.
@@ -0,0 +1,111 @@
+# aggregates.py
+# Cubo de conteos precalculado en la ingesta: las páginas de resumen leen estos pocos cientos
+# de filas por jugador en vez de reagrupar todos los eventos en cada rerun.
+
+import os
+
+import pandas as pd
+
+from .analysis import apply_types
+from .config import CSV_FOLDER
+
+AGGREGATES_FOLDER = os.path.join(CSV_FOLDER, "aggregates")
+
+DIMENSIONS = [
+    "player_tracked", "third_start", "channel_start", "game_state",
+    "player_near_loss", "player_involved_in_counterpress", "recovered_in_5s",
+]
+
+
+def cube_path(level, folder=AGGREGATES_FOLDER):
+    return os.path.join(folder, f"{level}.parquet")
+
+
+def build_cube(df, by_match=False):
+    """Count losses and sum recovery times over every combination of DIMENSIONS."""
+    dims = DIMENSIONS + ["match_id"] if by_match else DIMENSIONS
+    cube = (
+        df.groupby(dims, observed=True)
+        .agg(count=("recovery_time", "size"),
+             recovery_time_sum=("recovery_time", "sum"),
+             recovery_time_count=("recovery_time", "count"))
+        .reset_index()
+    )
+    return cube
+
+
+def write_cubes(df, folder=AGGREGATES_FOLDER):
+    os.makedirs(folder, exist_ok=True)
+    for level, by_match in (("player", False), ("match", True)):
+        path = cube_path(level, folder)
+        tmp_path = f"{path}.tmp"
+        build_cube(df, by_match).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+
+def load_cube(players=None, matches=None, folder=AGGREGATES_FOLDER):
+    """Per-player cube, or the per-match cube when `matches` is given."""
+    filters = []
+    if players is not None:
+        filters.append(("player_tracked", "in", list(players)))
+    if matches is not None:
+        filters.append(("match_id", "in", [int(m) for m in matches]))
+    level = "player" if matches is None else "match"
+    return apply_types(pd.read_parquet(cube_path(level, folder), filters=filters or None))
+
+
+# === Queries ===
+def _sum(cube, mask=None):
+    return int(cube["count"].sum() if mask is None else cube.loc[mask, "count"].sum())
+
+
+def kpis(cube):
+    return {
+        "total": _sum(cube),
+        "near": _sum(cube, cube["player_near_loss"]),
+        "involved": _sum(cube, cube["player_involved_in_counterpress"]),
+        "recovered": _sum(cube, cube["recovered_in_5s"]),
+    }
+
+
+def role_outcomes(cube):
+    """Counts of involved/near losses split by recovery, as shown in the outcomes table."""
+    involved, near, rec = (cube["player_involved_in_counterpress"], cube["player_near_loss"],
+                           cube["recovered_in_5s"])
+    return {
+        ("involved", True): _sum(cube, involved & rec),
+        ("involved", False): _sum(cube, involved & ~rec),
+        ("near", True): _sum(cube, near & rec),
+        ("near", False): _sum(cube, near & ~rec),
+    }
+
+
+def recovery_rate(cube, involved):
+    sel = cube[cube["player_involved_in_counterpress"] == involved]
+    total = sel["count"].sum()
+    return sel.loc[sel["recovered_in_5s"], "count"].sum() / total if total else float("nan")
+
+
+def avg_recovery_time(cube, involved):
+    sel = cube[(cube["player_involved_in_counterpress"] == involved) & cube["recovered_in_5s"]]
+    n = sel["recovery_time_count"].sum()
+    return sel["recovery_time_sum"].sum() / n if n else float("nan")
+
+
+def breakdown(cube, dimension, near_only=True):
+    """Recovered / Not Recovered counts by (dimension, involvement), like the pages' tables."""
+    if near_only:
+        cube = cube[cube["player_near_loss"]]
+    return (
+        cube.groupby([dimension, "player_involved_in_counterpress", "recovered_in_5s"], observed=True)["count"]
+        .sum()
+        .unstack(fill_value=0)
+        .reindex(columns=[False, True], fill_value=0)
+        .rename(columns={True: "Recovered", False: "Not Recovered"})
+    )
+
+
+def relabel(table, dimension_labels, involved_labels, names):
+    table = table.rename(index=dimension_labels, level=0).rename(index=involved_labels, level=1).sort_index()
+    table.index.names = names
+    return table
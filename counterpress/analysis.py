@@ -0,0 +1,106 @@
+# analysis.py
+# Acceso a la tabla de análisis: CSV (csv/counterpress_analysis_all.csv) y parquet particionado
+# por player_tracked (csv/analysis/), que es el que leen las páginas. Dentro de cada jugador las
+# filas van ordenadas por match_id en row groups pequeños: el filtro por partido se resuelve con
+# las estadísticas de cada row group en vez de con un fichero por partido.
+
+import os
+import shutil
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from .config import CSV_FOLDER, CSV_PATH
+
+TABLE_FOLDER = os.path.join(CSV_FOLDER, "analysis")
+
+THIRDS = ["defensive_third", "middle_third", "attacking_third"]
+CHANNELS = ["wide_left", "half_space_left", "center", "half_space_right", "wide_right"]
+GAME_STATES = ["losing", "drawing", "winning"]
+
+CATEGORIES = {"third_start": THIRDS, "channel_start": CHANNELS, "game_state": GAME_STATES}
+BOOL_COLUMNS = ["player_near_loss", "player_involved_in_counterpress", "recovered_in_5s"]
+
+PARTITIONING = ds.partitioning(pa.schema([("player_tracked", pa.string())]), flavor="hive")
+ROW_GROUP_ROWS = 1024
+READ_ATTEMPTS = 10
+
+
+def table_version(path=CSV_PATH):
+    # Clave para los st.cache_data de las páginas: cambia cada vez que se reescribe la tabla
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def read_analysis(path=CSV_PATH):
+    return apply_types(pd.read_csv(path))
+
+
+def apply_types(df):
+    df = df.copy()
+    for col in BOOL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(bool)
+    for col, categories in CATEGORIES.items():
+        if col in df.columns:
+            df[col] = pd.Categorical(df[col], categories=categories)
+    if "player_tracked" in df.columns:
+        df["player_tracked"] = df["player_tracked"].astype("category")
+    return df
+
+
+def write_table(df, folder=TABLE_FOLDER):
+    """Write the analysis table as hive-partitioned parquet, replacing the previous one.
+
+    The swap is two renames, so for a moment there is no table; readers go through
+    _read_table, which retries on FileNotFoundError.
+    """
+    df = apply_types(df).sort_values(["match_id", "frame_loss"], kind="stable")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_folder = f"{folder}.tmp"
+    old_folder = f"{folder}.old"
+    shutil.rmtree(tmp_folder, ignore_errors=True)
+    ds.write_dataset(table, tmp_folder, format="parquet", partitioning=PARTITIONING,
+                     min_rows_per_group=ROW_GROUP_ROWS, max_rows_per_group=ROW_GROUP_ROWS,
+                     existing_data_behavior="overwrite_or_ignore")
+    shutil.rmtree(old_folder, ignore_errors=True)
+    if os.path.exists(folder):
+        os.rename(folder, old_folder)
+    os.rename(tmp_folder, folder)
+    shutil.rmtree(old_folder, ignore_errors=True)
+
+
+def _dataset(folder):
+    return ds.dataset(folder, format="parquet", partitioning=PARTITIONING)
+
+
+def _read_table(read, folder):
+    # Si write_table está cambiando la tabla (carpeta movida a .old o aún sin renombrar la nueva)
+    # se vuelve a abrir el dataset entero
+    for _ in range(READ_ATTEMPTS - 1):
+        try:
+            return read(_dataset(folder))
+        except FileNotFoundError:
+            time.sleep(0.05)
+    return read(_dataset(folder))
+
+
+def load_analysis(players=None, matches=None, columns=None, folder=TABLE_FOLDER):
+    """Load the analysis table, pushing player/match filters and the column list to the reader."""
+    expr = None
+    if players is not None:
+        expr = ds.field("player_tracked").isin(list(players))
+    if matches is not None:
+        match_expr = ds.field("match_id").isin([int(m) for m in matches])
+        expr = match_expr if expr is None else expr & match_expr
+    table = _read_table(lambda dataset: dataset.to_table(columns=columns, filter=expr), folder)
+    return apply_types(table.to_pandas())
+
+
+def list_players(folder=TABLE_FOLDER):
+    fragments = _read_table(lambda dataset: list(dataset.get_fragments()), folder)
+    return sorted({ds.get_partition_keys(f.partition_expression)["player_tracked"] for f in fragments})
@@ -0,0 +1,263 @@
+# animation.py
+# Exportación de secuencias a GIF/MP4: el campo se dibuja una sola vez por renderer (se guarda
+# como fondo) y en cada frame solo se repintan encima los artistas que se mueven (blitting). Los
+# frames se reparten en un bloque por proceso y el resultado queda cacheado en output/ por
+# (match_id, frame_loss, padding, jugador).
+
+import math
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from unidecode import unidecode
+
+from .config import BASE_DIR
+
+OUTPUT_FOLDER = os.path.join(BASE_DIR, "output")
+FRAME_DURATION_MS = 150
+
+
+class FrameRenderer:
+    """A pitch drawn once whose artists are updated in place and blitted over it for every frame."""
+
+    def __init__(self, pitch_length, pitch_width, highlight_id=None, highlight_label=None, figsize=(8, 6)):
+        from mplsoccer import Pitch
+
+        self.highlight_id = highlight_id
+        pitch = Pitch(pitch_type='skillcorner', pitch_length=pitch_length, pitch_width=pitch_width,
+                      pitch_color='white', line_color='black')
+        self.fig, self.ax = pitch.draw(figsize=figsize)
+        empty = np.empty((0, 2))
+        self.players = self.ax.scatter(empty[:, 0], empty[:, 1], s=150, edgecolors="black", zorder=5)
+        self.ball = self.ax.scatter(empty[:, 0], empty[:, 1], color="black", s=60, zorder=6)
+        self.highlight = self.ax.scatter(empty[:, 0], empty[:, 1], s=200, facecolors='none',
+                                         edgecolors='blue', linewidths=2, label=highlight_label, zorder=7)
+        if highlight_label:
+            self.ax.legend(loc="upper center", bbox_to_anchor=(0.5, -0.05), ncol=3)
+        self.title = self.ax.set_title("Frame 0", fontsize=12)
+        self.numbers = []
+        self.moving = [self.players, self.ball, self.highlight, self.title]
+
+        # El layout engine se calcula una sola vez, con el título incluido, y se apaga: si no, se
+        # recalcula en cada draw. Después un draw sin los artistas móviles deja el fondo (campo,
+        # leyenda y ejes) que cada frame restaura
+        # (con aspecto fijo, tight_layout parte de las posiciones actuales: se repite hasta que converge)
+        for _ in range(6):
+            position = self.ax.get_position().bounds
+            self.fig.canvas.draw()
+            if np.allclose(position, self.ax.get_position().bounds, atol=1e-3):
+                break
+        self.fig.set_layout_engine("none")
+        for artist in self.moving:
+            artist.set_animated(True)
+        self.fig.canvas.draw()
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+
+    def _number(self, i):
+        while len(self.numbers) <= i:
+            self.numbers.append(self.ax.text(0, 0, "", fontsize=8, weight="bold",
+                                             ha="center", va="center", zorder=6, animated=True))
+        return self.numbers[i]
+
+    def render(self, frame, player_ids, xy, is_ball, colors, labels, number_colors):
+        """Draw one frame from its row arrays and return it as an RGB array."""
+        players = ~is_ball
+        players_xy = xy[players]
+        ids = player_ids[players]
+
+        self.ball.set_offsets(xy[is_ball])
+        self.players.set_offsets(players_xy)
+        self.players.set_facecolor(colors[players])
+        self.highlight.set_offsets(players_xy[ids == self.highlight_id])
+        for i, ((x, y), label, number_color) in enumerate(
+                zip(players_xy, labels[players], number_colors[players])):
+            text = self._number(i)
+            text.set_position((x, y))
+            text.set_text(label)
+            text.set_color(number_color)
+            text.set_visible(True)
+        for text in self.numbers[len(ids):]:
+            text.set_visible(False)
+        self.title.set_text(f"Frame {frame}")
+
+        canvas = self.fig.canvas
+        canvas.restore_region(self.background)
+        for artist in self.moving + self.numbers[:len(ids)]:
+            self.ax.draw_artist(artist)
+        canvas.blit(self.fig.bbox)
+        return np.asarray(canvas.buffer_rgba())[..., :3].copy()
+
+    def close(self):
+        import matplotlib.pyplot as plt
+        plt.close(self.fig)
+
+
+# === Workers ===
+# Cada proceso conserva sus renderers entre bloques y entre exportaciones
+_renderers = {}
+
+
+def _get_renderer(setup):
+    renderer = _renderers.get(setup["key"])
+    if renderer is None:
+        if len(_renderers) >= 4:
+            _renderers.pop(next(iter(_renderers))).close()
+        renderer = FrameRenderer(setup["pitch_length"], setup["pitch_width"],
+                                 setup["highlight_id"], setup["highlight_label"])
+        _renderers[setup["key"]] = renderer
+    return renderer
+
+
+def _render_chunk(setup, chunk):
+    renderer = _get_renderer(setup)
+    return [renderer.render(*frame) for frame in chunk]
+
+
+def split_frames(df_window):
+    """Per-frame row arrays (frame, player_ids, xy, is_ball, colors, labels, number_colors).
+
+    `df_window` comes from FreezeStore, already enriched with the roster columns.
+    """
+    df_window = df_window.sort_values("frame", kind="stable")
+    frames = df_window["frame"].to_numpy()
+    if not len(frames):
+        return []
+    bounds = np.flatnonzero(np.diff(frames)) + 1
+    numbers = df_window["jersey_number"].to_numpy(float)
+    labels = np.where(np.isnan(numbers), "", np.nan_to_num(numbers).astype(int).astype(str))
+    columns = [
+        df_window["player_id"].to_numpy(),
+        df_window[["x", "y"]].to_numpy(float),
+        df_window["is_ball"].to_numpy(bool),
+        df_window["jersey_color"].astype(object).fillna("grey").to_numpy(),
+        labels,
+        df_window["number_color"].astype(object).fillna("black").to_numpy(),
+    ]
+    starts = np.concatenate([[0], bounds])
+    split = [np.split(col, bounds) for col in columns]
+    return [(int(frames[s]), *parts) for s, *parts in zip(starts, *split)]
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    # Se crea desde hilos de la cola de trabajos dentro del servidor: un lock para que dos
+    # exportaciones a la vez no creen dos pools, y "spawn" porque hacer fork de un proceso con
+    # hilos puede dejar el hijo bloqueado en un lock que nadie va a soltar
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def render_frames(frames, setup, workers=None):
+    """Yield rendered frames in order; chunks are rendered in parallel when workers > 1."""
+    workers = workers or min(4, os.cpu_count() or 1)
+    # Las ventanas guardadas tienen pocas decenas de frames: un bloque por proceso
+    size = max(1, math.ceil(len(frames) / workers))
+    chunks = [frames[i:i + size] for i in range(0, len(frames), size)]
+    if workers == 1 or len(chunks) == 1:
+        for chunk in chunks:
+            yield from _render_chunk(setup, chunk)
+        return
+    pool = _get_pool(workers)
+    futures = [pool.submit(_render_chunk, setup, chunk) for chunk in chunks]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        # Si se corta el consumo (p. ej. trabajo cancelado) no seguimos renderizando
+        for future in futures:
+            future.cancel()
+
+
+def _with_progress(images, total, progress):
+    for i, image in enumerate(images, start=1):
+        yield image
+        progress(i, total)
+
+
+# === Export ===
+def player_slug(player):
+    return unidecode(player.lower().replace(" ", "_"))
+
+
+def animation_path(player, match_id, frame_loss, padding, fmt="gif", folder=OUTPUT_FOLDER):
+    return os.path.join(folder, f"{player_slug(player)}_sequence_{match_id}_f{frame_loss}_p{padding}.{fmt}")
+
+
+def _write_gif(images, path):
+    from PIL import Image
+
+    # Una paleta (la del primer frame) para todo el clip: el campo y las camisetas no cambian y
+    # cuantizar cada frame por separado era lo más caro de la exportación
+    images = iter(images)
+    first = Image.fromarray(next(images)).quantize(colors=64, method=Image.Quantize.FASTOCTREE,
+                                                   dither=Image.Dither.NONE)
+    rest = (Image.fromarray(a).quantize(palette=first, dither=Image.Dither.NONE) for a in images)
+    first.save(path, save_all=True, append_images=rest, duration=FRAME_DURATION_MS, loop=0, optimize=False)
+
+
+def _write_mp4(images, path):
+    try:
+        import imageio.v2 as imageio
+    except ImportError:
+        raise RuntimeError("MP4 export needs imageio with ffmpeg: pip install imageio[ffmpeg]")
+    with imageio.get_writer(path, fps=1000 / FRAME_DURATION_MS, macro_block_size=1) as writer:
+        for image in images:
+            writer.append_data(image)
+
+
+def export_animation(df_window, match_id, frame_loss, padding, player, player_id,
+                     pitch_length, pitch_width, fmt="gif", source_mtime=None, workers=None,
+                     folder=OUTPUT_FOLDER, progress=None):
+    """Render a loss window to GIF/MP4 and return its path; reuses the file if already exported.
+
+    `source_mtime` (FreezeStore.source_mtime: freeze file and meta json) invalidates exports
+    older than their data.
+    `progress(done, total)` is called after each frame and may raise to abort the export.
+    """
+    path = animation_path(player, match_id, frame_loss, padding, fmt, folder)
+    if os.path.exists(path) and (source_mtime is None or os.path.getmtime(path) > source_mtime):
+        return path
+
+    frames = split_frames(df_window)
+    if not frames:
+        raise ValueError(f"No frames around {frame_loss} for match {match_id}")
+    setup = {
+        "key": (match_id, player_id, pitch_length, pitch_width),
+        "pitch_length": pitch_length,
+        "pitch_width": pitch_width,
+        "highlight_id": player_id,
+        "highlight_label": player,
+    }
+    os.makedirs(folder, exist_ok=True)
+    # Nombre propio por exportación: dos trabajos del mismo clip no se pisan el temporal
+    tmp_path = f"{os.path.splitext(path)[0]}.tmp.{os.getpid()}.{uuid.uuid4().hex}.{fmt}"
+    images = render_frames(frames, setup, workers)
+    if progress is not None:
+        images = _with_progress(images, len(frames), progress)
+    try:
+        if fmt == "gif":
+            _write_gif(images, tmp_path)
+        elif fmt == "mp4":
+            _write_mp4(images, tmp_path)
+        else:
+            raise ValueError(f"Unsupported format: {fmt}")
+    except BaseException:
+        images.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,24 @@
+# app.py
+# Núcleo compartido de las páginas: librerías de gráficos a demanda, gráficos servidos desde la
+# caché de renders y dimensiones del campo desde el índice de metadatos.
+#
+# matplotlib + mplsoccer (que arrastra seaborn y scipy) suman ~1.5 s de import en frío, así que
+# las páginas piden pyplot() / seaborn() / skillcorner_pitch() (en charts.py) recién al dibujar:
+# los KPIs y las tablas salen antes y las páginas sin campo no pagan mplsoccer.
+
+import streamlit as st
+
+from .charts import pyplot, seaborn, skillcorner_pitch  # noqa: F401 (las páginas las importan desde aquí)
+from .config import META_FOLDER
+from .figures import cached_figure
+from .meta import get_meta_index
+
+
+def season_pitch_dims(meta_folder=META_FOLDER):
+    """Pitch dimensions for season-wide maps: the most common ones across matches."""
+    return get_meta_index(meta_folder).default_pitch_dims()
+
+
+def show_figure(key, version, render):
+    """Show a chart from the figure cache; `render()` builds the matplotlib figure on a miss."""
+    st.image(cached_figure(key, version, render), width="stretch")
@@ -0,0 +1,314 @@
+# bench.py
+# Benchmarks de los caminos calientes: carga de la tabla, freeze frames por partido, extracción y
+# render de un frame del visor, exportación del GIF de una pérdida (±100 frames: los ~20-40 frames
+# guardados en esa ventana; `ops` es ese número), consultas de resumen, cubos de agregados y la
+# comparación entre jugadores. Corre sobre freeze/ y meta/ del repo, o sobre una temporada
+# sintética N veces más grande (--synthetic N) para ver cómo escala la capa de datos.
+#
+#   python -m counterpress.bench [csv_load frame_render ...] [--synthetic 10] [--out run.json]
+#   python -m counterpress.bench --compare run.json        # compara contra una corrida anterior
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from .aggregates import AGGREGATES_FOLDER, build_cube
+from .analysis import TABLE_FOLDER, list_players, load_analysis, read_analysis
+from .cache import MatchCache
+from .config import CSV_PATH, FREEZE_FOLDER, META_FOLDER, NAME_TO_ID
+from .dataset import DIMENSION_LABELS, CounterpressDataset
+from .freeze import FreezeStore, freeze_path, read_frames
+from .kinematics import Kinematics
+from .meta import get_meta_index
+from .metrics import comparison_metrics
+from .trajectories import TRAJECTORY_COLUMNS, Trajectories
+
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.10
+GIF_PADDING = 100  # ±100 frames, el valor por defecto del visor (freeze/ solo guarda algunos)
+SYNTHETIC_MATCH_OFFSET = 10 ** 8
+
+
+class BenchData:
+    """Where the benchmarks read from, and which loss they use for the per-match paths."""
+
+    def __init__(self, csv_path=CSV_PATH, table_folder=TABLE_FOLDER, aggregates_folder=AGGREGATES_FOLDER,
+                 freeze_folder=FREEZE_FOLDER, meta_folder=META_FOLDER, match_id=None, frame_loss=None,
+                 player=None, source="bundled"):
+        self.csv_path = csv_path
+        self.table_folder = table_folder
+        self.aggregates_folder = aggregates_folder
+        self.freeze_folder = freeze_folder
+        self.meta_folder = meta_folder
+        self.source = source
+        if match_id is None or frame_loss is None or player is None:
+            # Primera pérdida con freeze frames y metadatos disponibles
+            losses = load_analysis(columns=["player_tracked", "match_id", "frame_loss"], folder=table_folder)
+            meta_index = get_meta_index(meta_folder)
+            for row in losses.itertuples():
+                if row.match_id in meta_index and os.path.exists(freeze_path(row.match_id, freeze_folder)):
+                    match_id, frame_loss, player = int(row.match_id), int(row.frame_loss), row.player_tracked
+                    break
+        self.match_id = match_id
+        self.frame_loss = frame_loss
+        self.player = player
+
+    def describe(self):
+        table = load_analysis(columns=["match_id"], folder=self.table_folder)
+        return {"source": self.source, "freeze_file": os.path.basename(freeze_path(self.match_id, self.freeze_folder)),
+                "rows": len(table), "matches": int(table["match_id"].nunique()),
+                "match_id": self.match_id, "frame_loss": self.frame_loss, "player": self.player}
+
+
+def synthetic_season(factor, folder, seed=0, csv_path=CSV_PATH, freeze_folder=FREEZE_FOLDER):
+    """BenchData over the bundled table replicated `factor` times (new match ids, jittered loss spots).
+
+    The per-match benchmarks keep using the bundled freeze frames: a match costs the same however
+    long the season is.
+    """
+    from .pipeline import sort_analysis, write_analysis
+
+    rng = np.random.default_rng(seed)
+    base = pd.read_csv(csv_path)
+    copies = []
+    for k in range(factor):
+        copy = base.copy()
+        if k:
+            copy["match_id"] = copy["match_id"] + k * SYNTHETIC_MATCH_OFFSET
+            copy["x_loss"] = copy["x_loss"] + rng.normal(0, 1, len(copy))
+            copy["y_loss"] = copy["y_loss"] + rng.normal(0, 1, len(copy))
+        copies.append(copy)
+    out_path = os.path.join(folder, os.path.basename(csv_path))
+    write_analysis(sort_analysis(pd.concat(copies, ignore_index=True)), out_path)
+    return BenchData(out_path, os.path.join(folder, os.path.basename(TABLE_FOLDER)),
+                     os.path.join(folder, os.path.basename(AGGREGATES_FOLDER)), freeze_folder,
+                     source=f"synthetic x{factor}")
+
+
+# === Benchmarks ===
+# Cada uno prepara lo necesario fuera del cronómetro y devuelve (función a medir, operaciones por llamada)
+def bench_csv_load(data):
+    return lambda: read_analysis(data.csv_path), 1
+
+
+def bench_table_load(data):
+    return lambda: load_analysis(folder=data.table_folder), 1
+
+
+def bench_freeze_load(data):
+    # Caché nueva en cada llamada y sin caché compartida: mide lectura del parquet + enriquecido
+    return lambda: FreezeStore(data.freeze_folder, MatchCache(), data.meta_folder,
+                               shared_folder=None).load(data.match_id), 1
+
+
+def bench_freeze_shared(data):
+    # Lo que paga un worker cuyo partido ya publicó otro proceso: abrir los .npy con mmap
+    shared_folder = os.path.join(tempfile.gettempdir(), "counterpress-bench-frames")
+    FreezeStore(data.freeze_folder, MatchCache(), data.meta_folder, shared_folder).load(data.match_id)
+    return lambda: FreezeStore(data.freeze_folder, MatchCache(), data.meta_folder,
+                               shared_folder).load(data.match_id), 1
+
+
+def bench_kinematics(data):
+    # Todo el partido: velocidades, aceleraciones, distancias y velocidad de cierre de cada slot
+    df = read_frames(freeze_path(data.match_id, data.freeze_folder), columns=TRAJECTORY_COLUMNS)
+    trajectories = Trajectories.from_frames(data.match_id, df)
+    return lambda: Kinematics.from_trajectories(trajectories), 1
+
+
+def bench_frame_extract(data, n=200, seed=0):
+    match_frames = FreezeStore(data.freeze_folder, MatchCache(), data.meta_folder).load(data.match_id)
+    frames = np.random.default_rng(seed).choice(match_frames.frames, n)
+
+    def run():
+        for frame in frames:
+            match_frames.get_frame(frame)
+    return run, n
+
+
+def bench_frame_render(data):
+    from .charts import freeze_frame_chart
+    from .figures import figure_bytes
+
+    store = FreezeStore(data.freeze_folder, MatchCache(), data.meta_folder)
+    df_frame = store.get_frame(data.match_id, data.frame_loss)
+    pitch_length, pitch_width = get_meta_index(data.meta_folder).pitch_dims(data.match_id)
+    # Igual que el visor: figura nueva por frame y PNG como lo hace st.pyplot
+    return lambda: figure_bytes(freeze_frame_chart(
+        df_frame, pitch_length, pitch_width, NAME_TO_ID.get(data.player), data.player,
+        f"Freeze Frame {data.frame_loss} (Match ID: {data.match_id})")), 1
+
+
+def bench_gif_export(data):
+    from .animation import export_animation
+
+    store = FreezeStore(data.freeze_folder, MatchCache(), data.meta_folder)
+    window = store.get_window(data.match_id, data.frame_loss - GIF_PADDING, data.frame_loss + GIF_PADDING)
+    pitch_length, pitch_width = get_meta_index(data.meta_folder).pitch_dims(data.match_id)
+
+    def run():
+        # Carpeta nueva cada vez para no reutilizar el GIF ya exportado
+        folder = tempfile.mkdtemp(prefix="counterpress-bench-")
+        try:
+            export_animation(window, data.match_id, data.frame_loss, GIF_PADDING, data.player,
+                             NAME_TO_ID.get(data.player), pitch_length, pitch_width, folder=folder)
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+    return run, window["frame"].nunique()
+
+
+def bench_summary_queries(data):
+    players = list_players(data.table_folder)
+
+    def run():
+        # Dataset nuevo: sin memoria, lo que paga la primera sesión tras una ingesta
+        dataset = CounterpressDataset(data.csv_path, data.table_folder, data.aggregates_folder)
+        for player in players:
+            filters = [player]
+            dataset.kpis(filters)
+            dataset.role_outcomes(filters)
+            for involved in (True, False):
+                dataset.recovery_rate(involved, filters)
+                dataset.recovery_time(involved, filters)
+            for dimension in DIMENSION_LABELS:
+                dataset.rate_by(dimension, filters)
+    return run, len(players)
+
+
+def bench_aggregate_cubes(data):
+    table = read_analysis(data.csv_path)
+    return lambda: (build_cube(table), build_cube(table, by_match=True)), 2
+
+
+def bench_comparison(data):
+    table = read_analysis(data.csv_path)
+    return lambda: comparison_metrics(table, "player_tracked"), 1
+
+
+# nombre: (preparación, repeticiones por defecto)
+BENCHMARKS = {
+    "csv_load": (bench_csv_load, DEFAULT_REPEAT),
+    "table_load": (bench_table_load, DEFAULT_REPEAT),
+    "freeze_load": (bench_freeze_load, DEFAULT_REPEAT),
+    "freeze_shared": (bench_freeze_shared, DEFAULT_REPEAT),
+    "kinematics": (bench_kinematics, DEFAULT_REPEAT),
+    "frame_extract": (bench_frame_extract, DEFAULT_REPEAT),
+    "frame_render": (bench_frame_render, DEFAULT_REPEAT),
+    "gif_export": (bench_gif_export, 3),
+    "summary_queries": (bench_summary_queries, DEFAULT_REPEAT),
+    "aggregate_cubes": (bench_aggregate_cubes, DEFAULT_REPEAT),
+    "comparison": (bench_comparison, DEFAULT_REPEAT),
+}
+
+
+def measure(fn, repeat, ops=1, warmup=1):
+    """Wall-clock stats of `repeat` calls to fn after `warmup` untimed ones."""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    median = statistics.median(times)
+    return {"repeat": repeat, "ops": ops, "min_s": min(times), "median_s": median,
+            "mean_s": statistics.fmean(times), "max_s": max(times), "per_op_s": median / ops}
+
+
+def run_benchmarks(data, names=None, repeat=None):
+    results = {}
+    for name in names or BENCHMARKS:
+        setup, default_repeat = BENCHMARKS[name]
+        fn, ops = setup(data)
+        results[name] = measure(fn, repeat or default_repeat, ops)
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "data": data.describe(),
+        "results": results,
+    }
+
+
+def compare(run, baseline, threshold=DEFAULT_THRESHOLD):
+    """Per benchmark: median ratio against the baseline and slower / faster / same."""
+    rows = {}
+    for name, result in run["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        ratio = result["median_s"] / before["median_s"] if before["median_s"] else float("inf")
+        status = "slower" if ratio > 1 + threshold else "faster" if ratio < 1 - threshold else "same"
+        rows[name] = {"baseline_s": before["median_s"], "median_s": result["median_s"],
+                      "ratio": ratio, "status": status}
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the data loading, aggregation and rendering hot paths.")
+    parser.add_argument("names", nargs="*", metavar="name", help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--repeat", type=int, default=None, help="timed runs per benchmark")
+    parser.add_argument("--synthetic", type=int, default=None, metavar="N",
+                        help="run the table benchmarks on a season N times the bundled one")
+    parser.add_argument("--freeze", default=FREEZE_FOLDER, help="freeze frames folder (parquet or compact .cfz)")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative change in the median counted as slower/faster")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="exit with status 1 if a benchmark got slower than the baseline")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+    unknown = [n for n in args.names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    tmp_folder = None
+    try:
+        if args.synthetic:
+            tmp_folder = tempfile.mkdtemp(prefix="counterpress-season-")
+            data = synthetic_season(args.synthetic, tmp_folder, freeze_folder=args.freeze)
+        else:
+            data = BenchData(freeze_folder=args.freeze)
+        run = run_benchmarks(data, args.names, args.repeat)
+    finally:
+        if tmp_folder:
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            run["comparison"] = compare(run, json.load(f), args.threshold)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=1)
+
+    if args.json:
+        print(json.dumps(run, indent=2))
+    else:
+        d = run["data"]
+        print(f"{d['source']}: {d['rows']} rows, {d['matches']} matches · match {d['match_id']} f{d['frame_loss']}")
+        comparison = run.get("comparison", {})
+        print(f"{'benchmark':<17} {'median':>9} {'min':>9} {'ops':>5} {'per op':>10}  {'vs baseline':>12}")
+        for name, r in run["results"].items():
+            c = comparison.get(name)
+            change = f"{(c['ratio'] - 1):+.0%} {c['status']}" if c else ""
+            print(f"{name:<17} {r['median_s'] * 1000:>7.1f}ms {r['min_s'] * 1000:>7.1f}ms {r['ops']:>5} "
+                  f"{r['per_op_s'] * 1000:>8.2f}ms  {change:>12}")
+
+    if args.fail_on_regression and any(c["status"] == "slower" for c in run.get("comparison", {}).values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# cache.py
+# Caché LRU compartida por todas las sesiones del proceso, con tope de memoria
+
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_MB = int(os.environ.get("COUNTERPRESS_CACHE_MB", "512"))
+
+
+class MatchCache:
+    """Process-wide LRU cache of decoded per-match tables, bounded in bytes.
+
+    Keys are (match_id, kind, version) tuples: storing a new version of a (match_id, kind)
+    drops the older ones, and invalidate(match_id) drops every kind of a match. `sizeof`
+    returns the footprint of a value in bytes.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_MB * 1024 * 1024, sizeof=None):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or _nbytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        nbytes = self.sizeof(value)
+        with self._lock:
+            self._discard(key)
+            for old in [k for k in self._entries if k[:2] == key[:2]]:
+                self._discard(old)
+            if nbytes > self.max_bytes:
+                return value
+            self._entries[key] = (value, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                _, (_, size) = self._entries.popitem(last=False)
+                self.current_bytes -= size
+                self.evictions += 1
+        return value
+
+    def get_or_load(self, key, loader):
+        value = self.get(key)
+        if value is not None:
+            return value
+        # Un solo decode por clave aunque varias sesiones pidan el mismo partido a la vez
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None:
+                return entry[0]
+            try:
+                return self.put(key, loader())
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+    def invalidate(self, match_id):
+        """Drop every entry (all kinds and versions) of a match."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == match_id]:
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            # Los locks de cargas en curso también: sus claves pueden no volver a pedirse nunca
+            self._loading.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[1]
+
+
+def _nbytes(value):
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if hasattr(value, "memory_usage"):
+        return int(value.memory_usage(deep=True).sum())
+    return 0
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_match_cache():
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = MatchCache()
+        return _shared_cache
@@ -0,0 +1,190 @@
+# charts.py
+# Gráficos del resumen por jugador, compartidos por la página de comparación y el reporte offline.
+# Cada gráfico es una función sin argumentos que devuelve la figura de matplotlib, lista para
+# pasar por la caché de renders (figures.cached_figure); las librerías se importan al dibujar.
+
+PALETTE = ["#4B7BEC", "#ec4b7b"]
+RATE_CHARTS = {
+    "third_start": ("Field Third", {"xlabel": "Third"}),
+    "channel_start": ("Channel", {"figsize": (6, 3)}),
+    "game_state": ("Game State", {}),
+}
+PLAYER_CHARTS = ["recovery_rate", "heatmap_involved", "recovery_locations"] + [f"rate_by_{d}" for d in RATE_CHARTS]
+
+
+def pyplot():
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def seaborn():
+    import seaborn as sns
+    return sns
+
+
+def skillcorner_pitch(pitch_length, pitch_width, **kwargs):
+    """The SkillCorner pitch every page draws on."""
+    from mplsoccer import Pitch
+    return Pitch(pitch_type='skillcorner', pitch_length=pitch_length, pitch_width=pitch_width,
+                 pitch_color='white', line_color='black', **kwargs)
+
+
+def recovery_rate_chart(rate_df, fontsize=8, weight="normal", offset=0.03, inside_from=None, tick_size=None,
+                        axes=True, note=None):
+    """Bar chart of rate_df (Category, Rate): recovery rate with and without the player.
+
+    Labels of bars reaching `inside_from` go inside the bar in white; `axes=False` drops the
+    y ticks and axis labels and `note` is written under the chart.
+    """
+    plt = pyplot()
+    sns = seaborn()
+    fig, ax = plt.subplots(figsize=(4.5, 2.5))
+    sns.barplot(data=rate_df, x="Category", y="Rate", palette=PALETTE, ax=ax)
+    if tick_size:
+        ax.tick_params(axis='x', labelsize=tick_size)
+    if not axes:
+        ax.set_yticks([])
+        ax.set_xlabel("")
+        ax.set_ylabel("")
+    ax.set_ylim(0, 1)
+    for i, row in rate_df.iterrows():
+        inside = inside_from is not None and row["Rate"] >= inside_from
+        ax.text(i, row["Rate"] + (-0.05 if inside else offset), f"{row['Rate']:.0%}", ha="center",
+                fontsize=fontsize, weight=weight, color="white" if inside else "black")
+    if note:
+        ax.text(0.5, -0.25, note, ha="center", fontsize=6, transform=ax.transAxes)
+    return fig
+
+
+def loss_heatmap(df, pitch_length, pitch_width, title=None):
+    """Heatmap of the loss locations (x_loss, y_loss) in df."""
+    pitch = skillcorner_pitch(pitch_length, pitch_width)
+    fig, ax = pitch.draw(figsize=(5, 3))
+    pitch.heatmap(pitch.bin_statistic(df["x_loss"], df["y_loss"], bins=(30, 20)), ax=ax, cmap="Reds", zorder=0)
+    if title:
+        ax.set_title(title, fontsize=9)
+    return fig
+
+
+def loss_scatter(df, pitch_length, pitch_width, title=None):
+    """Scatter of the loss locations (x_loss, y_loss) in df."""
+    pitch = skillcorner_pitch(pitch_length, pitch_width)
+    fig, ax = pitch.draw(figsize=(5, 3))
+    pitch.scatter(df["x_loss"], df["y_loss"], ax=ax, color="#27ae60", s=30, alpha=0.7)
+    if title:
+        ax.set_title(title, fontsize=9)
+    return fig
+
+
+def rate_chart(rates, title, legend_title, xlabel=None, figsize=(5.5, 3)):
+    """Grouped bars of a rate table (rows: categories, columns: involvement) with % labels."""
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=figsize)
+    rates.plot(kind="bar", ax=ax, color=PALETTE)
+    ax.set_ylabel("Recovery Rate")
+    if xlabel:
+        ax.set_xlabel(xlabel)
+    ax.set_title(title, fontsize=10)
+    ax.set_ylim(0, 1)
+    ax.tick_params(axis='x', rotation=15, labelsize=8)
+    ax.tick_params(axis='y', labelsize=8)
+    ax.legend(title=legend_title, title_fontsize=8, fontsize=7, loc='upper left', bbox_to_anchor=(1, 1))
+    for container in ax.containers:
+        for bar in container:
+            height = bar.get_height()
+            if height > 0:
+                ax.annotate(f"{height:.0%}", xy=(bar.get_x() + bar.get_width() / 2, height),
+                            xytext=(0, 3), textcoords="offset points",
+                            ha='center', va='bottom', fontsize=7)
+    return fig
+
+
+def freeze_frame_chart(df_frame, pitch_length, pitch_width, highlight_id=None, highlight_label=None, title=None,
+                       arrow_s=1.0):
+    """One freeze frame (rows enriched by FreezeStore) with kit colours, numbers and the highlighted player.
+
+    Rows with vx / vy (kinematics.with_velocities) get an arrow to where the player would be in `arrow_s`.
+    """
+    pitch = skillcorner_pitch(pitch_length, pitch_width)
+    fig, ax = pitch.draw(figsize=(10, 7))
+
+    if "vx" in df_frame.columns:
+        moving = df_frame[(df_frame["is_ball"] == False) & df_frame["vx"].notna()]
+        ax.quiver(moving["x"], moving["y"], moving["vx"] * arrow_s, moving["vy"] * arrow_s,
+                  angles="xy", scale_units="xy", scale=1, color="#444444", width=0.003, zorder=4)
+
+    df_ball = df_frame[df_frame["is_ball"] == True]
+    ax.scatter(df_ball["x"], df_ball["y"], color="black", s=60, zorder=6)
+
+    df_players = df_frame[df_frame["is_ball"] == False]
+    ax.scatter(df_players["x"], df_players["y"], s=150,
+               color=df_players["jersey_color"].astype(object).fillna("grey"), edgecolors="black", zorder=5)
+
+    for x, y, number, number_color in zip(df_players["x"].to_numpy(), df_players["y"].to_numpy(),
+                                          df_players["jersey_number"].to_numpy(float),
+                                          df_players["number_color"].astype(object).fillna("black")):
+        if number == number:
+            ax.text(x, y, str(int(number)), color=number_color, fontsize=8, weight="bold",
+                    ha="center", va="center", zorder=6)
+
+    highlight = df_players[df_players["player_id"] == highlight_id]
+    if not highlight.empty:
+        ax.scatter(highlight["x"], highlight["y"], s=200,
+                   facecolors='none', edgecolors='blue', linewidths=2,
+                   label=highlight_label, zorder=7)
+
+    if title:
+        ax.set_title(title, fontsize=14)
+    ax.legend(loc="upper center", bbox_to_anchor=(0.5, -0.05), ncol=3)
+    return fig
+
+
+def involved_labels(player):
+    return {True: f"{player} Involved", False: "Not Involved"}
+
+
+def player_charts(dataset, player, pitch_length, pitch_width, matches=None, recovery_rate_style=None):
+    """{chart name: render()} for a player's summary, in PLAYER_CHARTS order.
+
+    Data is read from `dataset` (a CounterpressDataset) only when a chart is rendered;
+    `recovery_rate_style` are extra recovery_rate_chart arguments.
+    """
+    players = [player]
+
+    def rate_df():
+        import pandas as pd
+        return pd.DataFrame({
+            "Category": [f"{player} Involved", f"{player} Not Involved"],
+            "Rate": [dataset.recovery_rate(True, players, matches),
+                     dataset.recovery_rate(False, players, matches)],
+        })
+
+    def events():
+        return dataset.events(players, matches, columns=[
+            "x_loss", "y_loss", "player_involved_in_counterpress", "recovered_in_5s"])
+
+    def involved_losses():
+        df = events()
+        return df[df["player_involved_in_counterpress"]]
+
+    def recovered_with():
+        df = events()
+        return df[df["recovered_in_5s"] & df["player_involved_in_counterpress"]]
+
+    charts = {
+        "recovery_rate": lambda: recovery_rate_chart(rate_df(), **(recovery_rate_style or {})),
+        "heatmap_involved": lambda: loss_heatmap(involved_losses(), pitch_length, pitch_width),
+        "recovery_locations": lambda: loss_scatter(recovered_with(), pitch_length, pitch_width,
+                                                   f"Recovered - With {player}"),
+    }
+    for dimension, (label, options) in RATE_CHARTS.items():
+        charts[f"rate_by_{dimension}"] = (
+            lambda dimension=dimension, label=label, options=options: rate_chart(
+                dataset.rate_by(dimension, players, matches, involved_labels=involved_labels(player)),
+                f"Recovery Rate by {label} ({player} Nearby)", player, **options))
+    return charts
+
+
+def chart_key(name, player, pitch_length, pitch_width, matches=None):
+    """Figure-cache key of a player chart (see figures.cached_figure)."""
+    return (name, player, pitch_length, pitch_width, None if matches is None else tuple(sorted(matches)))
@@ -0,0 +1,322 @@
+# compact.py
+# Formato compacto opcional para los freeze frames: freeze/<match_id>.cfz
+#
+#   python -m counterpress.compact [--workers N] [--replace]
+#
+# Coordenadas en centímetros (int16), jugadores como índice a una tabla de slots en vez de
+# player_id / is_ball por fila, y x/y codificados como diferencias a lo largo de los frames de cada
+# slot. `time` y `visible_area` son del frame, no de la fila: se guardan una vez por frame (en
+# centésimas de segundo y en centímetros int32). Los frames se agrupan en bloques comprimidos con
+# zlib e indexados en la cabecera, así que leer una ventana solo descomprime los bloques que la
+# tocan. El tracking viene redondeado al centímetro, por lo que la conversión es exacta (se
+# verifica al convertir, columna a columna, contra todas las del parquet).
+#
+# Fichero: b"CFZ1" | uint32 largo de la cabecera | cabecera JSON | bloques zlib. Cada bloque guarda,
+# en orden: frames (int32, diferencias), period (uint8), filas por frame (uint16), slot por fila
+# (uint16), is_detected (bits) y x/y (int16, diferencias por slot, con los bytes agrupados); después,
+# si la cabecera los lista en "frame_columns": time (int32) y visible_area (bits de presencia y
+# int32 por campo de los frames que lo tienen).
+
+import argparse
+import json
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .config import FREEZE_FOLDER
+
+EXTENSION = ".cfz"
+MAGIC = b"CFZ1"
+SCALE = 100  # cm
+BLOCK_FRAMES = 256
+COLUMNS = ["frame", "period", "player_id", "is_detected", "is_ball", "x", "y"]
+# Columnas del parquet con un valor por frame
+FRAME_LEVEL_COLUMNS = ["time", "visible_area"]
+MISSING = np.iinfo(np.int32).min
+
+
+def compact_path(match_id, folder=FREEZE_FOLDER):
+    return os.path.join(folder, f"{match_id}{EXTENSION}")
+
+
+# === Encode ===
+def _shuffle(deltas):
+    # Planos x | y y, dentro de ellos, primero los bytes bajos y luego los altos: zlib comprime
+    # bastante mejor los bytes altos (casi siempre 0x00 / 0xff) cuando van juntos
+    return np.ascontiguousarray(deltas.T.astype("<i2")).view(np.uint8).reshape(-1, 2).T
+
+
+def _unshuffle(data, n_rows):
+    """Inverse of _shuffle: the x and y delta planes as int16."""
+    low, high = data[:2 * n_rows].astype(np.uint16), data[2 * n_rows:].astype(np.uint16)
+    return (low | (high << 8)).view(np.int16).reshape(2, n_rows)
+
+
+def _encode_time(times):
+    # "HH:MM:SS.cc" -> centésimas; MISSING si falta o no tiene ese formato (la verificación lo detecta)
+    parts = pd.Series(times, dtype=object).str.extract(r"^(\d+):(\d\d):(\d\d)\.(\d\d)$")
+    cs = parts.astype(float).to_numpy() @ np.array([360000, 6000, 100, 1])
+    return np.where(np.isnan(cs), MISSING, cs).astype(np.int64)
+
+
+def _decode_time(cs):
+    h, rest = np.divmod(cs, 360000)
+    m, rest = np.divmod(rest, 6000)
+    sec, c = np.divmod(rest, 100)
+    return np.array([None if v == MISSING else f"{a:02d}:{b:02d}:{d:02d}.{e:02d}"
+                     for v, a, b, d, e in zip(cs.tolist(), h.tolist(), m.tolist(), sec.tolist(), c.tolist())],
+                    dtype=object)
+
+
+def _encode_area(areas):
+    """Field names, presence and int32 centimetres [n_present, n_fields] of visible_area dicts."""
+    fields = next((list(a) for a in areas if a is not None), [])
+    present = np.array([a is not None for a in areas], dtype=bool)
+    values = np.array([[a[f] for f in fields] for a in areas if a is not None], dtype=float)
+    values = np.rint(values.reshape(-1, len(fields)) * SCALE)
+    if np.abs(np.nan_to_num(values)).max(initial=0) > np.iinfo(np.int32).max:
+        raise ValueError("visible_area must be within ±21474 km")
+    return fields, present, np.where(np.isnan(values), MISSING, values).astype(np.int64)
+
+
+def _decode_area(fields, present, values):
+    values = np.where(values == MISSING, np.nan, values / SCALE)
+    rows = iter(values.tolist())
+    return np.array([{f: (None if v != v else v) for f, v in zip(fields, next(rows))} if p else None
+                     for p in present], dtype=object)
+
+
+def _encode_block(frames, period, counts, slots, detected, xy, extras=()):
+    # x/y en orden slot-mayor: cada slot queda contiguo y una sola diferencia (con desborde int16,
+    # que el cumsum del decode deshace) cubre todo el bloque
+    order = np.argsort(slots, kind="stable")
+    xy = xy[order]
+    deltas = np.diff(xy, axis=0, prepend=np.zeros((1, 2), np.int16)).astype(np.int16)
+    parts = [
+        np.diff(frames, prepend=0).astype("<i4"),
+        period.astype(np.uint8),
+        counts.astype("<u2"),
+        slots.astype("<u2"),
+        np.packbits(detected),
+        _shuffle(deltas),
+        *extras,
+    ]
+    return zlib.compress(b"".join(p.tobytes() for p in parts), 6)
+
+
+def encode_frames(df, block_frames=BLOCK_FRAMES):
+    """Bytes of the compact file for a freeze-frame DataFrame (COLUMNS)."""
+    df = df.sort_values(["frame", "is_ball", "player_id"], kind="stable")
+    frame = df["frame"].to_numpy(np.int64)
+    # Un slot por par (player_id, is_ball), codificado como player_id * 2 + is_ball
+    keys, slots = np.unique(df["player_id"].to_numpy(np.int64) * 2 + df["is_ball"].to_numpy(np.int64),
+                            return_inverse=True)
+    slots = slots.reshape(-1)
+    xy_float = df[["x", "y"]].to_numpy(float)
+    xy = np.rint(xy_float * SCALE)
+    if np.isnan(xy).any() or np.abs(xy).max(initial=0) > np.iinfo(np.int16).max:
+        raise ValueError("coordinates must be finite and within ±327 m")
+    xy = xy.astype(np.int16)
+    detected = df["is_detected"].to_numpy(bool)
+    period = df["period"].to_numpy(np.int64)
+
+    frames, starts, counts = np.unique(frame, return_index=True, return_counts=True)
+    frame_columns = [c for c in FRAME_LEVEL_COLUMNS if c in df.columns]
+    if "time" in frame_columns:
+        time_cs = _encode_time(df["time"].to_numpy(object)[starts])
+    area_fields = []
+    if "visible_area" in frame_columns:
+        area_fields, area_present, area = _encode_area(df["visible_area"].to_numpy(object)[starts])
+        area_rows = np.concatenate([[0], np.cumsum(area_present)])
+
+    blocks, payloads, offset = [], [], 0
+    for lo in range(0, len(frames), block_frames):
+        hi = min(lo + block_frames, len(frames))
+        r0, r1 = starts[lo], starts[hi - 1] + counts[hi - 1]
+        extras = []
+        if "time" in frame_columns:
+            extras.append(time_cs[lo:hi].astype("<i4"))
+        if "visible_area" in frame_columns:
+            extras += [np.packbits(area_present[lo:hi]),
+                       area[area_rows[lo]:area_rows[hi]].T.astype("<i4")]
+        data = _encode_block(frames[lo:hi], period[starts[lo:hi]], counts[lo:hi], slots[r0:r1],
+                             detected[r0:r1], xy[r0:r1], extras)
+        blocks.append({"first_frame": int(frames[lo]), "last_frame": int(frames[hi - 1]),
+                       "frames": int(hi - lo), "rows": int(r1 - r0), "offset": offset, "length": len(data)})
+        payloads.append(data)
+        offset += len(data)
+
+    header = json.dumps({
+        "scale": SCALE,
+        "rows": int(len(df)),
+        "slots": [[int(k // 2), bool(k % 2)] for k in keys],
+        "frame_columns": frame_columns,
+        "visible_area_fields": area_fields,
+        "blocks": blocks,
+    }).encode("utf-8")
+    return MAGIC + struct.pack("<I", len(header)) + header + b"".join(payloads)
+
+
+def write_compact(df, path, block_frames=BLOCK_FRAMES):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(encode_frames(df, block_frames))
+    os.replace(tmp_path, path)
+
+
+# === Decode ===
+def read_header(f):
+    if f.read(4) != MAGIC:
+        raise ValueError(f"{getattr(f, 'name', 'file')} is not a compact freeze file")
+    (length,) = struct.unpack("<I", f.read(4))
+    header = json.loads(f.read(length))
+    header["data_start"] = 8 + length
+    return header
+
+
+def _decode_block(data, n_frames, n_rows, frame_columns=(), n_area_fields=0):
+    buf = zlib.decompress(data)
+    pos = 0
+
+    def take(dtype, n):
+        nonlocal pos
+        array = np.frombuffer(buf, dtype, n, pos)
+        pos += array.nbytes
+        return array
+
+    frames = np.cumsum(take("<i4", n_frames), dtype=np.int64)
+    period = take(np.uint8, n_frames)
+    counts = take("<u2", n_frames)
+    slots = take("<u2", n_rows)
+    detected = np.unpackbits(take(np.uint8, (n_rows + 7) // 8), count=n_rows).astype(bool)
+    deltas = _unshuffle(take(np.uint8, 4 * n_rows), n_rows)
+    # Las diferencias están en orden slot-mayor: cumsum por plano y se devuelven al orden por frame
+    order = np.argsort(slots, kind="stable")
+    xy = np.empty((2, n_rows), np.int16)
+    for plane in range(2):
+        xy[plane, order] = np.cumsum(deltas[plane], dtype=np.int16)
+    # Las columnas por frame se devuelven por frame, con las filas por frame para expandirlas
+    time_cs = take("<i4", n_frames) if "time" in frame_columns else np.empty(0, "<i4")
+    area_present = np.zeros(n_frames if "visible_area" in frame_columns else 0, bool)
+    area = np.empty((0, n_area_fields), "<i4")
+    if "visible_area" in frame_columns:
+        area_present = np.unpackbits(take(np.uint8, (n_frames + 7) // 8), count=n_frames).astype(bool)
+        n_present = int(area_present.sum())
+        area = take("<i4", n_present * n_area_fields).reshape(n_area_fields, n_present).T
+    return (np.repeat(frames, counts), np.repeat(period, counts), slots, detected, xy,
+            counts, time_cs.astype(np.int64), area_present, area.astype(np.int64))
+
+
+def read_compact(path, start=None, end=None, columns=COLUMNS):
+    """Rows of a compact file, like freeze.read_frames: only the blocks overlapping [start, end] are read."""
+    with open(path, "rb") as f:
+        header = read_header(f)
+        blocks = [b for b in header["blocks"]
+                  if (start is None or b["last_frame"] >= start) and (end is None or b["first_frame"] <= end)]
+        frame_columns = header.get("frame_columns", [])
+        area_fields = header.get("visible_area_fields", [])
+        missing = [c for c in columns if c not in COLUMNS and c not in frame_columns]
+        if missing:
+            raise ValueError(f"{path} has no column(s) {missing}")
+        parts = []
+        for b in blocks:
+            f.seek(header["data_start"] + b["offset"])
+            parts.append(_decode_block(f.read(b["length"]), b["frames"], b["rows"], frame_columns,
+                                       len(area_fields)))
+
+    if parts:
+        frame, period, slots, detected, xy = (np.concatenate(p, axis=-1) for p in list(zip(*parts))[:5])
+        counts, time_cs, area_present, area = (np.concatenate(p) for p in list(zip(*parts))[5:])
+    else:
+        frame, period, slots = np.empty(0, np.int64), np.empty(0, np.uint8), np.empty(0, np.uint16)
+        detected, xy = np.empty(0, bool), np.empty((2, 0), np.int16)
+        counts, time_cs, area_present = np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, bool)
+        area = np.empty((0, len(area_fields)), np.int64)
+    frame_index = np.repeat(np.arange(len(counts)), counts)
+    keep = slice(None)
+    if start is not None or end is not None:
+        keep = np.ones(len(frame), bool)
+        if start is not None:
+            keep &= frame >= start
+        if end is not None:
+            keep &= frame <= end
+
+    slot_table = np.array(header["slots"], dtype=np.int64).reshape(-1, 2)
+    slot_ids, slot_ball = slot_table[:, 0].copy(), slot_table[:, 1].astype(bool)
+    slots = slots[keep]
+    scale = float(header["scale"])
+    data = {
+        "frame": lambda: frame[keep],
+        "period": lambda: period[keep].astype(np.int64),
+        "player_id": lambda: slot_ids.take(slots),
+        "is_detected": lambda: detected[keep],
+        "is_ball": lambda: slot_ball.take(slots),
+        "x": lambda: xy[0, keep] / scale,
+        "y": lambda: xy[1, keep] / scale,
+        "time": lambda: _decode_time(time_cs).take(frame_index[keep]),
+        "visible_area": lambda: _decode_area(area_fields, area_present, area).take(frame_index[keep]),
+    }
+    return pd.DataFrame({c: data[c]() for c in columns}, copy=False)
+
+
+# === Conversion ===
+def convert_match(parquet_path, out_path=None, replace=False, block_frames=BLOCK_FRAMES):
+    """Write the compact file next to a freeze parquet and check it decodes to the same rows.
+
+    Every column of the parquet is compared. Returns (parquet bytes, compact bytes). With
+    `replace` the parquet is removed once verified; a parquet with columns the compact format
+    does not store is never removed.
+    """
+    import pyarrow.parquet as pq
+
+    from .freeze import read_frames
+
+    out_path = out_path or os.path.splitext(parquet_path)[0] + EXTENSION
+    source_columns = pq.read_schema(parquet_path).names
+    unsupported = [c for c in source_columns if c not in COLUMNS and c not in FRAME_LEVEL_COLUMNS]
+    if replace and unsupported:
+        raise ValueError(f"{parquet_path}: {unsupported} are not stored in {EXTENSION}, kept the parquet")
+    columns = [c for c in source_columns if c not in unsupported]
+    df = read_frames(parquet_path, columns=columns)
+    write_compact(df, out_path, block_frames)
+
+    expected = df.sort_values(["frame", "is_ball", "player_id"], kind="stable").reset_index(drop=True)
+    decoded = read_compact(out_path, columns=columns)
+    # Comparación como objetos: None frente a None en time y dicts campo a campo en visible_area
+    wrong = [c for c in columns
+             if not np.array_equal(expected[c].to_numpy(object), decoded[c].to_numpy(object))]
+    if wrong:
+        os.remove(out_path)
+        raise ValueError(f"{parquet_path}: {wrong} do not round-trip (coordinates off the centimetre grid?), "
+                         f"kept the parquet only")
+    sizes = os.path.getsize(parquet_path), os.path.getsize(out_path)
+    if replace:
+        os.remove(parquet_path)
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert freeze parquets to the compact .cfz format.")
+    parser.add_argument("--freeze", default=FREEZE_FOLDER)
+    parser.add_argument("--replace", action="store_true", help="delete each parquet once its .cfz is verified")
+    parser.add_argument("--block-frames", type=int, default=BLOCK_FRAMES)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per core)")
+    args = parser.parse_args(argv)
+
+    paths = sorted(os.path.join(args.freeze, n) for n in os.listdir(args.freeze) if n.endswith(".parquet"))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        sizes = list(pool.map(convert_match, paths, [None] * len(paths), [args.replace] * len(paths),
+                              [args.block_frames] * len(paths)))
+    before, after = sum(s[0] for s in sizes), sum(s[1] for s in sizes)
+    print(f"{len(paths)} matches: {before / 1e6:.1f} MB parquet -> {after / 1e6:.1f} MB compact "
+          f"({before / max(after, 1):.1f}x, {time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# config.py
+
+import os
+
+# === Paths ===
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FREEZE_FOLDER = os.path.join(BASE_DIR, "freeze")
+META_FOLDER = os.path.join(BASE_DIR, "meta")
+CSV_FOLDER = os.path.join(BASE_DIR, "csv")
+CSV_PATH = os.path.join(CSV_FOLDER, "counterpress_analysis_all.csv")
+PARTIALS_FOLDER = os.path.join(CSV_FOLDER, "partials")
+CACHE_FOLDER = os.path.join(BASE_DIR, "cache")
+
+# === Tracked players ===
+PLAYER_IDS = {
+    6028: "Mbappé",
+    12253: "Vinicius Jr",
+    23903: "Rodrygo"
+}
+NAME_TO_ID = {v: k for k, v in PLAYER_IDS.items()}
+
+# === Tracking data ===
+TEAM_ID = 262  # Real Madrid CF
+FPS = 10
+BALL_ID = -1
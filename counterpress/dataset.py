@@ -0,0 +1,175 @@
+# dataset.py
+# API común de las páginas sobre la tabla de análisis y el cubo de agregados. Los resultados se
+# memorizan por firma de filtro (consulta, jugadores, partidos, rol) en un único objeto por
+# proceso: cambiar de página o de jugador reutiliza lo ya calculado por cualquier sesión. Cuando
+# la ingesta reescribe la tabla cambia la versión y la memoria se vacía.
+
+import threading
+from collections import OrderedDict
+
+from . import aggregates
+from .aggregates import AGGREGATES_FOLDER
+from .analysis import CATEGORIES, TABLE_FOLDER, load_analysis, table_version
+from .config import CSV_PATH
+from .metrics import comparison_metrics
+
+DIMENSION_LABELS = {
+    "third_start": {"defensive_third": "Defensive Third", "middle_third": "Middle Third",
+                    "attacking_third": "Attacking Third"},
+    "channel_start": {"wide_left": "Wide Left", "half_space_left": "Half-Space Left", "center": "Center",
+                      "half_space_right": "Half-Space Right", "wide_right": "Wide Right"},
+    "game_state": {},
+}
+# Orden lógico de cada dimensión ya etiquetada (izquierda → derecha, defensa → ataque...)
+DIMENSION_ORDER = {dim: [labels.get(c, c) for c in CATEGORIES[dim]] for dim, labels in DIMENSION_LABELS.items()}
+
+ROLE_COLUMNS = {"near": "player_near_loss", "involved": "player_involved_in_counterpress"}
+DEFAULT_INVOLVED_LABELS = {True: "Involved", False: "Not Involved"}
+
+
+class CounterpressDataset:
+    """Loads, filters and summarises the counterpress table, memoizing every result.
+
+    Every query accepts the same filters: `players` and `matches` (iterables, None for all) and
+    `role` ("near", "involved" or None). Results are shared between sessions: treat them as
+    read-only.
+    """
+
+    def __init__(self, csv_path=CSV_PATH, table_folder=TABLE_FOLDER, aggregates_folder=AGGREGATES_FOLDER,
+                 max_entries=256):
+        self.csv_path = csv_path
+        self.table_folder = table_folder
+        self.aggregates_folder = aggregates_folder
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return table_version(self.csv_path)
+
+    def _memoized(self, key, compute):
+        version = self.version
+        with self._lock:
+            if version != self._version:
+                self._memo.clear()
+                self._version = version
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                self.hits += 1
+                return self._memo[key]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            if version == self._version:
+                self._memo[key] = value
+                while len(self._memo) > self.max_entries:
+                    self._memo.popitem(last=False)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._memo), "hits": self.hits, "misses": self.misses}
+
+    # === Data ===
+    def events(self, players=None, matches=None, role=None, columns=None):
+        """Rows of the analysis table (only `columns` if given) for the filter."""
+        key = ("events", _signature(players, matches, role), tuple(columns) if columns else None)
+
+        def compute():
+            read = columns
+            if role is not None and columns is not None and ROLE_COLUMNS[role] not in columns:
+                read = list(columns) + [ROLE_COLUMNS[role]]
+            df = load_analysis(players, matches, read, self.table_folder)
+            if role is not None:
+                df = df[df[ROLE_COLUMNS[role]]].reset_index(drop=True)
+            return df if read is columns else df[list(columns)]
+        return self._memoized(key, compute)
+
+    def cube(self, players=None, matches=None, role=None):
+        """Aggregates cube for the filter (per-match cube when `matches` is given)."""
+        def compute():
+            cube = aggregates.load_cube(players, matches, self.aggregates_folder)
+            if role is not None:
+                cube = cube[cube[ROLE_COLUMNS[role]]].reset_index(drop=True)
+            return cube
+        return self._memoized(("cube", _signature(players, matches, role)), compute)
+
+    # === Queries ===
+    def kpis(self, players=None, matches=None, role=None):
+        return self._query("kpis", (), players, matches, role, aggregates.kpis)
+
+    def role_outcomes(self, players=None, matches=None, role=None):
+        return self._query("role_outcomes", (), players, matches, role, aggregates.role_outcomes)
+
+    def recovery_rate(self, involved, players=None, matches=None, role=None):
+        return self._query("recovery_rate", (involved,), players, matches, role,
+                           lambda cube: aggregates.recovery_rate(cube, involved))
+
+    def recovery_time(self, involved, players=None, matches=None, role=None):
+        """Average recovery time (s) of recovered losses, with or without the player involved."""
+        return self._query("recovery_time", (involved,), players, matches, role,
+                           lambda cube: aggregates.avg_recovery_time(cube, involved))
+
+    def breakdown(self, dimension, players=None, matches=None, role=None, near_only=True,
+                  involved_labels=None, names=None):
+        """Recovered / Not Recovered counts by (labelled dimension, involvement), in logical order."""
+        involved_labels = involved_labels or DEFAULT_INVOLVED_LABELS
+        names = names or [f"{dimension}_clean", "Player Involved"]
+        args = (dimension, near_only, tuple(sorted(involved_labels.items())), tuple(names))
+
+        def compute(cube):
+            table = aggregates.relabel(aggregates.breakdown(cube, dimension, near_only),
+                                       DIMENSION_LABELS.get(dimension, {}), involved_labels, names)
+            order = DIMENSION_ORDER.get(dimension)
+            return table.reindex(order, level=0) if order else table
+        return self._query("breakdown", args, players, matches, role, compute)
+
+    def rate_by(self, dimension, players=None, matches=None, role=None, near_only=True, involved_labels=None):
+        """Recovery rate by dimension (rows) and involvement (columns: not involved, involved)."""
+        involved_labels = involved_labels or DEFAULT_INVOLVED_LABELS
+        table = self.breakdown(dimension, players, matches, role, near_only, involved_labels)
+        rate = (table["Recovered"] / (table["Recovered"] + table["Not Recovered"])).unstack()
+        columns = [involved_labels[v] for v in (False, True) if involved_labels[v] in rate.columns]
+        order = DIMENSION_ORDER.get(dimension)
+        rate = rate[columns]
+        return rate.reindex(order) if order else rate
+
+    def comparison(self, by="player_tracked", players=None, matches=None, role=None):
+        """Comparison metrics (counterpress.metrics) grouped by `by`."""
+        keys = (by,) if isinstance(by, str) else tuple(by)
+        columns = list(keys) + ["player_near_loss", "player_involved_in_counterpress",
+                                "recovered_in_5s", "recovery_time"]
+
+        def compute():
+            return comparison_metrics(self.events(players, matches, role, columns), by)
+        return self._memoized(("comparison", _signature(players, matches, role), keys), compute)
+
+    def _query(self, name, args, players, matches, role, fn):
+        return self._memoized((name, _signature(players, matches, role), args),
+                              lambda: fn(self.cube(players, matches, role)))
+
+
+def _signature(players, matches, role):
+    if role is not None and role not in ROLE_COLUMNS:
+        raise ValueError(f"Unknown role: {role}")
+    return (
+        None if players is None else tuple(sorted(players)),
+        None if matches is None else tuple(sorted(int(m) for m in matches)),
+        role,
+    )
+
+
+_shared_dataset = None
+_shared_lock = threading.Lock()
+
+
+def get_dataset():
+    global _shared_dataset
+    with _shared_lock:
+        if _shared_dataset is None:
+            _shared_dataset = CounterpressDataset()
+        return _shared_dataset
@@ -0,0 +1,46 @@
+# figures.py
+# Caché de gráficos ya renderizados: bytes PNG en memoria por (gráfico, jugador, filtros) y versión
+# de los datos. Las sesiones que miran el mismo jugador comparten el render, y con la caché
+# caliente la página ni siquiera importa matplotlib.
+
+import io
+import os
+import threading
+
+from .cache import MatchCache
+
+DEFAULT_MAX_MB = int(os.environ.get("COUNTERPRESS_FIGURE_CACHE_MB", "64"))
+# Los mismos que usa st.pyplot, para que la imagen cacheada se vea igual
+SAVEFIG_OPTIONS = {"bbox_inches": "tight", "dpi": 200}
+
+
+def figure_bytes(fig, fmt="png"):
+    """Render a matplotlib figure to PNG/SVG bytes and close it."""
+    import matplotlib.pyplot as plt
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, **SAVEFIG_OPTIONS)
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def cached_figure(key, version, render, fmt="png", cache=None):
+    """Bytes of the figure returned by `render()`, rendered only on a cache miss.
+
+    `key` identifies the chart and its inputs, e.g. ("heatmap_involved", player); a new
+    `version` (the data version) replaces the older renders of the same key.
+    """
+    cache = cache or get_figure_cache()
+    return cache.get_or_load((key, fmt, version), lambda: figure_bytes(render(), fmt))
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_figure_cache():
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = MatchCache(DEFAULT_MAX_MB * 1024 * 1024, sizeof=len)
+        return _shared_cache
@@ -0,0 +1,215 @@
+# freeze.py
+# Acceso indexado a los freeze frames de freeze/<match_id>.parquet (o del formato compacto .cfz).
+# Los frames decodificados y enriquecidos se publican una vez en cache/frames/ y cada proceso del
+# servidor los abre con mmap (ver shared.py).
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .cache import get_match_cache
+from .compact import EXTENSION as COMPACT_EXTENSION, read_compact
+from .config import CACHE_FOLDER, FREEZE_FOLDER, META_FOLDER
+from .meta import get_meta_index, meta_path
+from .shared import SharedArrays
+
+FRAMES_FOLDER = os.path.join(CACHE_FOLDER, "frames")
+# Sube cuando cambia el contenido de las entradas de cache/frames/ (columnas, enriquecido...)
+FRAMES_LAYOUT = 1
+
+# Columnas que usan el visor y el pipeline: no decodificamos `time` ni el struct `visible_area`
+FRAME_COLUMNS = ["frame", "period", "player_id", "is_detected", "is_ball", "x", "y"]
+
+
+def freeze_path(match_id, folder=FREEZE_FOLDER):
+    """The match's parquet, or its compact .cfz when only that one exists."""
+    path = os.path.join(folder, f"{match_id}.parquet")
+    compact = os.path.join(folder, f"{match_id}{COMPACT_EXTENSION}")
+    return compact if not os.path.exists(path) and os.path.exists(compact) else path
+
+
+def read_frames(path, start=None, end=None, columns=FRAME_COLUMNS):
+    """Read the rows of a freeze file, optionally only for frames in [start, end].
+
+    Row groups whose `frame` statistics fall outside the window are skipped, so
+    files written with several row groups are only partially decoded. Compact
+    .cfz files are decoded block by block the same way (see compact.py).
+    """
+    if path.endswith(COMPACT_EXTENSION):
+        return read_compact(path, start, end, columns)
+    pf = pq.ParquetFile(path)
+    row_groups = list(range(pf.metadata.num_row_groups))
+    if start is not None or end is not None:
+        frame_idx = pf.schema_arrow.get_field_index("frame")
+        keep = []
+        for i in row_groups:
+            stats = pf.metadata.row_group(i).column(frame_idx).statistics
+            if stats is None or not stats.has_min_max:
+                keep.append(i)
+            elif (start is None or stats.max >= start) and (end is None or stats.min <= end):
+                keep.append(i)
+        row_groups = keep
+
+    table = pf.read_row_groups(row_groups, columns=columns)
+    if start is not None:
+        table = table.filter(pc.greater_equal(table["frame"], start))
+    if end is not None:
+        table = table.filter(pc.less_equal(table["frame"], end))
+    return table.to_pandas()
+
+
+def enrich_frames(df, players):
+    """Attach team_id, jersey_number, jersey_color and number_color to every row.
+
+    Player ids are mapped once to positions in the roster (-1 for the ball or unknown
+    players) and each attribute is gathered from a lookup array; colours stay as
+    categorical codes.
+    """
+    df = df.copy()
+    roster_ids = players["player_id"].to_numpy()
+    order = np.argsort(roster_ids)
+    sorted_ids = roster_ids[order]
+    pid = df["player_id"].to_numpy()
+    pos = np.minimum(np.searchsorted(sorted_ids, pid), max(len(sorted_ids) - 1, 0))
+    found = sorted_ids[pos] == pid if len(sorted_ids) else np.zeros(len(pid), dtype=bool)
+    idx = np.where(found, order[pos] if len(order) else -1, -1)
+
+    # El último hueco de cada tabla de lookup es el valor "sin jugador"
+    team_ids = np.append(players["team_id"].to_numpy(np.int64), -1)
+    numbers = np.append(players["jersey_number"].to_numpy(float), np.nan)
+    df["team_id"] = team_ids[idx]
+    df["jersey_number"] = numbers[idx]
+    for col in ("jersey_color", "number_color"):
+        codes, categories = pd.factorize(players[col])
+        df[col] = pd.Categorical.from_codes(np.append(codes, -1)[idx], categories=categories)
+    return df
+
+
+class MatchFrames:
+    """Freeze frames of one match sorted by frame, with a frame -> row-offset index."""
+
+    def __init__(self, match_id, df, frames=None, offsets=None):
+        self.match_id = match_id
+        if frames is None:
+            df = df.sort_values("frame", kind="stable").reset_index(drop=True)
+            frames, offsets = np.unique(df["frame"].to_numpy(), return_index=True)
+            offsets = np.append(offsets, len(df))
+        self.df = df
+        self.frames = frames
+        self.offsets = offsets
+
+    def to_arrays(self):
+        """(arrays, meta) for SharedArrays: one array per column, categoricals as codes."""
+        arrays = {"_frames": self.frames, "_offsets": self.offsets}
+        categories = {}
+        for col in self.df.columns:
+            values = self.df[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                arrays[col] = values.array.codes
+                categories[col] = values.cat.categories.tolist()
+            else:
+                arrays[col] = values.to_numpy()
+        return arrays, {"columns": self.df.columns.tolist(), "categories": categories}
+
+    @classmethod
+    def from_arrays(cls, match_id, arrays, meta):
+        """Wrap (mapped) arrays from to_arrays without copying them."""
+        columns = {}
+        for col in meta["columns"]:
+            if col in meta["categories"]:
+                columns[col] = pd.Categorical.from_codes(arrays[col], categories=meta["categories"][col],
+                                                         validate=False)
+            else:
+                columns[col] = arrays[col]
+        return cls(match_id, pd.DataFrame(columns, copy=False), arrays["_frames"], arrays["_offsets"])
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def nbytes(self):
+        return int(self.df.memory_usage(deep=True).sum() + self.frames.nbytes + self.offsets.nbytes)
+
+    def has_frame(self, frame):
+        i = np.searchsorted(self.frames, frame)
+        return i < len(self.frames) and self.frames[i] == frame
+
+    def frames_between(self, start, end):
+        lo, hi = self._bounds(start, end)
+        return self.frames[lo:hi]
+
+    def get_frame(self, frame):
+        i = np.searchsorted(self.frames, frame)
+        if i == len(self.frames) or self.frames[i] != frame:
+            return self.df.iloc[0:0]
+        return self.df.iloc[self.offsets[i]:self.offsets[i + 1]]
+
+    def get_window(self, start, end):
+        lo, hi = self._bounds(start, end)
+        return self.df.iloc[self.offsets[lo]:self.offsets[hi]]
+
+    def _bounds(self, start, end):
+        lo = np.searchsorted(self.frames, start, side="left")
+        hi = np.searchsorted(self.frames, end, side="right")
+        return lo, max(lo, hi)
+
+
+class FreezeStore:
+    """Serves indexed match frames out of the shared LRU cache, keyed by file mtimes.
+
+    Frames come enriched with the roster columns (see enrich_frames) when the match
+    has metadata. With `shared_folder` (the default) each match is decoded once for all
+    server processes and memory-mapped read-only; None decodes it in this process.
+    """
+
+    def __init__(self, folder=FREEZE_FOLDER, cache=None, meta_folder=META_FOLDER, shared_folder=FRAMES_FOLDER):
+        self.folder = folder
+        self.meta_folder = meta_folder
+        self.cache = cache or get_match_cache()
+        self.shared = SharedArrays(shared_folder) if shared_folder else None
+
+    def path(self, match_id):
+        return freeze_path(match_id, self.folder)
+
+    def version(self, match_id):
+        """(freeze mtime, meta mtime) in ns: changes whenever the frames served for the match do."""
+        meta_file = meta_path(match_id, self.meta_folder)
+        meta_mtime = os.stat(meta_file).st_mtime_ns if os.path.exists(meta_file) else None
+        return os.stat(self.path(match_id)).st_mtime_ns, meta_mtime
+
+    def source_mtime(self, match_id):
+        """Latest mtime (s) of the freeze file and the meta json the served frames come from."""
+        return max(ns for ns in self.version(match_id) if ns is not None) / 1e9
+
+    def load(self, match_id):
+        path = self.path(match_id)
+        version = self.version(match_id)
+        has_meta = version[1] is not None
+        if self.shared is None:
+            return self.cache.get_or_load((match_id, "frames", version), lambda: self._read(match_id, path, has_meta))
+        signature = [FRAMES_LAYOUT, os.path.abspath(path), *version]
+        return self.cache.get_or_load((match_id, "shared_frames", version), lambda: MatchFrames.from_arrays(
+            match_id, *self.shared.open(match_id, signature,
+                                        lambda: self._read(match_id, path, has_meta).to_arrays())))
+
+    def invalidate(self, match_id):
+        """Drop the match from the shared folder (if any) and from this process's cache."""
+        if self.shared is not None:
+            self.shared.invalidate(match_id)
+        self.cache.invalidate(match_id)
+
+    def _read(self, match_id, path, has_meta):
+        df = read_frames(path)
+        if has_meta:
+            # refresh: el json pudo cambiar hace menos de CHECK_INTERVAL_S y la versión ya lo refleja
+            df = enrich_frames(df, get_meta_index(self.meta_folder, refresh=True).players_for(match_id))
+        return MatchFrames(match_id, df)
+
+    def get_frame(self, match_id, frame):
+        return self.load(match_id).get_frame(frame)
+
+    def get_window(self, match_id, start, end):
+        return self.load(match_id).get_window(start, end)
@@ -0,0 +1,136 @@
+# ingest.py
+# Ingesta incremental: solo procesa los partidos nuevos o modificados de freeze/ y meta/
+#
+#   python -m counterpress.ingest [--workers N]
+#
+# <carpeta de --out>/manifest.json guarda mtime, tamaño y sha1 de los ficheros fuente de cada partido
+# ya ingerido. Si la tabla existente es de antes de añadir una columna (ANALYSIS_COLUMNS), todos sus
+# partidos se vuelven a programar; los que ya tienen un parcial vigente (partial_is_fresh) no se
+# recalculan.
+
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+from .analysis import read_analysis
+from .config import CSV_PATH, FREEZE_FOLDER, META_FOLDER, PARTIALS_FOLDER
+from .freeze import freeze_path
+from .meta import meta_path
+from .pipeline import (ANALYSIS_COLUMNS, build_partials, list_matches, merge_partials,
+                       sort_analysis, write_analysis)
+
+
+def default_manifest_path(csv_path=CSV_PATH):
+    """The manifest kept next to an analysis table."""
+    return os.path.join(os.path.dirname(csv_path) or ".", "manifest.json")
+
+
+MANIFEST_PATH = default_manifest_path()
+
+
+def file_signature(path, previous=None):
+    stat = os.stat(path)
+    if previous and previous["mtime_ns"] == stat.st_mtime_ns and previous["size"] == stat.st_size:
+        return previous
+    # Solo hasheamos cuando cambió mtime o tamaño
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(chunk)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha1": sha1.hexdigest()}
+
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return {int(k): v for k, v in json.load(f).items()}
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({str(k): v for k, v in sorted(manifest.items())}, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def plan_ingest(manifest, freeze_folder=FREEZE_FOLDER, meta_folder=META_FOLDER):
+    """Compare source files with the manifest.
+
+    Returns (new, changed, removed, signatures) where signatures holds the
+    current freeze/meta signatures of every available match.
+    """
+    available = list_matches(freeze_folder, meta_folder)
+    new, changed, signatures = [], [], {}
+    for match_id in available:
+        previous = manifest.get(match_id, {})
+        sig = {
+            "freeze": file_signature(freeze_path(match_id, freeze_folder), previous.get("freeze")),
+            "meta": file_signature(meta_path(match_id, meta_folder), previous.get("meta")),
+        }
+        signatures[match_id] = sig
+        if not previous:
+            new.append(match_id)
+        elif any(sig[k]["sha1"] != previous[k]["sha1"] for k in ("freeze", "meta")):
+            changed.append(match_id)
+    removed = sorted(set(manifest) - set(available))
+    return new, changed, removed, signatures
+
+
+def ingest(csv_path=CSV_PATH, freeze_folder=FREEZE_FOLDER, meta_folder=META_FOLDER,
+           partials_folder=PARTIALS_FOLDER, manifest_path=None, workers=None):
+    """Bring the analysis table up to date. Returns the (new, changed, stale, removed) match ids.
+
+    `stale` are unchanged matches redone because the existing table lacks columns of
+    ANALYSIS_COLUMNS. The manifest defaults to the one next to `csv_path`.
+    """
+    manifest_path = manifest_path or default_manifest_path(csv_path)
+    manifest = load_manifest(manifest_path) if os.path.exists(csv_path) else {}
+    new, changed, removed, signatures = plan_ingest(manifest, freeze_folder, meta_folder)
+    table = read_analysis(csv_path) if manifest else pd.DataFrame(columns=ANALYSIS_COLUMNS)
+    stale = []
+    if not set(ANALYSIS_COLUMNS) <= set(table.columns):
+        stale = sorted(set(signatures) - set(new) - set(changed))
+
+    # Los nuevos y los de esquema viejo pueden reutilizar un parcial vigente; los modificados se
+    # recalculan siempre
+    build_partials(new + stale, freeze_folder, meta_folder, partials_folder, workers)
+    build_partials(changed, freeze_folder, meta_folder, partials_folder, workers, force=True)
+
+    touched = set(new) | set(changed) | set(stale) | set(removed)
+    if touched:
+        table = table[~table["match_id"].isin(touched)]
+        delta = merge_partials(new + changed + stale, partials_folder)
+        parts = [p for p in (table, delta) if len(p)]
+        merged = pd.concat(parts, ignore_index=True) if parts else table
+        write_analysis(sort_analysis(merged[ANALYSIS_COLUMNS]), csv_path)
+
+    # El manifest se escribe después de la tabla: si algo falla, la próxima ingesta repite el delta
+    save_manifest(signatures, manifest_path)
+    return new, changed, stale, removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest new or modified matches into the analysis table.")
+    parser.add_argument("--freeze", default=FREEZE_FOLDER)
+    parser.add_argument("--meta", default=META_FOLDER)
+    parser.add_argument("--out", default=CSV_PATH)
+    parser.add_argument("--partials", default=PARTIALS_FOLDER)
+    parser.add_argument("--manifest", default=None, help="default: manifest.json next to --out")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    new, changed, stale, removed = ingest(args.out, args.freeze, args.meta, args.partials, args.manifest,
+                                          args.workers)
+    print(f"{len(new)} new, {len(changed)} changed, {len(stale)} outdated schema, {len(removed)} removed "
+          f"-> {args.out} "
+          f"({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
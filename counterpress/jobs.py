@@ -0,0 +1,130 @@
+# jobs.py
+# Cola local de trabajos pesados (exportaciones, etc.) para no bloquear las sesiones de Streamlit.
+# Un único pool por proceso limita cuántos trabajos corren a la vez en el servidor.
+
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_JOBS = int(os.environ.get("COUNTERPRESS_MAX_JOBS", "2"))
+FINISHED_TTL_S = 3600
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """A unit of background work; the task reports progress and checks for cancellation through it."""
+
+    def __init__(self, job_id, name):
+        self.id = job_id
+        self.name = name
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def report(self, progress, message=None):
+        """Called by the task; raises JobCancelled if the job was cancelled meanwhile."""
+        self.progress = min(max(float(progress), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+        if self.cancelled:
+            raise JobCancelled()
+
+
+class JobQueue:
+    def __init__(self, max_workers=DEFAULT_MAX_JOBS):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="counterpress-job")
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, name, fn, *args, **kwargs):
+        """Queue fn(*args, job=job, **kwargs) and return the job id."""
+        with self._lock:
+            self._prune()
+            job = Job(next(self._ids), name)
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        # Bajo el lock de la cola: _run no puede pasar la tarea a RUNNING entre la comprobación y el cambio
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.done:
+                return False
+            job._cancel.set()
+            if job.status == QUEUED:
+                self._finish(job, CANCELLED)
+            return True
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def active(self):
+        return [j for j in self.jobs() if not j.done]
+
+    def _run(self, job, fn, args, kwargs):
+        with self._lock:
+            if job.status != QUEUED:  # cancelada mientras esperaba en el pool
+                return
+            job.status = RUNNING
+        try:
+            job.result = fn(*args, job=job, **kwargs)
+        except JobCancelled:
+            status = CANCELLED
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            status = FAILED
+        else:
+            job.progress = 1.0
+            status = DONE
+        with self._lock:
+            self._finish(job, status)
+
+    def _finish(self, job, status):
+        # Con self._lock tomado
+        job.status = status
+        job.finished = time.time()
+
+    def _prune(self):
+        now = time.time()
+        for job_id in [j.id for j in self._jobs.values() if j.done and now - j.finished > FINISHED_TTL_S]:
+            del self._jobs[job_id]
+
+
+_shared_queue = None
+_shared_lock = threading.Lock()
+
+
+def get_job_queue():
+    global _shared_queue
+    with _shared_lock:
+        if _shared_queue is None:
+            _shared_queue = JobQueue()
+        return _shared_queue
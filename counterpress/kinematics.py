@@ -0,0 +1,226 @@
+# kinematics.py
+# Cinemática por partido a partir de las trayectorias densas: velocidad y aceleración suavizadas de
+# cada jugador y del balón, distancia al balón y velocidad de cierre hacia él: la componente de la
+# velocidad del jugador en dirección al balón (positiva cuando corre hacia él; no incluye el
+# movimiento del balón, que con un pase domina la distancia). Los frames guardados son dispersos,
+# así que las derivadas usan el tiempo real entre muestras: para cada muestra, la diferencia entre
+# la primera y la última muestra del mismo slot y la misma parte dentro de ±SMOOTH_S/2 (como mínimo
+# las vecinas), todo con un único searchsorted sobre el partido entero. Se cachean en
+# cache/kinematics/<match_id>/ (shared.py).
+#
+#   python -m counterpress.kinematics [--workers N] [match_id ...]
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .cache import get_match_cache
+from .config import CACHE_FOLDER, FPS, FREEZE_FOLDER
+from .freeze import freeze_path
+from .shared import SharedArrays
+from .spatial import ball_distances
+from .trajectories import TrajectoryStore
+
+KINEMATICS_FOLDER = os.path.join(CACHE_FOLDER, "kinematics")
+# Sube cuando cambia el cálculo, para reconstruir las entradas de cache/kinematics/
+KINEMATICS_LAYOUT = 1
+SMOOTH_S = 0.5     # s, ventana centrada de las derivadas
+MAX_SPAN_S = 1.0   # s, sin derivada si las muestras que la definen están más separadas
+ARRAYS = ["frames", "player_ids", "velocity", "acceleration", "ball_velocity", "ball_dist", "closing_speed"]
+
+
+def derivative(values, valid, frames, period, smooth_s=SMOOTH_S, max_span_s=MAX_SPAN_S):
+    """Smoothed time derivative of values [n_frames, n_slots, 2] along the (sparse) frames.
+
+    Returns (derivative, defined): NaN / False where the slot is missing, alone in its
+    window, or its neighbours are more than `max_span_s` apart.
+    """
+    values = np.asarray(values)
+    out = np.full(values.shape, np.nan, dtype=values.dtype)
+    defined = np.zeros(valid.shape, dtype=bool)
+    si, fi = np.nonzero(np.asarray(valid).T)  # orden slot-mayor, frames crecientes dentro de cada slot
+    if len(fi) == 0:
+        return out, defined
+
+    # Una sola línea de tiempo: cada (slot, parte) queda separado del siguiente por más que max_span_s
+    t = np.asarray(frames, dtype=np.float64) / FPS
+    period = np.asarray(period, dtype=np.int64)
+    offset = t.max() - t.min() + 2 * max_span_s + 1
+    segment = si * (period.max() + 1) + period[fi]
+    key = segment * offset + (t[fi] - t.min())
+
+    half = smooth_s / 2
+    i = np.arange(len(key))
+    lo = np.searchsorted(key, key - half, side="left")
+    hi = np.searchsorted(key, key + half, side="right") - 1
+    # Con muestras más espaciadas que la ventana, al menos las vecinas (si están a tiempo)
+    prev = np.maximum(i - 1, 0)
+    nxt = np.minimum(i + 1, len(key) - 1)
+    lo = np.where(key - key[prev] <= max_span_s, np.minimum(lo, prev), lo)
+    hi = np.where(key[nxt] - key <= max_span_s, np.maximum(hi, nxt), hi)
+
+    dt = key[hi] - key[lo]
+    ok = (dt > 0) & (dt <= max_span_s)
+    delta = values[fi[hi], si[hi]] - values[fi[lo], si[lo]]
+    out[fi[ok], si[ok]] = delta[ok] / dt[ok, None]
+    defined[fi[ok], si[ok]] = True
+    return out, defined
+
+
+def closing_speeds(xy, ball, velocity):
+    """Speed of each slot towards the ball of its frame, m/s (negative when moving away)."""
+    to_ball = np.asarray(ball, dtype=float)[:, None] - np.asarray(xy, dtype=float)
+    dist = np.hypot(to_ball[..., 0], to_ball[..., 1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (to_ball * np.asarray(velocity, dtype=float)).sum(axis=-1) / dist
+
+
+def slot_closing_speeds(trajectories, slots):
+    """closing_speeds of a few slots only, [n_frames, len(slots)]: what the pipeline needs per match."""
+    xy, valid = trajectories.xy[:, slots], trajectories.valid[:, slots]
+    velocity, _ = derivative(xy, valid, trajectories.frames, trajectories.period)
+    return closing_speeds(xy, trajectories.ball, velocity)
+
+
+class Kinematics:
+    """Per-frame motion of a match, aligned with its Trajectories (same frames and slots).
+
+    `velocity[i, s]` / `acceleration[i, s]` are in m/s and m/s² (NaN where undefined);
+    `ball_dist[i, s]` and `closing_speed[i, s]` relate slot `s` to the ball at `frames[i]`.
+    """
+
+    def __init__(self, match_id, frames, player_ids, velocity, acceleration, ball_velocity, ball_dist,
+                 closing_speed):
+        self.match_id = match_id
+        self.frames = frames
+        self.player_ids = player_ids
+        self.velocity = velocity
+        self.acceleration = acceleration
+        self.ball_velocity = ball_velocity
+        self.ball_dist = ball_dist
+        self.closing_speed = closing_speed
+
+    @classmethod
+    def from_trajectories(cls, trajectories, dtype=np.float32):
+        """Compute every array from a Trajectories in one pass (the ball as an extra slot)."""
+        xy = np.concatenate([trajectories.xy, trajectories.ball[:, None]], axis=1).astype(dtype)
+        valid = np.concatenate([trajectories.valid, trajectories.ball_valid[:, None]], axis=1)
+        velocity, has_velocity = derivative(xy, valid, trajectories.frames, trajectories.period)
+        acceleration, _ = derivative(velocity, has_velocity, trajectories.frames, trajectories.period)
+        velocity, ball_velocity = velocity[:, :-1], velocity[:, -1]
+        return cls(
+            trajectories.match_id, trajectories.frames, trajectories.player_ids, velocity,
+            acceleration[:, :-1],
+            ball_velocity,
+            ball_distances(trajectories.xy, trajectories.ball).astype(dtype),
+            closing_speeds(trajectories.xy, trajectories.ball, velocity).astype(dtype),
+        )
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def nbytes(self):
+        return int(sum(getattr(self, name).nbytes for name in ARRAYS))
+
+    @property
+    def speed(self):
+        return np.hypot(self.velocity[..., 0], self.velocity[..., 1])
+
+    def slot(self, player_id):
+        """Slot of a player, or None if they never appear in the match."""
+        s = np.searchsorted(self.player_ids, player_id)
+        if s < len(self.player_ids) and self.player_ids[s] == player_id:
+            return int(s)
+        return None
+
+    def row_velocities(self, frames, player_ids, is_ball):
+        """Velocity [n_rows, 2] of long-format rows (frame, player_id, is_ball), NaN where unknown."""
+        frames = np.asarray(frames)
+        player_ids = np.asarray(player_ids)
+        is_ball = np.asarray(is_ball, dtype=bool)
+        fi = np.minimum(np.searchsorted(self.frames, frames), max(len(self.frames) - 1, 0))
+        si = np.minimum(np.searchsorted(self.player_ids, player_ids), max(len(self.player_ids) - 1, 0))
+        out = np.full((len(frames), 2), np.nan)
+        if len(self.frames) == 0:
+            return out
+        has_frame = self.frames[fi] == frames
+        ball = has_frame & is_ball
+        out[ball] = self.ball_velocity[fi[ball]]
+        if len(self.player_ids):
+            player = has_frame & ~is_ball & (self.player_ids[si] == player_ids)
+            out[player] = self.velocity[fi[player], si[player]]
+        return out
+
+
+def with_velocities(df, kinematics):
+    """Copy of freeze rows (frame, player_id, is_ball...) with vx, vy and speed columns."""
+    v = kinematics.row_velocities(df["frame"].to_numpy(), df["player_id"].to_numpy(), df["is_ball"].to_numpy())
+    return df.assign(vx=v[:, 0], vy=v[:, 1], speed=np.hypot(v[:, 0], v[:, 1]))
+
+
+class KinematicsStore:
+    """Kinematics per match: computed once from the trajectories, then memory-mapped.
+
+    Entries are rebuilt when the freeze file changes; the mapped arrays are kept in the shared
+    LRU cache next to the FreezeStore tables.
+    """
+
+    def __init__(self, freeze_folder=FREEZE_FOLDER, folder=KINEMATICS_FOLDER, cache=None, trajectory_store=None,
+                 mmap_mode="r"):
+        self.freeze_folder = freeze_folder
+        self.folder = folder
+        self.cache = cache or get_match_cache()
+        self.trajectory_store = trajectory_store or TrajectoryStore(freeze_folder, cache=self.cache)
+        self.shared = SharedArrays(folder, mmap_mode)
+
+    def load(self, match_id):
+        source_mtime = os.stat(freeze_path(match_id, self.freeze_folder)).st_mtime_ns
+        key = (match_id, "kinematics", source_mtime)
+        return self.cache.get_or_load(key, lambda: self._open(match_id, source_mtime))
+
+    def invalidate(self, match_id):
+        """Drop the match from the shared folder and from this process's cache."""
+        self.shared.invalidate(match_id)
+        self.cache.invalidate(match_id)
+
+    def _open(self, match_id, source_mtime):
+        path = freeze_path(match_id, self.freeze_folder)
+        signature = [KINEMATICS_LAYOUT, os.path.abspath(path), source_mtime]
+        arrays, _ = self.shared.open(match_id, signature, lambda: (self._build(match_id), {}))
+        return Kinematics(match_id, *(arrays[name] for name in ARRAYS))
+
+    def _build(self, match_id):
+        kinematics = Kinematics.from_trajectories(self.trajectory_store.load(match_id))
+        return {name: getattr(kinematics, name) for name in ARRAYS}
+
+
+def _precompute(match_id, freeze_folder):
+    start = time.perf_counter()
+    KinematicsStore(freeze_folder).load(match_id)
+    return match_id, time.perf_counter() - start
+
+
+def main(argv=None):
+    from .pipeline import list_matches
+
+    parser = argparse.ArgumentParser(description="Precompute per-match kinematics into cache/kinematics/.")
+    parser.add_argument("matches", nargs="*", type=int, help="match ids (default: every match)")
+    parser.add_argument("--freeze", default=FREEZE_FOLDER)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per core)")
+    args = parser.parse_args(argv)
+
+    match_ids = args.matches or list_matches(args.freeze)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        timings = list(pool.map(_precompute, match_ids, [args.freeze] * len(match_ids)))
+    slowest = max(timings, key=lambda t: t[1], default=(None, 0.0))
+    print(f"{len(match_ids)} matches in {time.perf_counter() - start:.1f}s "
+          f"(slowest: {slowest[0]} {slowest[1] * 1000:.0f}ms)")
+
+
+if __name__ == "__main__":
+    main()
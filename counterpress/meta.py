@@ -0,0 +1,196 @@
+# meta.py
+# Lectura de meta/<match_id>.json e índice de metadatos
+
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from .config import CACHE_FOLDER, META_FOLDER, TEAM_ID
+
+
+def meta_path(match_id, folder=META_FOLDER):
+    return os.path.join(folder, f"{match_id}.json")
+
+
+def load_meta(match_id, folder=META_FOLDER):
+    with open(meta_path(match_id, folder), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def team_attacks_left_to_right(meta, period, team_id=TEAM_ID):
+    # home_team_side[period - 1] es la dirección de ataque del local en ese periodo
+    sides = meta.get("home_team_side") or ["left_to_right", "right_to_left"]
+    home_ltr = sides[min(period, len(sides)) - 1] == "left_to_right"
+    return home_ltr if meta["home_team"]["id"] == team_id else not home_ltr
+
+
+def final_game_state(meta, team_id=TEAM_ID):
+    home, away = meta["home_team_score"], meta["away_team_score"]
+    diff = home - away if meta["home_team"]["id"] == team_id else away - home
+    return "winning" if diff > 0 else "losing" if diff < 0 else "drawing"
+
+
+# === Metadata index ===
+# Una tabla de partidos y una de jugadores (formato largo) construidas una vez desde meta/ y
+# guardadas en cache/; solo se reconstruyen cuando cambia algún json.
+INDEX_FOLDER = os.path.join(CACHE_FOLDER, "meta_index")
+CHECK_INTERVAL_S = 2.0  # s, get_meta_index no vuelve a escanear meta/ antes de este intervalo
+
+
+def _source_signature(folder):
+    signature = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            name, ext = os.path.splitext(entry.name)
+            if ext == ".json" and name.isdigit():
+                signature[name] = entry.stat().st_mtime_ns
+    return signature
+
+
+def _match_row(meta):
+    home, away = meta["home_team"], meta["away_team"]
+    home_kit, away_kit = meta["home_team_kit"], meta["away_team_kit"]
+    sides = meta.get("home_team_side") or ["left_to_right", "right_to_left"]
+    return {
+        "match_id": int(meta["id"]),
+        "date": (meta.get("date_time") or "")[:10],
+        "home_team_id": home["id"],
+        "home_team": home["short_name"],
+        "away_team_id": away["id"],
+        "away_team": away["short_name"],
+        "home_score": meta["home_team_score"],
+        "away_score": meta["away_team_score"],
+        "pitch_length": meta["pitch_length"],
+        "pitch_width": meta["pitch_width"],
+        "home_jersey_color": home_kit["jersey_color"],
+        "home_number_color": home_kit["number_color"],
+        "away_jersey_color": away_kit["jersey_color"],
+        "away_number_color": away_kit["number_color"],
+        "home_side_first_half": sides[0],
+    }
+
+
+def _player_rows(meta):
+    kits = {
+        meta["home_team"]["id"]: (meta["home_team"]["short_name"], meta["home_team_kit"]),
+        meta["away_team"]["id"]: (meta["away_team"]["short_name"], meta["away_team_kit"]),
+    }
+    rows = []
+    for p in meta["players"]:
+        team_name, kit = kits.get(p["team_id"], ("", {}))
+        rows.append({
+            "match_id": int(meta["id"]),
+            "player_id": p["id"],
+            "team_id": p["team_id"],
+            "team_short_name": team_name,
+            "jersey_number": p.get("number"),
+            "short_name": p.get("short_name"),
+            "jersey_color": kit.get("jersey_color"),
+            "number_color": kit.get("number_color"),
+        })
+    return rows
+
+
+class MetaIndex:
+    """In-memory lookups over the matches and players tables."""
+
+    def __init__(self, matches, players):
+        self.matches = matches.set_index("match_id", drop=False).sort_index()
+        self.players = players
+        self._players_by_match = {m: g.reset_index(drop=True) for m, g in players.groupby("match_id")}
+
+    def __contains__(self, match_id):
+        return match_id in self.matches.index
+
+    def match(self, match_id):
+        return self.matches.loc[match_id]
+
+    def match_label(self, match_id):
+        if match_id not in self:
+            return f"{match_id} (missing meta)"
+        m = self.matches.loc[match_id]
+        return f"{m['date']} - {m['home_team']} {m['home_score']}–{m['away_score']} {m['away_team']}"
+
+    def pitch_dims(self, match_id):
+        m = self.matches.loc[match_id]
+        return m["pitch_length"], m["pitch_width"]
+
+    def default_pitch_dims(self):
+        """Most common (pitch_length, pitch_width) across matches."""
+        dims = self.matches[["pitch_length", "pitch_width"]].value_counts()
+        return dims.index[0] if len(dims) else (105, 68)
+
+    def players_for(self, match_id):
+        return self._players_by_match.get(match_id, self.players.iloc[0:0])
+
+
+def build_meta_index(folder=META_FOLDER):
+    matches, players = [], []
+    for name in sorted(_source_signature(folder)):
+        meta = load_meta(name, folder)
+        matches.append(_match_row(meta))
+        players.extend(_player_rows(meta))
+    return pd.DataFrame(matches), pd.DataFrame(players)
+
+
+def load_meta_index(folder=META_FOLDER, index_folder=INDEX_FOLDER):
+    """Read the persisted index, rebuilding it first if any meta JSON was added, removed or changed."""
+    signature = _source_signature(folder)
+    signature_path = os.path.join(index_folder, "signature.json")
+    matches_path = os.path.join(index_folder, "matches.parquet")
+    players_path = os.path.join(index_folder, "players.parquet")
+
+    try:
+        with open(signature_path, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        stored = None
+    if stored == {"folder": os.path.abspath(folder), "files": signature}:
+        return MetaIndex(pd.read_parquet(matches_path), pd.read_parquet(players_path))
+
+    matches, players = build_meta_index(folder)
+    os.makedirs(index_folder, exist_ok=True)
+    # Cada fichero se escribe aparte y se sustituye de golpe. La firma vieja se quita antes y la
+    # nueva se publica la última, así nadie la ve válida junto a tablas a medio escribir
+    if stored is not None:
+        os.remove(signature_path)
+    _replace(matches_path, lambda path: matches.to_parquet(path, index=False))
+    _replace(players_path, lambda path: players.to_parquet(path, index=False))
+
+    def write_signature(path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"folder": os.path.abspath(folder), "files": signature}, f)
+    _replace(signature_path, write_signature)
+    return MetaIndex(matches, players)
+
+
+def _replace(path, write):
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+_shared_index = None
+_shared_signature = None
+_shared_checked = 0.0
+_shared_lock = threading.Lock()
+
+
+def get_meta_index(folder=META_FOLDER, refresh=False):
+    """Process-wide index; meta/ is re-checked at most every CHECK_INTERVAL_S, or now with `refresh`."""
+    global _shared_index, _shared_signature, _shared_checked
+    folder = os.path.abspath(folder)
+    with _shared_lock:
+        now = time.monotonic()
+        if (not refresh and _shared_index is not None and _shared_signature[0] == folder
+                and now - _shared_checked < CHECK_INTERVAL_S):
+            return _shared_index
+        signature = (folder, _source_signature(folder))
+        if _shared_index is None or _shared_signature != signature:
+            _shared_index = load_meta_index(folder)
+            _shared_signature = signature
+        _shared_checked = now
+        return _shared_index
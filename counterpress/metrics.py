@@ -0,0 +1,50 @@
+# metrics.py
+# Métricas de comparación por jugador en una sola pasada vectorizada
+
+import numpy as np
+import pandas as pd
+
+COMPARISON_COLUMNS = [
+    "Total_Losses", "Participated",
+    "Recovery_With_Participation", "Recovery_Without_Participation",
+    "Avg_Recovery_Time_With_Participation", "Avg_Recovery_Time_Without_Participation",
+]
+
+
+def comparison_metrics(df, by="player_tracked"):
+    """Per-group comparison metrics from masked sums and counts (no per-group lambdas).
+
+    `by` can be any column or list of columns, e.g. ["player_tracked", "match_id"].
+    """
+    involved = df["player_involved_in_counterpress"].to_numpy(bool)
+    recovered = df["recovered_in_5s"].to_numpy(bool)
+    recovery_time = df["recovery_time"].to_numpy(float)
+    keys = [by] if isinstance(by, str) else list(by)
+
+    rt_with = involved & recovered & ~np.isnan(recovery_time)
+    rt_without = ~involved & recovered & ~np.isnan(recovery_time)
+    parts = pd.DataFrame({
+        "near": df["player_near_loss"].to_numpy(bool),
+        "involved": involved,
+        "not_involved": ~involved,
+        "rec_with": involved & recovered,
+        "rec_without": ~involved & recovered,
+        "rt_with_sum": np.where(rt_with, recovery_time, 0.0),
+        "rt_with_n": rt_with,
+        "rt_without_sum": np.where(rt_without, recovery_time, 0.0),
+        "rt_without_n": rt_without,
+    })
+    for key in keys:
+        parts[key] = df[key].to_numpy()
+    sums = parts.groupby(keys, sort=True).sum()
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = pd.DataFrame({
+            "Total_Losses": sums["near"],
+            "Participated": sums["involved"],
+            "Recovery_With_Participation": sums["rec_with"] / sums["involved"],
+            "Recovery_Without_Participation": sums["rec_without"] / sums["not_involved"],
+            "Avg_Recovery_Time_With_Participation": sums["rt_with_sum"] / sums["rt_with_n"],
+            "Avg_Recovery_Time_Without_Participation": sums["rt_without_sum"] / sums["rt_without_n"],
+        })
+    return out.replace([np.inf, -np.inf], np.nan)[COMPARISON_COLUMNS]
@@ -0,0 +1,289 @@
+# pipeline.py
+# Genera csv/counterpress_analysis_all.csv a partir de freeze/ y meta/
+#
+#   python -m counterpress.pipeline [--workers N] [--force] [--out csv/counterpress_analysis_all.csv]
+#
+# Cada partido se procesa en un proceso aparte y deja su resultado en csv/partials/<match_id>.parquet;
+# los partidos cuyo parcial es más reciente que su parquet y su json no se vuelven a procesar.
+
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from .aggregates import AGGREGATES_FOLDER, write_cubes
+from .analysis import TABLE_FOLDER, apply_types, write_table
+from .compact import EXTENSION as COMPACT_EXTENSION
+from .config import CSV_PATH, FPS, FREEZE_FOLDER, META_FOLDER, PARTIALS_FOLDER, PLAYER_IDS, TEAM_ID
+from .freeze import freeze_path, read_frames
+from .kinematics import slot_closing_speeds
+from .meta import final_game_state, load_meta, meta_path, team_attacks_left_to_right
+from .spatial import OPPONENT, TEAM, SpatialQuery, window_min
+from .trajectories import TRAJECTORY_COLUMNS, Trajectories
+
+# === Definitions ===
+POSSESSION_RADIUS = 1.5   # m, el jugador más cercano al balón dentro de este radio lo controla
+MAX_LOSS_GAP_S = 3.0      # s, máximo entre el último control propio y el primer control rival
+RECOVERY_WINDOW_S = 5.0   # s, ventana de recuperación tras la pérdida
+NEAR_RADIUS = 15.0        # m, jugador "cerca" del balón en el frame de la pérdida
+PRESS_RADIUS = 3.0        # m, jugador "involucrado" si llega a esta distancia dentro de la ventana
+
+GOAL_AREA_HALF_WIDTH = 9.16
+PENALTY_AREA_HALF_WIDTH = 20.16
+
+CONTROL_NONE, CONTROL_TEAM, CONTROL_OPP = 0, 1, 2
+
+ANALYSIS_COLUMNS = [
+    "match_id", "player_tracked", "frame_loss", "x_loss", "y_loss",
+    "player_near_loss", "player_involved_in_counterpress", "recovered_in_5s",
+    "recovery_time", "third_start", "channel_start", "game_state", "max_closing_speed",
+]
+
+
+class MatchTracking:
+    """Per-frame arrays of one match: ball position, team in control and tracked-player distances.
+
+    Built from the dense Trajectories of the match through a spatial.SpatialQuery; all arrays
+    are indexed by position in `frames` (the sorted unique frame numbers).
+    """
+
+    def __init__(self, trajectories, meta, player_ids=PLAYER_IDS, team_id=TEAM_ID):
+        n = len(trajectories)
+        self.frames = np.asarray(trajectories.frames)
+        self.period = np.asarray(trajectories.period, dtype=np.int64)
+        self.ball = np.asarray(trajectories.ball, dtype=float)
+
+        # Distancias al balón calculadas una vez para todo el partido (NaN si falta el jugador o el balón)
+        self.query = SpatialQuery.from_meta(trajectories, meta, team_id)
+        d_own = self.query.side_min(TEAM)
+        d_opp = self.query.side_min(OPPONENT)
+        closest = np.minimum(d_own, d_opp)
+        self.control = np.where(closest <= POSSESSION_RADIUS,
+                                np.where(d_own <= d_opp, CONTROL_TEAM, CONTROL_OPP),
+                                CONTROL_NONE)
+
+        tracked = [p for p in player_ids if trajectories.slot(p) is not None]
+        series = self.query.distance_series(tracked)
+        self.player_dist = {player_id: series[player_id].to_numpy() for player_id in tracked}
+
+    def losses(self, max_gap_s=MAX_LOSS_GAP_S):
+        """Frame indices where control passes from the team to the opponent."""
+        idx = np.flatnonzero(self.control != CONTROL_NONE)
+        team = self.control[idx]
+        prev, cur = idx[:-1], idx[1:]
+        is_loss = (
+            (team[:-1] == CONTROL_TEAM) & (team[1:] == CONTROL_OPP)
+            & (self.period[prev] == self.period[cur])
+            & (self.frames[cur] - self.frames[prev] <= max_gap_s * FPS)
+        )
+        return cur[is_loss]
+
+    def recoveries(self, loss_idx):
+        """Seconds until the team next controls the ball in the same period (NaN if never)."""
+        own_idx = np.flatnonzero(self.control == CONTROL_TEAM)
+        if len(own_idx) == 0:
+            return np.full(len(loss_idx), np.nan)
+        nxt = np.searchsorted(own_idx, loss_idx, side="right")
+        has_next = nxt < len(own_idx)
+        rec_idx = own_idx[np.minimum(nxt, len(own_idx) - 1)]
+        dt = (self.frames[rec_idx] - self.frames[loss_idx]) / FPS
+        same_period = self.period[rec_idx] == self.period[loss_idx]
+        return np.where(has_next & same_period, dt, np.nan)
+
+
+def classify_zones(x, y, attacks_ltr, pitch_length):
+    # Coordenadas en dirección de ataque del equipo: +x hacia la portería rival, +y a la izquierda
+    sign = np.where(attacks_ltr, 1.0, -1.0)
+    x_att, y_att = x * sign, y * sign
+    third = np.select(
+        [x_att < -pitch_length / 6, x_att > pitch_length / 6],
+        ["defensive_third", "attacking_third"], "middle_third")
+    channel = np.select(
+        [y_att > PENALTY_AREA_HALF_WIDTH, y_att > GOAL_AREA_HALF_WIDTH,
+         y_att < -PENALTY_AREA_HALF_WIDTH, y_att < -GOAL_AREA_HALF_WIDTH],
+        ["wide_left", "half_space_left", "wide_right", "half_space_right"], "center")
+    return third, channel
+
+
+def on_pitch_losses(dist, loss_idx):
+    """Mask of the losses between the player's first and last tracked frame (dist not NaN)."""
+    present = np.flatnonzero(np.isfinite(dist))
+    if present.size == 0:
+        return np.zeros(len(loss_idx), dtype=bool)
+    return (loss_idx >= present[0]) & (loss_idx <= present[-1])
+
+
+def match_losses(tracking, meta):
+    """One row per possession loss of the team, before expanding per tracked player."""
+    loss_idx = tracking.losses()
+    recovery = tracking.recoveries(loss_idx)
+    recovered = recovery <= RECOVERY_WINDOW_S
+    x_loss, y_loss = tracking.ball[loss_idx, 0], tracking.ball[loss_idx, 1]
+    periods = tracking.period[loss_idx]
+    attacks_ltr = np.array([team_attacks_left_to_right(meta, p) for p in periods], dtype=bool)
+    third, channel = classify_zones(x_loss, y_loss, attacks_ltr, meta["pitch_length"])
+    return pd.DataFrame({
+        "loss_idx": loss_idx,
+        "frame_loss": tracking.frames[loss_idx],
+        "x_loss": x_loss,
+        "y_loss": y_loss,
+        "recovered_in_5s": recovered,
+        "recovery_time": np.where(recovered, recovery, np.nan),
+        "third_start": third,
+        "channel_start": channel,
+        "game_state": final_game_state(meta),
+    })
+
+
+def analyze_match(match_id, freeze_folder=FREEZE_FOLDER, meta_folder=META_FOLDER):
+    meta = load_meta(match_id, meta_folder)
+    df = read_frames(freeze_path(match_id, freeze_folder), columns=TRAJECTORY_COLUMNS)
+    # float64 para que x_loss / y_loss salgan idénticos a las coordenadas del parquet
+    trajectories = Trajectories.from_frames(match_id, df, dtype=np.float64)
+    tracking = MatchTracking(trajectories, meta)
+    tracked = list(tracking.player_dist)
+    closing_speed = slot_closing_speeds(trajectories, [trajectories.slot(p) for p in tracked])
+    losses = match_losses(tracking, meta)
+    loss_idx = losses["loss_idx"].to_numpy()
+
+    # La ventana de presión termina al recuperar o a los 5 s
+    window_s = np.fmin(losses["recovery_time"].to_numpy(), RECOVERY_WINDOW_S)
+    ends = np.searchsorted(tracking.frames, tracking.frames[loss_idx] + window_s * FPS, side="right")
+    # La velocidad de cierre se mira en los 5 s completos, haya recuperación o no
+    ends_5s = np.searchsorted(tracking.frames, tracking.frames[loss_idx] + RECOVERY_WINDOW_S * FPS, side="right")
+
+    rows = []
+    for player_id, dist in tracking.player_dist.items():
+        # Solo pérdidas mientras el jugador estaba en el campo
+        on_pitch = on_pitch_losses(dist, loss_idx)
+        if not on_pitch.any():
+            continue
+        player_rows = losses[on_pitch].copy()
+        player_rows["player_tracked"] = PLAYER_IDS[player_id]
+        player_rows["player_near_loss"] = dist[loss_idx[on_pitch]] <= NEAR_RADIUS
+        # El frame de la pérdida no cuenta: buscamos la reacción posterior
+        closest = window_min(dist, loss_idx[on_pitch] + 1, ends[on_pitch])
+        player_rows["player_involved_in_counterpress"] = closest <= PRESS_RADIUS
+        # Lo más rápido que corrió hacia el balón en los 5 s siguientes (kinematics.py)
+        closing = closing_speed[:, tracked.index(player_id)]
+        player_rows["max_closing_speed"] = -window_min(-closing, loss_idx[on_pitch] + 1, ends_5s[on_pitch])
+        rows.append(player_rows)
+
+    if not rows:
+        return pd.DataFrame(columns=ANALYSIS_COLUMNS)
+    out = pd.concat(rows, ignore_index=True)
+    out["match_id"] = match_id
+    return out[ANALYSIS_COLUMNS]
+
+
+def list_matches(freeze_folder=FREEZE_FOLDER, meta_folder=META_FOLDER):
+    match_ids = set()
+    for pattern in ("*.parquet", f"*{COMPACT_EXTENSION}"):
+        for path in glob.glob(os.path.join(freeze_folder, pattern)):
+            name = os.path.splitext(os.path.basename(path))[0]
+            if name.isdigit() and os.path.exists(os.path.join(meta_folder, f"{name}.json")):
+                match_ids.add(int(name))
+    return sorted(match_ids)
+
+
+def partial_path(match_id, partials_folder=PARTIALS_FOLDER):
+    return os.path.join(partials_folder, f"{match_id}.parquet")
+
+
+def partial_is_fresh(match_id, freeze_folder=FREEZE_FOLDER, meta_folder=META_FOLDER,
+                     partials_folder=PARTIALS_FOLDER):
+    path = partial_path(match_id, partials_folder)
+    if not os.path.exists(path):
+        return False
+    sources = [freeze_path(match_id, freeze_folder), meta_path(match_id, meta_folder)]
+    if os.path.getmtime(path) <= max(os.path.getmtime(p) for p in sources):
+        return False
+    # Un parcial escrito antes de añadir columnas a la tabla también hay que rehacerlo
+    return set(ANALYSIS_COLUMNS) <= set(pq.read_schema(path).names)
+
+
+def process_match(match_id, freeze_folder=FREEZE_FOLDER, meta_folder=META_FOLDER,
+                  partials_folder=PARTIALS_FOLDER):
+    df = analyze_match(match_id, freeze_folder, meta_folder)
+    path = partial_path(match_id, partials_folder)
+    tmp_path = f"{path}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)  # un parcial a medio escribir nunca cuenta como hecho
+    return match_id, len(df)
+
+
+def build_partials(match_ids, freeze_folder=FREEZE_FOLDER, meta_folder=META_FOLDER,
+                   partials_folder=PARTIALS_FOLDER, workers=None, force=False):
+    """Run stale matches across a process pool, one match per task. Returns the processed ids."""
+    os.makedirs(partials_folder, exist_ok=True)
+    todo = [m for m in match_ids
+            if force or not partial_is_fresh(m, freeze_folder, meta_folder, partials_folder)]
+    if not todo:
+        return []
+    if workers == 1 or len(todo) == 1:
+        for m in todo:
+            process_match(m, freeze_folder, meta_folder, partials_folder)
+        return todo
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(process_match, m, freeze_folder, meta_folder, partials_folder) for m in todo]
+        for future in as_completed(futures):
+            future.result()
+    return todo
+
+
+def merge_partials(match_ids, partials_folder=PARTIALS_FOLDER):
+    parts = [pd.read_parquet(partial_path(m, partials_folder)) for m in match_ids]
+    parts = [p for p in parts if len(p)]
+    if not parts:
+        return pd.DataFrame(columns=ANALYSIS_COLUMNS)
+    return sort_analysis(pd.concat(parts, ignore_index=True)[ANALYSIS_COLUMNS])
+
+
+def build_analysis(match_ids=None, freeze_folder=FREEZE_FOLDER, meta_folder=META_FOLDER,
+                   partials_folder=PARTIALS_FOLDER, workers=None, force=False):
+    if match_ids is None:
+        match_ids = list_matches(freeze_folder, meta_folder)
+    processed = build_partials(match_ids, freeze_folder, meta_folder, partials_folder, workers, force)
+    return merge_partials(match_ids, partials_folder), processed
+
+
+def sort_analysis(df):
+    return df.sort_values(["player_tracked", "match_id", "frame_loss"], kind="stable").reset_index(drop=True)
+
+
+def write_analysis(df, out_path=CSV_PATH):
+    out_folder = os.path.dirname(out_path) or "."
+    os.makedirs(out_folder, exist_ok=True)
+    # Primero el parquet particionado que leen las páginas; el CSV al final marca la nueva versión
+    write_table(df, os.path.join(out_folder, os.path.basename(TABLE_FOLDER)))
+    write_cubes(apply_types(df), os.path.join(out_folder, os.path.basename(AGGREGATES_FOLDER)))
+    tmp_path = f"{out_path}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, out_path)  # las páginas nunca leen una tabla a medio escribir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the counterpress analysis table.")
+    parser.add_argument("--freeze", default=FREEZE_FOLDER)
+    parser.add_argument("--meta", default=META_FOLDER)
+    parser.add_argument("--out", default=CSV_PATH)
+    parser.add_argument("--partials", default=PARTIALS_FOLDER)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per core)")
+    parser.add_argument("--force", action="store_true", help="reprocess matches with fresh partials")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    df, processed = build_analysis(freeze_folder=args.freeze, meta_folder=args.meta,
+                                   partials_folder=args.partials, workers=args.workers, force=args.force)
+    write_analysis(df, args.out)
+    print(f"{len(processed)} matches processed, {len(df)} rows from {df['match_id'].nunique()} matches "
+          f"-> {args.out} ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# prefetch.py
+# Prefetch del visor: mientras el analista mira una pérdida, un pool pequeño de hilos deja listas las
+# vistas de las demás pérdidas del partido (empezando por las siguientes) y calienta el siguiente
+# partido de la lista. Cada sesión tiene un solo lote activo; si cambia la selección se cancela.
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .scrub import cached_loss_view
+
+DEFAULT_PREFETCH_WORKERS = int(os.environ.get("COUNTERPRESS_PREFETCH_WORKERS", "2"))
+
+
+class Prefetch:
+    """A scheduled batch of warm-up tasks for one viewer selection (`key`)."""
+
+    def __init__(self, key, total):
+        self.key = key
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._futures = []
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def finished(self):
+        return self.cancelled or self.done + self.failed >= self.total
+
+    def cancel(self):
+        self._cancel.set()
+        for future in self._futures:
+            future.cancel()
+
+
+class Prefetcher:
+    """Process-wide thread pool running the Prefetch batches of every session."""
+
+    def __init__(self, max_workers=DEFAULT_PREFETCH_WORKERS):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="counterpress-prefetch")
+
+    def schedule(self, key, tasks, previous=None):
+        """Run `tasks` (callables, in order) unless `previous` already covers `key`.
+
+        A previous batch for another key is cancelled: its queued tasks never start and the
+        running ones are left to finish, since they only fill caches.
+        """
+        if previous is not None and previous.key == key and not previous.cancelled:
+            return previous
+        if previous is not None:
+            previous.cancel()
+        prefetch = Prefetch(key, len(tasks))
+        prefetch._futures = [self._pool.submit(self._run, prefetch, task) for task in tasks]
+        return prefetch
+
+    def _run(self, prefetch, task):
+        if prefetch.cancelled:
+            return
+        try:
+            task()
+        except Exception:
+            # Un fallo aquí solo significa que esa vista se construirá al abrirla
+            with prefetch._lock:
+                prefetch.failed += 1
+        else:
+            with prefetch._lock:
+                prefetch.done += 1
+
+
+def loss_view_tasks(store, meta_index, match_id, frame_losses, frame_loss, padding, player=None, player_id=None,
+                    next_match=None, next_frame_losses=(), kinematics_store=None):
+    """Tasks building the loss views (scrub.cached_loss_view) an analyst is likely to open next.
+
+    First the losses after `frame_loss` in `frame_losses`, then the earlier ones; then
+    `next_match` is loaded and the views of its `next_frame_losses` are built.
+    """
+    frame_losses = sorted(int(f) for f in frame_losses)
+    after = [f for f in frame_losses if f > frame_loss]
+    before = [f for f in frame_losses if f < frame_loss]
+    targets = [(match_id, f) for f in after + before]
+    if next_match is not None and next_match in meta_index:
+        targets += [(next_match, None)] + [(next_match, int(f)) for f in sorted(next_frame_losses)]
+
+    def task(target_match, target_frame):
+        if target_frame is None:
+            return lambda: store.load(target_match)
+        pitch_length, pitch_width = meta_index.pitch_dims(target_match)
+        return lambda: cached_loss_view(store, target_match, target_frame, padding, pitch_length, pitch_width,
+                                        player, player_id, kinematics_store)
+    return [task(m, f) for m, f in targets]
+
+
+_shared_prefetcher = None
+_shared_lock = threading.Lock()
+
+
+def get_prefetcher():
+    global _shared_prefetcher
+    with _shared_lock:
+        if _shared_prefetcher is None:
+            _shared_prefetcher = Prefetcher()
+        return _shared_prefetcher
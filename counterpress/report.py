@@ -0,0 +1,197 @@
+# report.py
+# Reporte offline para el cuerpo técnico: por cada jugador de la tabla, el mismo resumen que las
+# páginas (KPIs, tablas, mapas y tasas) más clips de sus pérdidas, en una sola corrida sin Streamlit.
+#
+#   python -m counterpress.report [--date 2024-05-04 | --matches ID ...] [--players ...] [--clips 3]
+#
+# Deja en output/reports/<fecha|season>/<jugador>/ summary.json, una tabla CSV por dimensión, un PNG
+# por gráfico, summary.pdf con todos los gráficos y clips/ con las animaciones. Jugadores y partidos
+# se reparten entre procesos; cada proceso reutiliza su dataset, su caché de gráficos y sus frames.
+
+import argparse
+import io
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .analysis import list_players
+from .animation import OUTPUT_FOLDER, export_animation, player_slug
+from .charts import chart_key, involved_labels, player_charts
+from .config import FREEZE_FOLDER, META_FOLDER, NAME_TO_ID
+from .dataset import DIMENSION_LABELS, get_dataset
+from .figures import cached_figure
+from .freeze import FreezeStore
+from .meta import get_meta_index
+
+REPORT_FOLDER = os.path.join(OUTPUT_FOLDER, "reports")
+DEFAULT_CLIPS = 3
+DEFAULT_PADDING = 100
+
+
+def matches_on(date, meta_folder=META_FOLDER):
+    """Ids of the matches played on `date` (YYYY-MM-DD)."""
+    matches = get_meta_index(meta_folder).matches
+    return matches.loc[matches["date"] == date, "match_id"].astype(int).tolist()
+
+
+def _number(value):
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+def _write_json(data, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _write_pdf(pngs, path):
+    from PIL import Image
+
+    pages = [Image.open(io.BytesIO(png)).convert("RGB") for png in pngs]
+    if pages:
+        pages[0].save(path, save_all=True, append_images=pages[1:], resolution=200)
+
+
+# === Player summary ===
+def player_summary(player, folder=REPORT_FOLDER, matches=None, meta_folder=META_FOLDER):
+    """Write a player's summary (JSON, tables, charts, PDF) under folder/<player>/; returns its paths."""
+    dataset = get_dataset()
+    players = [player]
+    out = os.path.join(folder, player_slug(player))
+    os.makedirs(out, exist_ok=True)
+
+    meta_index = get_meta_index(meta_folder)
+    if matches is not None and len(matches) == 1 and matches[0] in meta_index:
+        pitch_length, pitch_width = meta_index.pitch_dims(matches[0])
+    else:
+        pitch_length, pitch_width = meta_index.default_pitch_dims()
+
+    kpi = dataset.kpis(players, matches)
+    outcomes = dataset.role_outcomes(players, matches)
+    summary = {
+        "player": player,
+        "matches": None if matches is None else sorted(int(m) for m in matches),
+        "kpis": kpi,
+        "outcomes": {f"{role}_{'recovered' if rec else 'not_recovered'}": n for (role, rec), n in outcomes.items()},
+        "recovery_rate": {"involved": _number(dataset.recovery_rate(True, players, matches)),
+                          "not_involved": _number(dataset.recovery_rate(False, players, matches))},
+        "recovery_time": {"involved": _number(dataset.recovery_time(True, players, matches)),
+                          "not_involved": _number(dataset.recovery_time(False, players, matches))},
+    }
+    paths = [os.path.join(out, "summary.json")]
+    _write_json(summary, paths[0])
+    if not kpi["total"]:
+        return paths
+
+    for dimension in DIMENSION_LABELS:
+        table = dataset.breakdown(dimension, players, matches, involved_labels=involved_labels(player))
+        paths.append(os.path.join(out, f"{dimension}.csv"))
+        table.to_csv(paths[-1])
+
+    # Sin pérdidas con el jugador cerca no hay tasas por dimensión que dibujar
+    charts = player_charts(dataset, player, pitch_length, pitch_width, matches)
+    names = [n for n in charts if kpi["near"] or not n.startswith("rate_by_")]
+    pngs = []
+    for name in names:
+        key = chart_key(name, player, pitch_length, pitch_width, matches)
+        pngs.append(cached_figure(key, dataset.version, charts[name]))
+        paths.append(os.path.join(out, f"{name}.png"))
+        with open(paths[-1], "wb") as f:
+            f.write(pngs[-1])
+    paths.append(os.path.join(out, "summary.pdf"))
+    _write_pdf(pngs, paths[-1])
+    return paths
+
+
+# === Clips ===
+def select_clips(players, matches=None, role="involved", per_match=DEFAULT_CLIPS):
+    """{match_id: [(player, frame_loss), ...]} with the first `per_match` losses of each player per match."""
+    clips = {}
+    if not per_match:
+        return clips
+    for player in players:
+        events = get_dataset().events([player], matches, role, columns=["match_id", "frame_loss"])
+        events = events.sort_values(["match_id", "frame_loss"]).groupby("match_id").head(per_match)
+        for match_id, frame_loss in zip(events["match_id"].astype(int), events["frame_loss"].astype(int)):
+            clips.setdefault(match_id, []).append((player, frame_loss))
+    return clips
+
+
+def match_clips(match_id, clips, folder=REPORT_FOLDER, padding=DEFAULT_PADDING, fmt="gif",
+                freeze_folder=FREEZE_FOLDER, meta_folder=META_FOLDER):
+    """Export a match's clips into folder/<player>/clips/, loading its frames once; returns the paths."""
+    store = FreezeStore(freeze_folder, meta_folder=meta_folder)
+    match_frames = store.load(match_id)
+    pitch_length, pitch_width = get_meta_index(meta_folder).pitch_dims(match_id)
+    source_mtime = store.source_mtime(match_id)
+    paths = []
+    for player, frame_loss in clips:
+        paths.append(export_animation(
+            match_frames.get_window(frame_loss - padding, frame_loss + padding), match_id, frame_loss,
+            padding, player, NAME_TO_ID.get(player), pitch_length, pitch_width, fmt=fmt,
+            source_mtime=source_mtime, workers=1, folder=os.path.join(folder, player_slug(player), "clips")))
+    return paths
+
+
+# === Report ===
+def build_report(players=None, matches=None, folder=REPORT_FOLDER, clips=DEFAULT_CLIPS, role="involved",
+                 padding=DEFAULT_PADDING, fmt="gif", workers=None,
+                 freeze_folder=FREEZE_FOLDER, meta_folder=META_FOLDER):
+    """Summaries for every player plus their clips; returns (summary paths, clip paths)."""
+    players = list_players() if players is None else list(players)
+    meta_index = get_meta_index(meta_folder)
+    selected = select_clips(players, matches, role, clips)
+    tasks = [(player_summary, (p, folder, matches, meta_folder)) for p in players]
+    tasks += [(match_clips, (m, c, folder, padding, fmt, freeze_folder, meta_folder))
+              for m, c in sorted(selected.items()) if m in meta_index]
+
+    summaries, exported = [], []
+    if workers == 1 or len(tasks) <= 1:
+        results = [(fn, fn(*args)) for fn, args in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(fn, *args): fn for fn, args in tasks}
+            results = [(futures[f], f.result()) for f in as_completed(futures)]
+    for fn, paths in results:
+        (summaries if fn is player_summary else exported).extend(paths)
+    return summaries, exported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render player summaries and loss clips to an output folder.")
+    scope = parser.add_mutually_exclusive_group()
+    scope.add_argument("--date", help="matchday (YYYY-MM-DD): only matches played that day")
+    scope.add_argument("--matches", type=int, nargs="+", help="match ids (default: whole season)")
+    parser.add_argument("--players", nargs="+", help="players (default: every player in the table)")
+    parser.add_argument("--out", default=None, help=f"output folder (default: {REPORT_FOLDER}/<date|season>)")
+    parser.add_argument("--clips", type=int, default=DEFAULT_CLIPS, help="clips per player and match (0: none)")
+    parser.add_argument("--role", choices=["near", "involved", "all"], default="involved",
+                        help="which losses to clip")
+    parser.add_argument("--padding", type=int, default=DEFAULT_PADDING, help="frames before/after each loss")
+    parser.add_argument("--format", choices=["gif", "mp4"], default="gif")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per core)")
+    parser.add_argument("--freeze", default=FREEZE_FOLDER)
+    parser.add_argument("--meta", default=META_FOLDER)
+    args = parser.parse_args(argv)
+
+    matches = args.matches
+    if args.date:
+        matches = matches_on(args.date, args.meta)
+        if not matches:
+            parser.error(f"no matches on {args.date}")
+    folder = args.out or os.path.join(REPORT_FOLDER, args.date or ("season" if matches is None else
+                                                                   "_".join(map(str, sorted(matches)))))
+
+    start = time.perf_counter()
+    summaries, clips = build_report(args.players, matches, folder, args.clips,
+                                    None if args.role == "all" else args.role, args.padding, args.format,
+                                    args.workers, args.freeze, args.meta)
+    print(f"{len(summaries)} summary files, {len(clips)} clips -> {folder} ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+# scrub.py
+# Visor de frames en el navegador: la ventana ±N frames alrededor de una pérdida se envía una sola
+# vez como payload compacto (coordenadas int16 en centímetros + tabla de plantel) y la
+# reproducción, el scrubbing y el resaltado del jugador corren en JavaScript, sin reruns. El HTML de
+# cada pérdida se guarda en una caché en memoria para que el prefetch (prefetch.py) lo deje listo.
+
+import base64
+import json
+import os
+import threading
+
+import numpy as np
+
+from .cache import MatchCache
+from .config import BALL_ID, FPS
+from .kinematics import with_velocities
+
+SCALE = 100  # coordenadas en cm: ±327 m caben en int16
+PAYLOAD_VERSION = 1
+ARROW_S = 1.0  # s, las flechas de velocidad marcan dónde estaría el jugador dentro de ARROW_S
+DEFAULT_VIEW_CACHE_MB = int(os.environ.get("COUNTERPRESS_VIEW_CACHE_MB", "32"))
+
+
+def _b64(array, dtype):
+    return base64.b64encode(np.ascontiguousarray(array, dtype=np.dtype(dtype).newbyteorder("<")).tobytes()).decode("ascii")
+
+
+def window_payload(df_window, pitch_length, pitch_width, highlight_id=None, highlight_label=None,
+                   frame_loss=None, title=None):
+    """Compact JSON-ready payload of a window of enriched freeze frames (see FreezeStore).
+
+    Rows are sorted by frame; `counts[i]` rows belong to `frames[i]`, and each row stores the
+    index of its player in `roster` plus x/y in centimetres. Windows with vx / vy columns
+    (kinematics.with_velocities) also carry the velocities, in cm/s.
+    """
+    df_window = df_window.sort_values(["frame", "is_ball"], kind="stable")
+    frames, counts = np.unique(df_window["frame"].to_numpy(), return_counts=True)
+
+    player_ids = np.where(df_window["is_ball"].to_numpy(bool), BALL_ID, df_window["player_id"].to_numpy())
+    roster_ids, slots = np.unique(player_ids, return_inverse=True)
+    first = df_window.drop_duplicates("player_id").set_index("player_id")
+    roster = []
+    for pid in roster_ids:
+        if pid == BALL_ID or pid not in first.index:
+            roster.append({"id": int(pid), "ball": True})
+            continue
+        row = first.loc[pid]
+        number = row.get("jersey_number")
+        roster.append({
+            "id": int(pid),
+            "label": "" if number is None or number != number else str(int(number)),
+            "color": _color(row.get("jersey_color"), "grey"),
+            "number_color": _color(row.get("number_color"), "black"),
+        })
+
+    xy = np.rint(df_window[["x", "y"]].to_numpy(float) * SCALE)
+    xy = np.clip(np.nan_to_num(xy), -32767, 32767)
+    payload = {
+        "version": PAYLOAD_VERSION,
+        "fps": FPS,
+        "scale": SCALE,
+        "pitch": [float(pitch_length), float(pitch_width)],
+        "title": title or "",
+        "frame_loss": None if frame_loss is None else int(frame_loss),
+        "highlight": None if highlight_id is None else int(highlight_id),
+        "highlight_label": highlight_label or "",
+        "roster": roster,
+        "frames": _b64(frames, np.int32),
+        "counts": _b64(counts, np.uint16),
+        "slots": _b64(slots, np.uint16),
+        "xy": _b64(xy, np.int16),
+    }
+    if "vx" in df_window.columns:
+        v = np.rint(df_window[["vx", "vy"]].to_numpy(float) * SCALE)
+        payload["v"] = _b64(np.clip(np.nan_to_num(v), -32767, 32767), np.int16)
+        payload["arrow_s"] = ARROW_S
+    return payload
+
+
+def _color(value, default):
+    return default if value is None or value != value else str(value)
+
+
+def scrub_html(payload, height=560):
+    """Self-contained HTML (canvas + controls) that plays the payload in the browser."""
+    return _TEMPLATE.replace("__HEIGHT__", str(int(height))).replace("__PAYLOAD__", json.dumps(payload))
+
+
+def loss_view(match_frames, frame_loss, padding, pitch_length, pitch_width, player=None, player_id=None,
+              kinematics=None):
+    """Viewer HTML of the window ±padding frames around a loss of `match_frames` (a MatchFrames).
+
+    With `kinematics` (the match's Kinematics) the viewer can draw velocity arrows.
+    """
+    title = f"Match ID: {match_frames.match_id} · loss at frame {frame_loss}"
+    if player:
+        title += f" · {player} highlighted in blue"
+    window = match_frames.get_window(frame_loss - padding, frame_loss + padding)
+    if kinematics is not None:
+        window = with_velocities(window, kinematics)
+    return scrub_html(window_payload(window, pitch_length, pitch_width, player_id, player, frame_loss, title))
+
+
+def cached_loss_view(store, match_id, frame_loss, padding, pitch_length, pitch_width, player=None,
+                     player_id=None, kinematics_store=None, cache=None):
+    """loss_view of a match served by `store` (a FreezeStore), built once per data version."""
+    cache = cache or get_view_cache()
+    key = (match_id, (int(frame_loss), int(padding), player_id, kinematics_store is not None),
+           store.version(match_id))
+    return cache.get_or_load(key, lambda: loss_view(
+        store.load(match_id), int(frame_loss), int(padding), pitch_length, pitch_width, player, player_id,
+        None if kinematics_store is None else kinematics_store.load(match_id)))
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_view_cache():
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = MatchCache(DEFAULT_VIEW_CACHE_MB * 1024 * 1024, sizeof=len)
+        return _shared_cache
+
+
+_TEMPLATE = """
+<div id="scrub" style="font-family: sans-serif; font-size: 13px;">
+  <div id="title" style="text-align:center; font-weight:bold; margin-bottom:4px;"></div>
+  <canvas id="pitch" style="width:100%; height:__HEIGHT__px; display:block;"></canvas>
+  <div style="display:flex; align-items:center; gap:8px; margin-top:6px;">
+    <button id="play" style="width:70px;">▶ Play</button>
+    <input id="slider" type="range" min="0" value="0" step="1" style="flex:1;">
+    <span id="label" style="width:170px; text-align:right;"></span>
+    <select id="speed"><option value="0.5">0.5×</option><option value="1" selected>1×</option><option value="2">2×</option><option value="4">4×</option></select>
+    <label id="arrows_label" style="display:none;"><input id="arrows" type="checkbox" checked> Velocity</label>
+  </div>
+</div>
+<script>
+const P = __PAYLOAD__;
+function decode(b64, Type) {
+  const bin = atob(b64), bytes = new Uint8Array(bin.length);
+  for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+  return new Type(bytes.buffer);
+}
+const frames = decode(P.frames, Int32Array), counts = decode(P.counts, Uint16Array);
+const slots = decode(P.slots, Uint16Array), xy = decode(P.xy, Int16Array);
+const vel = P.v ? decode(P.v, Int16Array) : null;
+const starts = new Uint32Array(frames.length + 1);
+for (let i = 0; i < frames.length; i++) starts[i + 1] = starts[i] + counts[i];
+
+const [L, W] = P.pitch, margin = 4;
+const canvas = document.getElementById("pitch"), ctx = canvas.getContext("2d");
+const slider = document.getElementById("slider"), label = document.getElementById("label");
+const play = document.getElementById("play"), speed = document.getElementById("speed");
+const arrows = document.getElementById("arrows");
+if (vel) document.getElementById("arrows_label").style.display = "";
+arrows.onchange = () => draw();
+document.getElementById("title").textContent = P.title;
+slider.max = Math.max(frames.length - 1, 0);
+let current = Math.max(frames.indexOf(P.frame_loss), 0), playing = false, last = null, acc = 0;
+let sx = 1, ox = 0, oy = 0;
+
+function resize() {
+  const ratio = window.devicePixelRatio || 1, rect = canvas.getBoundingClientRect();
+  canvas.width = rect.width * ratio; canvas.height = rect.height * ratio;
+  sx = Math.min(canvas.width / (L + 2 * margin), canvas.height / (W + 2 * margin));
+  ox = canvas.width / 2; oy = canvas.height / 2;
+  draw();
+}
+// Coordenadas SkillCorner: origen en el centro, y hacia arriba
+const px = x => ox + x * sx, py = y => oy - y * sx;
+
+function drawPitch() {
+  ctx.fillStyle = "white"; ctx.fillRect(0, 0, canvas.width, canvas.height);
+  ctx.strokeStyle = "black"; ctx.lineWidth = Math.max(1, sx * 0.15);
+  const rect = (x0, y0, x1, y1) => ctx.strokeRect(px(x0), py(y1), (x1 - x0) * sx, (y1 - y0) * sx);
+  rect(-L / 2, -W / 2, L / 2, W / 2);
+  ctx.beginPath(); ctx.moveTo(px(0), py(-W / 2)); ctx.lineTo(px(0), py(W / 2)); ctx.stroke();
+  ctx.beginPath(); ctx.arc(px(0), py(0), 9.15 * sx, 0, 2 * Math.PI); ctx.stroke();
+  for (const side of [-1, 1]) {
+    const goal = side * L / 2;
+    rect(Math.min(goal, goal - side * 16.5), -20.16, Math.max(goal, goal - side * 16.5), 20.16);
+    rect(Math.min(goal, goal - side * 5.5), -9.16, Math.max(goal, goal - side * 5.5), 9.16);
+    rect(Math.min(goal, goal + side * 2), -3.66, Math.max(goal, goal + side * 2), 3.66);
+    ctx.beginPath(); ctx.arc(px(goal - side * 11), py(0), sx * 0.3, 0, 2 * Math.PI); ctx.fill();
+  }
+  ctx.beginPath(); ctx.arc(px(0), py(0), sx * 0.3, 0, 2 * Math.PI); ctx.fill();
+}
+
+function draw() {
+  drawPitch();
+  if (!frames.length) return;
+  const r = 1.1 * sx, balls = [];
+  ctx.textAlign = "center"; ctx.textBaseline = "middle";
+  ctx.font = "bold " + Math.round(1.1 * sx) + "px sans-serif";
+  if (vel && arrows.checked) {
+    // Flechas debajo de los jugadores: dónde estaría cada uno dentro de arrow_s segundos
+    ctx.strokeStyle = "#444"; ctx.lineWidth = Math.max(1, sx * 0.12);
+    for (let row = starts[current]; row < starts[current + 1]; row++) {
+      if (P.roster[slots[row]].ball || (!vel[2 * row] && !vel[2 * row + 1])) continue;
+      const x0 = xy[2 * row] / P.scale, y0 = xy[2 * row + 1] / P.scale;
+      const x1 = x0 + vel[2 * row] / P.scale * P.arrow_s, y1 = y0 + vel[2 * row + 1] / P.scale * P.arrow_s;
+      const angle = Math.atan2(py(y1) - py(y0), px(x1) - px(x0)), head = 0.6 * sx;
+      ctx.beginPath(); ctx.moveTo(px(x0), py(y0)); ctx.lineTo(px(x1), py(y1));
+      ctx.lineTo(px(x1) - head * Math.cos(angle - 0.5), py(y1) - head * Math.sin(angle - 0.5));
+      ctx.moveTo(px(x1), py(y1));
+      ctx.lineTo(px(x1) - head * Math.cos(angle + 0.5), py(y1) - head * Math.sin(angle + 0.5));
+      ctx.stroke();
+    }
+  }
+  for (let row = starts[current]; row < starts[current + 1]; row++) {
+    const p = P.roster[slots[row]], x = px(xy[2 * row] / P.scale), y = py(xy[2 * row + 1] / P.scale);
+    if (p.ball) { balls.push([x, y]); continue; }
+    ctx.beginPath(); ctx.arc(x, y, r, 0, 2 * Math.PI);
+    ctx.fillStyle = p.color; ctx.fill(); ctx.lineWidth = Math.max(1, sx * 0.12); ctx.strokeStyle = "black"; ctx.stroke();
+    ctx.fillStyle = p.number_color; ctx.fillText(p.label, x, y);
+    if (p.id === P.highlight) {
+      ctx.beginPath(); ctx.arc(x, y, r * 1.45, 0, 2 * Math.PI);
+      ctx.lineWidth = Math.max(2, sx * 0.25); ctx.strokeStyle = "blue"; ctx.stroke();
+    }
+  }
+  for (const [x, y] of balls) {
+    ctx.beginPath(); ctx.arc(x, y, 0.6 * sx, 0, 2 * Math.PI); ctx.fillStyle = "black"; ctx.fill();
+  }
+  slider.value = current;
+  const offset = P.frame_loss === null ? "" : " (" + (frames[current] - P.frame_loss >= 0 ? "+" : "") + (frames[current] - P.frame_loss) + ")";
+  label.textContent = "Frame " + frames[current] + offset;
+}
+
+function tick(now) {
+  if (!playing) return;
+  if (last !== null) acc += (now - last) * parseFloat(speed.value);
+  last = now;
+  // Los frames guardados son dispersos: se avanza según el número de frame real, no el índice
+  const step = 1000 / P.fps;
+  while (acc >= step && current < frames.length - 1) {
+    const gap = frames[current + 1] - frames[current];
+    if (acc < gap * step) break;
+    acc -= gap * step; current++;
+  }
+  draw();
+  if (current >= frames.length - 1) { setPlaying(false); return; }
+  requestAnimationFrame(tick);
+}
+function setPlaying(on) {
+  playing = on; last = null; acc = 0;
+  play.textContent = on ? "⏸ Pause" : "▶ Play";
+  if (on) { if (current >= frames.length - 1) current = 0; requestAnimationFrame(tick); }
+}
+play.onclick = () => setPlaying(!playing);
+slider.oninput = () => { setPlaying(false); current = parseInt(slider.value); draw(); };
+document.addEventListener("keydown", e => {
+  if (e.key === "ArrowRight") { current = Math.min(current + 1, frames.length - 1); draw(); }
+  else if (e.key === "ArrowLeft") { current = Math.max(current - 1, 0); draw(); }
+  else if (e.key === " ") { e.preventDefault(); setPlaying(!playing); }
+});
+window.addEventListener("resize", resize);
+resize();
+</script>
+"""
@@ -0,0 +1,171 @@
+# shared.py
+# Arrays por partido publicados una sola vez en disco y compartidos por todos los procesos del
+# servidor. Cada entrada es una carpeta de .npy más un source.json con la firma de sus fuentes: el
+# primer proceso que la necesita la construye (con un lock de fichero entre procesos) y todos la
+# abren con mmap de solo lectura, así las páginas del SO se comparten y la memoria no crece con
+# cada worker.
+#
+#   python -m counterpress.shared [--warm] [--prune]
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos, cada uno construye por su cuenta
+    fcntl = None
+
+SOURCE_FILE = "source.json"
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Exclusive lock between processes on `path` (created if needed)."""
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _normalize(signature):
+    return json.loads(json.dumps(signature))
+
+
+class SharedArrays:
+    """A folder of named entries, each a bundle of read-only memory-mapped arrays.
+
+    `open(name, signature, build)` returns (arrays, meta) for the entry, running `build()`
+    (which returns (arrays dict, JSON-able meta)) in a single process when the stored
+    signature differs from `signature`.
+    """
+
+    def __init__(self, folder, mmap_mode="r"):
+        self.folder = folder
+        self.mmap_mode = mmap_mode
+        self.builds = 0
+
+    def path(self, name):
+        return os.path.join(self.folder, str(name))
+
+    def source(self, name):
+        try:
+            with open(os.path.join(self.path(name), SOURCE_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, name, signature):
+        source = self.source(name)
+        return source is not None and source.get("signature") == _normalize(signature)
+
+    def open(self, name, signature, build):
+        if not self.is_fresh(name, signature):
+            os.makedirs(self.folder, exist_ok=True)
+            with file_lock(f"{self.path(name)}.lock"):
+                # Otro proceso pudo haberla construido mientras esperábamos el lock
+                if not self.is_fresh(name, signature):
+                    arrays, meta = build()
+                    self._publish(name, arrays, meta, signature)
+        return self._map(name)
+
+    def _publish(self, name, arrays, meta, signature):
+        path = self.path(name)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        old_path = f"{path}.old.{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for key, array in arrays.items():
+            np.save(os.path.join(tmp_path, f"{key}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(tmp_path, SOURCE_FILE), "w", encoding="utf-8") as f:
+            json.dump({"signature": _normalize(signature), "arrays": list(arrays), "meta": meta}, f)
+        # Los mmap abiertos sobre la versión anterior siguen siendo válidos tras el rename
+        if os.path.exists(path):
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        self.builds += 1
+
+    def _map(self, name):
+        path = self.path(name)
+        for _ in range(10):
+            source = self.source(name)
+            try:
+                # np.asarray: vista ndarray del memmap, sin copia, para que pandas no arrastre la subclase
+                arrays = {key: np.asarray(np.load(os.path.join(path, f"{key}.npy"), mmap_mode=self.mmap_mode))
+                          for key in source["arrays"]}
+            except (OSError, TypeError, ValueError):
+                arrays = None
+            # Si otro proceso republicó la entrada mientras la abríamos, se vuelve a abrir entera
+            if arrays is not None and self.source(name) == source:
+                return arrays, source["meta"]
+            time.sleep(0.01)
+        raise RuntimeError(f"could not open shared entry {path}")
+
+    def invalidate(self, name):
+        path = self.path(name)
+        with file_lock(f"{path}.lock"):
+            if os.path.exists(path):
+                old_path = f"{path}.old.{os.getpid()}"
+                os.rename(path, old_path)
+                shutil.rmtree(old_path, ignore_errors=True)
+
+    def entries(self):
+        if not os.path.isdir(self.folder):
+            return []
+        return sorted(e.name for e in os.scandir(self.folder)
+                      if e.is_dir() and "." not in e.name and os.path.exists(os.path.join(e.path, SOURCE_FILE)))
+
+    def disk_bytes(self):
+        total = 0
+        for name in self.entries():
+            with os.scandir(self.path(name)) as files:
+                total += sum(f.stat().st_size for f in files)
+        return total
+
+
+def main(argv=None):
+    from .freeze import FRAMES_FOLDER, FreezeStore
+    from .kinematics import KINEMATICS_FOLDER, KinematicsStore
+    from .pipeline import list_matches
+    from .trajectories import TRAJECTORY_FOLDER, TrajectoryStore
+
+    parser = argparse.ArgumentParser(description="Build or prune the shared per-match array caches.")
+    parser.add_argument("--warm", action="store_true", help="build every match now so no worker has to")
+    parser.add_argument("--prune", action="store_true", help="drop entries of matches no longer in freeze/")
+    args = parser.parse_args(argv)
+
+    freeze_store, trajectory_store = FreezeStore(), TrajectoryStore()
+    kinematics_store = KinematicsStore(trajectory_store=trajectory_store)
+    stores = [("frames", freeze_store, FRAMES_FOLDER),
+              ("trajectories", trajectory_store, TRAJECTORY_FOLDER),
+              ("kinematics", kinematics_store, KINEMATICS_FOLDER)]
+    start = time.perf_counter()
+    if args.warm:
+        for match_id in list_matches():
+            freeze_store.load(match_id)
+            trajectory_store.load(match_id)
+            kinematics_store.load(match_id)
+    if args.prune:
+        available = {str(m) for m in list_matches()}
+        for _, store, _ in stores:
+            for name in set(store.shared.entries()) - available:
+                store.invalidate(int(name))
+    for label, store, folder in stores:
+        shared = store.shared
+        print(f"{label}: {len(shared.entries())} matches, {shared.disk_bytes() / 1e6:.0f} MB in {folder}"
+              + (f" ({shared.builds} built)" if shared.builds else ""))
+    print(f"({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
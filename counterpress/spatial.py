@@ -0,0 +1,144 @@
+# spatial.py
+# Consultas de proximidad sobre las trayectorias densas de un partido: distancias al balón,
+# k más cercanos por equipo, jugadores dentro de un radio y series de distancia en una ventana.
+# MatchTracking (pipeline.py, y con él sweep.py) saca de aquí el control del balón y las
+# distancias de los jugadores seguidos.
+# Con ~22 jugadores por frame un kernel vectorizado sobre [n_frames, n_slots] es más rápido que
+# construir un KD-tree por frame, y procesa todo el partido de una vez.
+
+import numpy as np
+import pandas as pd
+
+from .config import META_FOLDER, TEAM_ID
+from .meta import get_meta_index
+from .trajectories import TrajectoryStore
+
+TEAM, OPPONENT = "team", "opponent"
+
+
+def ball_distances(xy, ball):
+    """Distance of every slot to the ball of its frame, [n_frames, n_slots] (NaN if either is missing)."""
+    xy = np.asarray(xy, dtype=float)
+    ball = np.asarray(ball, dtype=float)
+    return np.hypot(xy[..., 0] - ball[:, None, 0], xy[..., 1] - ball[:, None, 1])
+
+
+def masked_min(dist, mask):
+    """Per-frame minimum over the slots in `mask`, inf where none of them is on the pitch."""
+    dist = np.where(np.isnan(dist), np.inf, dist)
+    return dist[:, mask].min(axis=1, initial=np.inf)
+
+
+def window_min(values, starts, ends):
+    """min(values[s:e]) for many windows at once, ignoring NaN (NaN for empty windows)."""
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if len(starts) == 0:
+        return np.empty(0)
+    padded = np.append(np.where(np.isnan(values), np.inf, values), np.inf)
+    starts = np.minimum(starts, len(values))
+    ends = np.clip(ends, starts, len(values))
+    bounds = np.empty(2 * len(starts), dtype=np.int64)
+    bounds[0::2], bounds[1::2] = starts, ends
+    out = np.minimum.reduceat(padded, bounds)[0::2]
+    out[ends == starts] = np.inf
+    return np.where(np.isinf(out), np.nan, out)
+
+
+class SpatialQuery:
+    """Distance queries over one match, with the ball distances computed once for all frames.
+
+    `team_ids[s]` is the team of slot `s`; `side` arguments select TEAM (team_id), OPPONENT
+    or everyone (None). `start` / `end` restrict a query to frames in [start, end].
+    """
+
+    def __init__(self, trajectories, team_ids, team_id=TEAM_ID):
+        self.trajectories = trajectories
+        self.team_ids = np.asarray(team_ids)
+        self.team_id = team_id
+        self.own = self.team_ids == team_id
+        self._ball_dist = None
+
+    @classmethod
+    def from_meta(cls, trajectories, meta, team_id=TEAM_ID):
+        """Query over already loaded trajectories, with the teams taken from the match's meta json."""
+        teams = {p["id"]: p["team_id"] for p in meta["players"]}
+        return cls(trajectories, [teams.get(p, -1) for p in trajectories.player_ids], team_id)
+
+    @classmethod
+    def for_match(cls, match_id, store=None, meta_folder=META_FOLDER, team_id=TEAM_ID):
+        trajectories = (store or TrajectoryStore()).load(match_id)
+        players = get_meta_index(meta_folder).players_for(match_id)
+        teams = dict(zip(players["player_id"].to_numpy(), players["team_id"].to_numpy()))
+        team_ids = np.array([teams.get(p, -1) for p in trajectories.player_ids])
+        return cls(trajectories, team_ids, team_id)
+
+    @property
+    def ball_dist(self):
+        if self._ball_dist is None:
+            self._ball_dist = ball_distances(self.trajectories.xy, self.trajectories.ball)
+        return self._ball_dist
+
+    def _rows(self, start, end):
+        frames = self.trajectories.frames
+        lo = 0 if start is None else np.searchsorted(frames, start, side="left")
+        hi = len(frames) if end is None else np.searchsorted(frames, end, side="right")
+        return slice(lo, max(lo, hi))
+
+    def _slots(self, side):
+        if side is None:
+            return np.ones(len(self.team_ids), dtype=bool)
+        if side == TEAM:
+            return self.own
+        if side == OPPONENT:
+            return ~self.own & (self.team_ids != -1)
+        raise ValueError(f"Unknown side: {side}")
+
+    def nearest_to_ball(self, k=1, side=None, start=None, end=None):
+        """The k players closest to the ball per frame.
+
+        Returns (frames [n], player_ids [n, k], distances [n, k]); the distance is NaN where
+        fewer than k players of that side are on the pitch.
+        """
+        rows = self._rows(start, end)
+        slots = np.flatnonzero(self._slots(side))
+        dist = self.ball_dist[rows][:, slots]
+        dist = np.where(np.isnan(dist), np.inf, dist)
+        k = min(k, len(slots))
+        order = np.argsort(dist, axis=1, kind="stable")[:, :k]
+        nearest = np.take_along_axis(dist, order, axis=1)
+        return (np.asarray(self.trajectories.frames[rows]), self.trajectories.player_ids[slots][order],
+                np.where(np.isinf(nearest), np.nan, nearest))
+
+    def within_radius(self, radius, side=None, start=None, end=None, center=None):
+        """All (frame, player_id, distance) with a player within `radius` m of the ball.
+
+        `center` ([n_frames, 2] over the whole match) replaces the ball as the reference point.
+        """
+        rows = self._rows(start, end)
+        if center is None:
+            dist = self.ball_dist[rows]
+        else:
+            dist = ball_distances(self.trajectories.xy[rows], np.asarray(center)[rows])
+        hit = (dist <= radius) & self._slots(side)
+        fi, si = np.nonzero(hit)
+        return pd.DataFrame({
+            "frame": self.trajectories.frames[rows][fi],
+            "player_id": self.trajectories.player_ids[si],
+            "distance": dist[fi, si],
+        })
+
+    def distance_series(self, player_ids=None, start=None, end=None):
+        """Distance to the ball per frame (rows) and player (columns); NaN while off the pitch."""
+        rows = self._rows(start, end)
+        if player_ids is None:
+            slots = np.arange(len(self.trajectories.player_ids))
+        else:
+            slots = [self.trajectories.slot(p) for p in player_ids]
+            slots = np.array([s for s in slots if s is not None], dtype=int)
+        return pd.DataFrame(self.ball_dist[rows][:, slots], columns=self.trajectories.player_ids[slots],
+                            index=pd.Index(self.trajectories.frames[rows], name="frame"))
+
+    def side_min(self, side):
+        """Distance of the closest player of `side` to the ball, for every frame of the match."""
+        return masked_min(self.ball_dist, self._slots(side))
@@ -0,0 +1,88 @@
+# startup.py
+# Mide el arranque en frío de la app: cada página se ejecuta en un intérprete nuevo (como un
+# contenedor recién levantado) y se reporta el import de streamlit, cuándo sale el primer
+# elemento con datos, la primera ejecución completa, una segunda ejecución con cachés calientes
+# y qué librerías pesadas quedaron cargadas.
+#
+#   python -m counterpress.startup [Home.py pages/2_Mbappe_Analysis_Summary.py ...]
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+from .config import BASE_DIR
+
+HEAVY_MODULES = ["matplotlib", "seaborn", "scipy", "mplsoccer", "PIL"]
+# Elementos de cabecera que no cuentan como "contenido" al medir la primera pintura útil
+CHROME_ELEMENTS = ["title", "heading", "markdown", "caption", "empty", "divider", "alert"]
+
+_PROBE = """
+import json, sys, time, warnings
+warnings.filterwarnings("ignore")
+start = time.perf_counter()
+from streamlit.delta_generator import DeltaGenerator
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+
+# Primer elemento con datos (métrica, tabla, gráfico...) de la primera ejecución
+first_content = []
+_enqueue = DeltaGenerator._enqueue
+def _timed_enqueue(self, delta_type, *args, **kwargs):
+    if not first_content and delta_type not in sys.argv[2].split(","):
+        first_content.append(time.perf_counter())
+    return _enqueue(self, delta_type, *args, **kwargs)
+DeltaGenerator._enqueue = _timed_enqueue
+
+at = AppTest.from_file(sys.argv[1], default_timeout=300).run()
+first = time.perf_counter()
+at.run()
+second = time.perf_counter()
+print(json.dumps({
+    "streamlit_import_s": imported - start,
+    "first_content_s": first_content[0] - imported if first_content else None,
+    "first_run_s": first - imported,
+    "warm_run_s": second - first,
+    "exception": at.exception[0].message if at.exception else None,
+    "heavy_modules": [m for m in sys.argv[3:] if m in sys.modules],
+}))
+"""
+
+
+def default_pages(base_dir=BASE_DIR):
+    return ["Home.py"] + sorted(os.path.relpath(p, base_dir) for p in glob.glob(os.path.join(base_dir, "pages", "*.py")))
+
+
+def measure_page(page, base_dir=BASE_DIR):
+    """Cold-start timings of one page, run in a fresh interpreter from the app folder."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [base_dir, os.environ.get("PYTHONPATH")])))
+    args = [os.path.join(base_dir, page), ",".join(CHROME_ELEMENTS)] + HEAVY_MODULES
+    proc = subprocess.run([sys.executable, "-c", _PROBE] + args,
+                          cwd=base_dir, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{page}: {proc.stderr.strip().splitlines()[-1] if proc.stderr else proc.returncode}")
+    return {"page": page, **json.loads(proc.stdout.strip().splitlines()[-1])}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold start and first-page latency of the app.")
+    parser.add_argument("pages", nargs="*", help="pages relative to the app folder (default: all)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = [measure_page(p) for p in args.pages or default_pages()]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'page':<40} {'import st':>9} {'content':>8} {'1st run':>8} {'warm':>7}  heavy modules")
+    for r in results:
+        content = "-" if r["first_content_s"] is None else f"{r['first_content_s']:.2f}s"
+        print(f"{r['page']:<40} {r['streamlit_import_s']:>8.2f}s {content:>8} {r['first_run_s']:>7.2f}s "
+              f"{r['warm_run_s']:>6.2f}s  {', '.join(r['heavy_modules']) or '-'}"
+              + (f"  ERROR: {r['exception']}" if r["exception"] else ""))
+
+
+if __name__ == "__main__":
+    main()
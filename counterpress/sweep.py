@@ -0,0 +1,167 @@
+# sweep.py
+# Sensibilidad de las definiciones de contrapresión: ventana de recuperación, radio "near" y
+# radio de presión. Una sola pasada por las ventanas de pérdida de cada partido guarda lo que no
+# depende de los umbrales (distancia en la pérdida, tiempo de recuperación, primer frame dentro
+# de cada radio de presión); el cubo para toda la rejilla sale después de operaciones vectorizadas.
+
+import numpy as np
+import pandas as pd
+
+from .config import FPS, FREEZE_FOLDER, META_FOLDER, PLAYER_IDS
+from .meta import load_meta
+from .pipeline import MatchTracking, list_matches, on_pitch_losses
+from .trajectories import TrajectoryStore
+
+DEFAULT_WINDOWS = [3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0]   # s
+DEFAULT_NEAR_RADII = [5.0, 10.0, 15.0, 20.0, 25.0]             # m
+DEFAULT_PRESS_RADII = [1.0, 2.0, 3.0, 4.0, 5.0]                # m
+
+GRID = ["recovery_window_s", "near_radius", "press_radius"]
+SWEEP_DIMENSIONS = ["player_tracked"] + GRID + [
+    "player_near_loss", "player_involved_in_counterpress", "recovered_in_window"]
+
+
+def match_loss_windows(match_id, press_radii, max_window_s, store=None, meta_folder=META_FOLDER):
+    """Threshold-independent facts of every (loss, tracked player) of one match.
+
+    `first_within[:, j]` is the first frame after the loss in which the player is within
+    `press_radii[j]` of the ball, looking at most `max_window_s` ahead (inf if never).
+    """
+    tracking = MatchTracking((store or TrajectoryStore()).load(match_id), load_meta(match_id, meta_folder))
+    frames = tracking.frames
+    loss_idx = tracking.losses()
+    recovery = tracking.recoveries(loss_idx)
+    frame_loss = frames[loss_idx]
+
+    # Matriz [pérdidas, frames del horizonte] con los índices de la ventana más larga de la rejilla
+    starts = loss_idx + 1
+    ends = np.searchsorted(frames, frame_loss + max_window_s * FPS, side="right")
+    horizon = int((ends - starts).max(initial=0))
+    idx = starts[:, None] + np.arange(horizon)
+    inside = idx < ends[:, None]
+    idx = np.minimum(idx, len(frames) - 1)
+    radii = np.asarray(press_radii, dtype=float)
+
+    parts = []
+    for player_id, dist in tracking.player_dist.items():
+        # Mismo criterio que el pipeline: solo pérdidas con el jugador en el campo
+        on_pitch = on_pitch_losses(dist, loss_idx)
+        if not on_pitch.any():
+            continue
+        window_dist = np.where(inside[on_pitch], dist[idx[on_pitch]], np.nan)
+        hit = window_dist[:, :, None] <= radii
+        first_within = np.where(hit, frames[idx[on_pitch]][:, :, None], np.inf).min(axis=1, initial=np.inf)
+        parts.append({
+            "player_tracked": np.full(on_pitch.sum(), PLAYER_IDS[player_id], dtype=object),
+            "match_id": np.full(on_pitch.sum(), match_id),
+            "frame_loss": frame_loss[on_pitch],
+            "dist_loss": dist[loss_idx[on_pitch]],
+            "recovery_time": recovery[on_pitch],
+            "first_within": first_within.reshape(-1, len(radii)),
+        })
+    return parts
+
+
+def loss_windows(match_ids=None, press_radii=DEFAULT_PRESS_RADII, max_window_s=max(DEFAULT_WINDOWS),
+                 freeze_folder=FREEZE_FOLDER, meta_folder=META_FOLDER, store=None):
+    """match_loss_windows for many matches, concatenated into one dict of arrays."""
+    if match_ids is None:
+        match_ids = list_matches(freeze_folder, meta_folder)
+    store = store or TrajectoryStore(freeze_folder)
+    parts = [p for m in match_ids for p in match_loss_windows(m, press_radii, max_window_s, store, meta_folder)]
+    keys = ["player_tracked", "match_id", "frame_loss", "dist_loss", "recovery_time", "first_within"]
+    if not parts:
+        return {k: np.empty((0, len(press_radii)) if k == "first_within" else 0) for k in keys}
+    return {k: np.concatenate([p[k] for p in parts]) for k in keys}
+
+
+def build_sweep_cube(records, windows=DEFAULT_WINDOWS, near_radii=DEFAULT_NEAR_RADII,
+                     press_radii=DEFAULT_PRESS_RADII):
+    """Counts over (player, window, near radius, press radius, near, involved, recovered).
+
+    Same measures as the aggregates cube (count, recovery_time_sum, recovery_time_count), so
+    a slice for one definition can be queried with the aggregates functions (see definition()).
+    """
+    windows = np.asarray(windows, dtype=float)
+    near_radii = np.asarray(near_radii, dtype=float)
+    press_radii = np.asarray(press_radii, dtype=float)
+    players, player_code = np.unique(records["player_tracked"].astype(str), return_inverse=True)
+    recovery = records["recovery_time"]
+    W, N, P = len(windows), len(near_radii), len(press_radii)
+
+    # Con NaN (sin recuperación) fmin deja la ventana completa, igual que el pipeline
+    recovered = recovery[:, None] <= windows                                          # [L, W]
+    window_end = records["frame_loss"][:, None] + np.fmin(recovery[:, None], windows) * FPS
+    involved = records["first_within"][:, None, :] <= window_end[:, :, None]           # [L, W, P]
+    near = records["dist_loss"][:, None] <= near_radii                                 # [L, N]
+
+    cell = (((player_code[:, None, None, None] * W + np.arange(W)[:, None, None]) * N
+             + np.arange(N)[:, None]) * P + np.arange(P))                             # [L, W, N, P]
+    code = (cell * 8 + near[:, None, :, None] * 4 + involved[:, :, None, :] * 2
+            + recovered[:, :, None, None])
+    rt = np.broadcast_to(np.where(recovered, recovery[:, None], 0.0)[:, :, None, None], code.shape)
+    rec = np.broadcast_to(recovered[:, :, None, None], code.shape)
+
+    size = len(players) * W * N * P * 8
+    code = code.ravel()
+    count = np.bincount(code, minlength=size)
+    rt_sum = np.bincount(code, weights=rt.ravel(), minlength=size)
+    rt_count = np.bincount(code, weights=rec.ravel(), minlength=size)
+
+    keep = np.flatnonzero(count)
+    p, w, n, r, flags = np.unravel_index(keep, (len(players), W, N, P, 8))
+    return pd.DataFrame({
+        "player_tracked": pd.Categorical(players[p], categories=players),
+        "recovery_window_s": windows[w],
+        "near_radius": near_radii[n],
+        "press_radius": press_radii[r],
+        "player_near_loss": (flags & 4) > 0,
+        "player_involved_in_counterpress": (flags & 2) > 0,
+        "recovered_in_window": (flags & 1) > 0,
+        "count": count[keep],
+        "recovery_time_sum": rt_sum[keep],
+        "recovery_time_count": rt_count[keep].astype(np.int64),
+    })
+
+
+def sweep(windows=DEFAULT_WINDOWS, near_radii=DEFAULT_NEAR_RADII, press_radii=DEFAULT_PRESS_RADII,
+          match_ids=None, freeze_folder=FREEZE_FOLDER, meta_folder=META_FOLDER, store=None):
+    records = loss_windows(match_ids, press_radii, max(windows), freeze_folder, meta_folder, store)
+    return build_sweep_cube(records, windows, near_radii, press_radii)
+
+
+# === Queries ===
+def definition(cube, recovery_window_s, near_radius, press_radius):
+    """The slice of a sweep cube for one definition, shaped like the aggregates cube.
+
+    `recovered_in_window` is renamed to `recovered_in_5s` so kpis(), recovery_rate(), etc.
+    from counterpress.aggregates apply unchanged (the window is whatever was selected).
+    """
+    sel = cube[(cube["recovery_window_s"] == recovery_window_s) & (cube["near_radius"] == near_radius)
+               & (cube["press_radius"] == press_radius)]
+    return sel.drop(columns=GRID).rename(columns={"recovered_in_window": "recovered_in_5s"})
+
+
+def sweep_rates(cube):
+    """Per player and definition: involvement share and recovery rates with / without involvement."""
+    c = cube.assign(
+        near=cube["count"].where(cube["player_near_loss"], 0),
+        involved=cube["count"].where(cube["player_involved_in_counterpress"], 0),
+        recovered=cube["count"].where(cube["recovered_in_window"], 0),
+        rec_with=cube["count"].where(cube["player_involved_in_counterpress"] & cube["recovered_in_window"], 0),
+        rec_without=cube["count"].where(~cube["player_involved_in_counterpress"] & cube["recovered_in_window"], 0),
+    )
+    sums = c.groupby(["player_tracked"] + GRID, observed=True)[
+        ["count", "near", "involved", "recovered", "rec_with", "rec_without",
+         "recovery_time_sum", "recovery_time_count"]].sum()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = pd.DataFrame({
+            "Total_Losses": sums["count"],
+            "Near_Rate": sums["near"] / sums["count"],
+            "Involvement_Rate": sums["involved"] / sums["count"],
+            "Recovery_Rate": sums["recovered"] / sums["count"],
+            "Recovery_With_Participation": sums["rec_with"] / sums["involved"],
+            "Recovery_Without_Participation": sums["rec_without"] / (sums["count"] - sums["involved"]),
+            "Avg_Recovery_Time": sums["recovery_time_sum"] / sums["recovery_time_count"],
+        })
+    return out.replace([np.inf, -np.inf], np.nan)
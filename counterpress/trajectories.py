@@ -0,0 +1,143 @@
+# trajectories.py
+# Representación densa de un partido: posiciones float32 [n_frames, n_slots, 2] con un slot por
+# jugador, la pista del balón y una máscara de validez. Se cachean como .npy en
+# cache/trajectories/<match_id>/ y se abren con mmap, así muchos partidos abiertos a la vez no
+# pagan el coste de un DataFrame en formato largo. La carpeta es una caché compartida (shared.py):
+# un solo proceso construye cada partido y todos los workers mapean los mismos ficheros.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from .cache import get_match_cache
+from .config import BALL_ID, CACHE_FOLDER, FREEZE_FOLDER
+from .freeze import freeze_path, read_frames
+from .shared import SharedArrays
+
+TRAJECTORY_FOLDER = os.path.join(CACHE_FOLDER, "trajectories")
+TRAJECTORY_COLUMNS = ["frame", "period", "player_id", "is_ball", "x", "y"]
+ARRAYS = ["frames", "period", "player_ids", "xy", "valid", "ball", "ball_valid"]
+
+
+class Trajectories:
+    """Dense per-match tracking arrays, indexed by position in `frames`.
+
+    `xy[i, s]` is the position of `player_ids[s]` at `frames[i]` (NaN where `valid` is False);
+    `ball[i]` is the ball position (NaN where `ball_valid` is False).
+    """
+
+    def __init__(self, match_id, frames, period, player_ids, xy, valid, ball, ball_valid):
+        self.match_id = match_id
+        self.frames = frames
+        self.period = period
+        self.player_ids = player_ids
+        self.xy = xy
+        self.valid = valid
+        self.ball = ball
+        self.ball_valid = ball_valid
+
+    @classmethod
+    def from_frames(cls, match_id, df, dtype=np.float32):
+        """Build the dense arrays from long-format freeze rows."""
+        frames, fi = np.unique(df["frame"].to_numpy(), return_inverse=True)
+        n = len(frames)
+        is_ball = df["is_ball"].to_numpy(bool)
+        pos = df[["x", "y"]].to_numpy(dtype)
+
+        period = np.zeros(n, dtype=np.int8)
+        period[fi] = df["period"].to_numpy()
+        ball = np.full((n, 2), np.nan, dtype=dtype)
+        ball[fi[is_ball]] = pos[is_ball]
+        ball_valid = np.zeros(n, dtype=bool)
+        ball_valid[fi[is_ball]] = True
+
+        player_ids, si = np.unique(df["player_id"].to_numpy()[~is_ball], return_inverse=True)
+        xy = np.full((n, len(player_ids), 2), np.nan, dtype=dtype)
+        xy[fi[~is_ball], si] = pos[~is_ball]
+        valid = np.zeros((n, len(player_ids)), dtype=bool)
+        valid[fi[~is_ball], si] = True
+        return cls(match_id, frames, period, player_ids, xy, valid, ball, ball_valid)
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def nbytes(self):
+        return int(sum(getattr(self, name).nbytes for name in ARRAYS))
+
+    def slot(self, player_id):
+        """Slot of a player in `xy`, or None if they never appear in the match."""
+        s = np.searchsorted(self.player_ids, player_id)
+        if s < len(self.player_ids) and self.player_ids[s] == player_id:
+            return int(s)
+        return None
+
+    def frame_index(self, frame):
+        """Position of `frame` in `frames`, or None if that frame is not stored."""
+        i = np.searchsorted(self.frames, frame)
+        if i < len(self.frames) and self.frames[i] == frame:
+            return int(i)
+        return None
+
+    def window(self, start, end):
+        """Frames in [start, end] as array views (no copy)."""
+        lo = np.searchsorted(self.frames, start, side="left")
+        hi = max(lo, np.searchsorted(self.frames, end, side="right"))
+        return Trajectories(self.match_id, self.frames[lo:hi], self.period[lo:hi], self.player_ids,
+                            self.xy[lo:hi], self.valid[lo:hi], self.ball[lo:hi], self.ball_valid[lo:hi])
+
+    def to_frames(self):
+        """Back to long format (frame, period, player_id, is_ball, x, y), ball row first."""
+        fi, si = np.nonzero(self.valid)
+        bi = np.flatnonzero(self.ball_valid)
+        df = pd.DataFrame({
+            "frame": np.concatenate([self.frames[bi], self.frames[fi]]),
+            "period": np.concatenate([self.period[bi], self.period[fi]]).astype(np.int64),
+            "player_id": np.concatenate([np.full(len(bi), BALL_ID), self.player_ids[si]]),
+            "is_ball": np.concatenate([np.ones(len(bi), bool), np.zeros(len(fi), bool)]),
+            "x": np.concatenate([self.ball[bi, 0], self.xy[fi, si, 0]]).astype(float),
+            "y": np.concatenate([self.ball[bi, 1], self.xy[fi, si, 1]]).astype(float),
+        })
+        return df.sort_values("frame", kind="stable").reset_index(drop=True)
+
+
+class TrajectoryStore:
+    """Dense trajectories per match: built once from the freeze file, then memory-mapped.
+
+    The .npy cache of a match is rebuilt when its freeze file changes; the mapped arrays
+    are kept in the shared LRU cache next to the FreezeStore tables.
+    """
+
+    def __init__(self, freeze_folder=FREEZE_FOLDER, folder=TRAJECTORY_FOLDER, cache=None, mmap_mode="r"):
+        self.freeze_folder = freeze_folder
+        self.folder = folder
+        self.cache = cache or get_match_cache()
+        self.mmap_mode = mmap_mode
+        self.shared = SharedArrays(folder, mmap_mode)
+
+    def path(self, match_id):
+        return self.shared.path(match_id)
+
+    def load(self, match_id):
+        source_mtime = os.stat(freeze_path(match_id, self.freeze_folder)).st_mtime_ns
+        key = (match_id, "trajectories", source_mtime)
+        return self.cache.get_or_load(key, lambda: self._open(match_id, source_mtime))
+
+    def get_window(self, match_id, start, end):
+        return self.load(match_id).window(start, end)
+
+    def invalidate(self, match_id):
+        """Drop the match from the shared folder and from this process's cache."""
+        self.shared.invalidate(match_id)
+        self.cache.invalidate(match_id)
+
+    def _open(self, match_id, source_mtime):
+        path = freeze_path(match_id, self.freeze_folder)
+        arrays, _ = self.shared.open(match_id, [os.path.abspath(path), source_mtime],
+                                     lambda: (self._build(match_id, path), {}))
+        return Trajectories(match_id, *(arrays[name] for name in ARRAYS))
+
+    def _build(self, match_id, path):
+        trajectories = Trajectories.from_frames(match_id, read_frames(path, columns=TRAJECTORY_COLUMNS))
+        return {name: getattr(trajectories, name) for name in ARRAYS}
@@ -2,44 +2,41 @@
 
 import streamlit as st
 import pandas as pd
-import json
 import os
-from mplsoccer import Pitch
-import matplotlib.pyplot as plt
-import io
-from PIL import Image
-from unidecode import unidecode
+
+from counterpress.animation import export_animation
+from counterpress.charts import freeze_frame_chart
+from counterpress.config import FREEZE_FOLDER, META_FOLDER, NAME_TO_ID, PLAYER_IDS
+from counterpress.dataset import get_dataset
+from counterpress.freeze import FreezeStore
+from counterpress.jobs import get_job_queue
+from counterpress.kinematics import KinematicsStore, with_velocities
+from counterpress.meta import get_meta_index
+from counterpress.prefetch import get_prefetcher, loss_view_tasks
+from counterpress.scrub import cached_loss_view
 
 st.set_page_config(layout="wide")
 st.title("🔎 Counterpress Analysis Viewer")
 
 # === Configuration ===
-CSV_PATH = os.path.join("csv", "counterpress_analysis_all.csv")
-META_FOLDER = "meta"
-FREEZE_FOLDER = "freeze"
-
-@st.cache_data
-def load_data():
-    return pd.read_csv(CSV_PATH)
+# Rutas absolutas de config: la página funciona se lance streamlit desde donde se lance
+@st.cache_resource
+def get_freeze_store():
+    return FreezeStore(FREEZE_FOLDER)
 
-df_all = load_data()
+@st.cache_resource
+def get_kinematics_store():
+    return KinematicsStore(FREEZE_FOLDER)
 
 # === Sidebar filters ===
-# Diccionario fijo de jugadores
-player_ids = {
-    6028: "Mbappé",
-    12253: "Vinicius Jr",
-    23903: "Rodrygo"
-}
-name_to_id = {v: k for k, v in player_ids.items()}
-
-# Select jugador
-players = sorted(player_ids.values())
+# Select jugador (jugadores seguidos en config)
+players = sorted(PLAYER_IDS.values())
 selected_player = st.sidebar.selectbox("Select player:", players)
-selected_id = name_to_id[selected_player]
+selected_id = NAME_TO_ID[selected_player]
 
 # Filtrar eventos del jugador
-df_player = df_all[df_all["player_tracked"] == selected_player]
+df_player = get_dataset().events([selected_player], columns=[
+    "match_id", "frame_loss", "player_near_loss", "player_involved_in_counterpress", "max_closing_speed"])
 
 # === Acción filtrada primero ===
 filter_mode = st.sidebar.radio("Filter actions", ["All", "Player near", "Player involved"])
@@ -58,22 +55,9 @@ if not available_matches:
     st.warning("No matches available for this player and action filter.")
     st.stop()
 
-# Crear etiquetas legibles con nombres de equipos
-match_labels = {}
-for match_id in available_matches:
-    try:
-        meta_path = os.path.join(META_FOLDER, f"{match_id}.json")
-        with open(meta_path, "r", encoding="utf-8") as f:
-            meta = json.load(f)
-
-        date = meta.get("date_time", "")[:10]
-        home = meta["home_team"]["short_name"]
-        away = meta["away_team"]["short_name"]
-        score = f"{meta['home_team_score']}–{meta['away_team_score']}"
-        label = f"{date} - {home} {score} {away}"
-        match_labels[label] = match_id
-    except Exception as e:
-        match_labels[f"{match_id} (missing meta)"] = match_id  # fallback en caso de error
+# Crear etiquetas legibles con nombres de equipos (índice de metadatos en memoria)
+meta_index = get_meta_index(META_FOLDER)
+match_labels = {meta_index.match_label(match_id): match_id for match_id in available_matches}
 
 # Mostrar selectbox con etiquetas legibles
 selected_label = st.sidebar.selectbox("Select match:", list(match_labels.keys()))
@@ -92,137 +76,130 @@ frame_selected = st.sidebar.selectbox("Select frame_loss to view freeze frame:",
                                       sorted(df_match["frame_loss"].unique().tolist()))
 row_selected = df_match[df_match["frame_loss"] == frame_selected].iloc[0]
 
-# Get correct player ID to highlight
-# Player ID lookup
-player_ids = {
-    6028: "Mbappé",
-    12253: "Vinicius Jr",
-    23903: "Rodrygo"
-}
-name_to_id = {v: k for k, v in player_ids.items()}
-selected_id = name_to_id.get(selected_player)
-
 # === Load meta and freeze frame ===
-meta_path = os.path.join(META_FOLDER, f"{selected_match_id}.json")
-freeze_path = os.path.join(FREEZE_FOLDER, f"{selected_match_id}.parquet")
-df_frames = pd.read_parquet(freeze_path)
-
-with open(meta_path, "r", encoding="utf-8") as f:
-    meta = json.load(f)
-
-pitch_length = meta["pitch_length"]
-pitch_width = meta["pitch_width"]
-
-teams_meta = pd.DataFrame([
-    {**meta["home_team"], "team_id": meta["home_team"]["id"]},
-    {**meta["away_team"], "team_id": meta["away_team"]["id"]},
-])
-kits_meta = pd.DataFrame([
-    {**meta["home_team_kit"], "team_id": meta["home_team"]["id"]},
-    {**meta["away_team_kit"], "team_id": meta["away_team"]["id"]},
-])
-teams_meta = teams_meta.merge(kits_meta, on="team_id")
-
-players_meta = pd.DataFrame(meta["players"])
-players_meta = players_meta.rename(columns={"id": "player_id", "number": "jersey_number"})
-players_meta = players_meta.merge(
-    teams_meta[["team_id", "short_name", "jersey_color", "number_color"]],
-    on="team_id", how="left"
-)
+if selected_match_id not in meta_index:
+    st.warning("No metadata available for this match.")
+    st.stop()
+
+match_frames = get_freeze_store().load(selected_match_id)
+pitch_length, pitch_width = meta_index.pitch_dims(selected_match_id)
 
 # === Summary metrics ===
 col1, col2, col3 = st.columns(3)
 col1.metric("Total actions", len(df_match))
 col2.metric("Player near", df_match["player_near_loss"].sum())
 col3.metric("Player involved", df_match["player_involved_in_counterpress"].sum())
+if pd.notna(row_selected["max_closing_speed"]):
+    st.caption(f"{selected_player}'s top speed towards the ball in the 5 s after this loss: "
+               f"{row_selected['max_closing_speed']:.1f} m/s")
+
+cache_stats = get_freeze_store().cache.stats()
+st.sidebar.caption(
+    f"Frame cache: {cache_stats['entries']} matches, {cache_stats['bytes'] / 1e6:.0f}/"
+    f"{cache_stats['max_bytes'] / 1e6:.0f} MB · hits {cache_stats['hits']} · "
+    f"misses {cache_stats['misses']} · evictions {cache_stats['evictions']}"
+)
 
 # === Dynamic frame viewer ===
 frame_loss = int(row_selected["frame_loss"])
-frame_range = list(range(frame_loss - 10, frame_loss + 11))
-frame_range = [f for f in frame_range if f in df_frames["frame"].unique()]
-
-frame_to_display = st.slider("Select frame", min_value=min(frame_range),
-                             max_value=max(frame_range),
-                             value=frame_loss, step=1)
-
-st.markdown("## 🎮 Frame viewer")
-df_frame = df_frames[df_frames["frame"] == frame_to_display]
-df_frame = df_frame.merge(players_meta, on="player_id", how="left")
-
-pitch = Pitch(pitch_type='skillcorner', pitch_length=pitch_length, pitch_width=pitch_width,
-              pitch_color='white', line_color='black')
-fig, ax = pitch.draw(figsize=(10, 7))
-
-df_ball = df_frame[df_frame["is_ball"] == True]
-ax.scatter(df_ball["x"], df_ball["y"], color="black", s=60, zorder=6)
-
-df_players = df_frame[df_frame["is_ball"] == False]
-ax.scatter(df_players["x"], df_players["y"], s=150,
-           color=df_players["jersey_color"], edgecolors="black", zorder=5)
-
-for _, row in df_players.iterrows():
-    ax.text(row["x"], row["y"], str(int(row["jersey_number"])),
-            color=row["number_color"], fontsize=8, weight="bold",
-            ha="center", va="center", zorder=6)
-
-highlight = df_players[df_players["player_id"] == selected_id]
-if not highlight.empty:
-    ax.scatter(highlight["x"], highlight["y"], s=200,
-               facecolors='none', edgecolors='blue', linewidths=2,
-               label=selected_player, zorder=7)
-
-ax.set_title(f"Freeze Frame {frame_to_display} (Match ID: {selected_match_id})", fontsize=14)
-ax.legend(loc="upper center", bbox_to_anchor=(0.5, -0.05), ncol=3)
-st.pyplot(fig)
-
-from unidecode import unidecode  # agregar esto al inicio del script si no está
-
-# === Export GIF animation ===
+viewer_mode = st.sidebar.radio("Viewer mode", ["Client-side playback", "Server frames"],
+                               help="Client-side playback sends the whole window once and plays it in the "
+                                    "browser; server frames redraw the pitch in Python for every slider step.")
+
+if viewer_mode == "Client-side playback":
+    st.markdown("## 🎮 Frame viewer")
+    # La ventana viaja una vez al navegador: play, scrubbing y resaltado no vuelven al servidor
+    scrub_padding = st.slider("Frames before/after the loss", 10, 150, value=50, step=10)
+    st.iframe(cached_loss_view(get_freeze_store(), selected_match_id, frame_loss, scrub_padding,
+                               pitch_length, pitch_width, selected_player, selected_id,
+                               get_kinematics_store()), height=640)
+else:
+    scrub_padding = None
+    frame_range = match_frames.frames_between(frame_loss - 10, frame_loss + 10).tolist()
+
+    frame_to_display = st.slider("Select frame", min_value=min(frame_range),
+                                 max_value=max(frame_range),
+                                 value=frame_loss, step=1)
+
+    st.markdown("## 🎮 Frame viewer")
+    # Los frames ya vienen con color y dorsal de cada jugador (FreezeStore), sin merge por frame
+    # Con velocidades (kinematics.py) para dibujar hacia dónde corre cada jugador
+    df_frame = with_velocities(match_frames.get_frame(frame_to_display),
+                               get_kinematics_store().load(selected_match_id))
+
+    fig = freeze_frame_chart(df_frame, pitch_length, pitch_width, selected_id, selected_player,
+                             f"Freeze Frame {frame_to_display} (Match ID: {selected_match_id})")
+    st.pyplot(fig)
+
+# === Prefetch ===
+# En segundo plano: vistas de las demás pérdidas del partido y el siguiente partido de la lista.
+# Si la selección cambia, el lote anterior se cancela
+match_position = available_matches.index(selected_match_id)
+next_match = available_matches[match_position + 1] if match_position + 1 < len(available_matches) else None
+next_frame_losses = df_filtered_events.loc[df_filtered_events["match_id"] == next_match, "frame_loss"].unique()
+if scrub_padding is None:
+    # Con frames del servidor cada paso es un get_frame sobre el partido ya cargado: basta con el siguiente
+    prefetch_tasks = loss_view_tasks(get_freeze_store(), meta_index, selected_match_id, [], frame_loss,
+                                     None, next_match=next_match)
+else:
+    prefetch_tasks = loss_view_tasks(get_freeze_store(), meta_index, selected_match_id,
+                                     df_match["frame_loss"].unique(), frame_loss, scrub_padding,
+                                     selected_player, selected_id, next_match, next_frame_losses,
+                                     get_kinematics_store())
+prefetch_key = (selected_player, filter_mode, selected_match_id, frame_loss, scrub_padding)
+prefetch = get_prefetcher().schedule(prefetch_key, prefetch_tasks, st.session_state.get("prefetch"))
+st.session_state["prefetch"] = prefetch
+st.sidebar.caption(f"Prefetch: {prefetch.done}/{prefetch.total} ready"
+                   + (f" · {prefetch.failed} failed" if prefetch.failed else ""))
+
+# === Export animation ===
+# La exportación corre en la cola de trabajos del servidor: la sesión sigue respondiendo
 st.markdown("## 🎮 Generate animation")
 frame_padding = st.slider("How many frames before/after to include?", 10, 150, value=100, step=10)
-frame_range = list(range(frame_loss - frame_padding, frame_loss + frame_padding + 1))
-
-if st.button("🎮 Export GIF animation"):
-    st.info("⏳ Generating animation...")
-    images = []
-    for f in frame_range:
-        df_f = df_frames[(df_frames["frame"] == f)]
-        if df_f.empty:
-            continue
-        df_f = df_f.merge(players_meta, on="player_id", how="left")
-        pitch = Pitch(pitch_type='skillcorner', pitch_length=pitch_length, pitch_width=pitch_width,
-                      pitch_color='white', line_color='black')
-        fig, ax = pitch.draw(figsize=(8, 6))
-        df_ball = df_f[df_f["is_ball"] == True]
-        df_players = df_f[df_f["is_ball"] == False]
-        ax.scatter(df_ball["x"], df_ball["y"], color="black", s=60, zorder=6)
-        ax.scatter(df_players["x"], df_players["y"], s=150,
-                   color=df_players["jersey_color"], edgecolors="black", zorder=5)
-        for _, row in df_players.iterrows():
-            ax.text(row["x"], row["y"], str(int(row["jersey_number"])) if not pd.isna(row["jersey_number"]) else "",
-                    color=row["number_color"], fontsize=8, weight="bold",
-                    ha="center", va="center", zorder=6)
-        highlight = df_players[df_players["player_id"] == selected_id]
-        if not highlight.empty:
-            ax.scatter(highlight["x"], highlight["y"], s=200, facecolors='none',
-                       edgecolors='blue', linewidths=2, label=selected_player, zorder=7)
-        ax.set_title(f"Frame {f}", fontsize=12)
-        buf = io.BytesIO()
-        fig.savefig(buf, format="png", bbox_inches="tight")
-        buf.seek(0)
-        images.append(Image.open(buf))
-        plt.close(fig)
-
-    # Guardar primero el archivo
-    os.makedirs("output", exist_ok=True)
-    clean_player = unidecode(selected_player.lower().replace(" ", "_"))
-    output_filename = f"{clean_player}_sequence_{selected_match_id}_f{frame_loss}.gif"
-    gif_path = os.path.join("output", output_filename)
-    images[0].save(gif_path, save_all=True, append_images=images[1:], duration=150, loop=0)
-
-    # Ahora abrirlo para la descarga
-    with open(gif_path, "rb") as f:
-        st.download_button("📥 Download GIF", f, file_name=output_filename, mime="image/gif")
-
-    st.success(f"✅ Animation exported: {gif_path}")
-    st.image(images, caption=[f"Frame {f}" for f in frame_range[:len(images)]], width=800)
+export_format = st.radio("Format", ["GIF", "MP4"], horizontal=True)
+job_queue = get_job_queue()
+
+def run_export(window, match_id, frame_loss, padding, player, player_id, fmt, source_mtime, job):
+    return export_animation(
+        window, match_id, frame_loss, padding, player, player_id, pitch_length, pitch_width,
+        fmt=fmt, source_mtime=source_mtime,
+        progress=lambda done, total: job.report(done / total, f"Rendering frame {done}/{total}"))
+
+if st.button(f"🎮 Export {export_format} animation"):
+    st.session_state["export_job"] = job_queue.submit(
+        f"{selected_player} {selected_match_id} f{frame_loss}", run_export,
+        match_frames.get_window(frame_loss - frame_padding, frame_loss + frame_padding),
+        selected_match_id, frame_loss, frame_padding, selected_player, selected_id, export_format.lower(),
+        get_freeze_store().source_mtime(selected_match_id))
+
+@st.fragment(run_every=1.0)
+def show_export_job():
+    job = job_queue.get(st.session_state.get("export_job"))
+    if job is None:
+        return
+    if not job.done:
+        busy = len(job_queue.active())
+        st.progress(job.progress, text=f"⏳ {job.message or 'Queued...'} "
+                                       f"({busy} export(s) running or queued, max {job_queue.max_workers} at once)")
+        if st.button("✖ Cancel export"):
+            job_queue.cancel(job.id)
+        return
+    if job.status == "failed":
+        st.error(job.error)
+        return
+    if job.status == "cancelled":
+        st.warning("Export cancelled.")
+        return
+
+    anim_path = job.result
+    is_gif = anim_path.endswith(".gif")
+    with open(anim_path, "rb") as f:
+        st.download_button("📥 Download animation", f, file_name=os.path.basename(anim_path),
+                           mime="image/gif" if is_gif else "video/mp4")
+    st.success(f"✅ Animation exported: {anim_path}")
+    if is_gif:
+        st.image(anim_path, width=800)
+    else:
+        st.video(anim_path)
+
+show_export_job()
@@ -0,0 +1,113 @@
+# 5_Threshold_Sweep.py
+
+import streamlit as st
+import pandas as pd
+
+from counterpress.aggregates import kpis, role_outcomes
+from counterpress.analysis import list_players, table_version
+from counterpress.app import pyplot, seaborn
+from counterpress.config import CSV_PATH
+from counterpress.sweep import (DEFAULT_NEAR_RADII, DEFAULT_PRESS_RADII, definition, sweep,
+                                sweep_rates)
+
+st.set_page_config(layout="centered")
+st.title("🎚️ Threshold Sweep - Counterpress Definitions")
+st.caption("Recovery rates and involvement recomputed from tracking data for a grid of "
+           "recovery windows, 'near' radii and pressure radii.")
+
+@st.cache_data(max_entries=4, show_spinner="Sweeping definitions over the season...")
+def load_sweep(version, windows, near_radii, press_radii):
+    # `version` cambia cuando la ingesta reescribe la tabla (y con ella los datos de tracking)
+    return sweep(list(windows), list(near_radii), list(press_radii))
+
+# === Sidebar: rejilla de umbrales ===
+players = list_players()
+selected_player = st.sidebar.selectbox("Select player:", players)
+
+window_min, window_max = st.sidebar.slider("Recovery window (s)", 1, 15, value=(3, 10))
+windows = tuple(float(w) for w in range(window_min, window_max + 1))
+near_radii = tuple(sorted(st.sidebar.multiselect(
+    "Near radii (m)", [2.5, 5.0, 7.5, 10.0, 15.0, 20.0, 25.0, 30.0], default=DEFAULT_NEAR_RADII)))
+press_radii = tuple(sorted(st.sidebar.multiselect(
+    "Pressure radii (m)", [1.0, 1.5, 2.0, 2.5, 3.0, 4.0, 5.0, 6.0], default=DEFAULT_PRESS_RADII)))
+
+if not near_radii or not press_radii:
+    st.warning("Select at least one near radius and one pressure radius.")
+    st.stop()
+
+cube = load_sweep(table_version(CSV_PATH), windows, near_radii, press_radii)
+player_cube = cube[cube["player_tracked"] == selected_player]
+if player_cube.empty:
+    st.info(f"No ball losses tracked for {selected_player} with this sweep.")
+    st.stop()
+rates = sweep_rates(player_cube).loc[selected_player]
+
+# === Definición seleccionada ===
+st.subheader("🎯 Selected Definition")
+col1, col2, col3 = st.columns(3)
+sel_window = col1.selectbox("Recovery window (s)", windows, index=windows.index(5.0) if 5.0 in windows else 0)
+sel_near = col2.selectbox("Near radius (m)", near_radii, index=near_radii.index(15.0) if 15.0 in near_radii else 0)
+sel_press = col3.selectbox("Pressure radius (m)", press_radii,
+                           index=press_radii.index(3.0) if 3.0 in press_radii else 0)
+
+sel_cube = definition(player_cube, sel_window, sel_near, sel_press)
+kpi = kpis(sel_cube)
+col1, col2, col3, col4 = st.columns(4)
+with col1: st.metric("🔄 Total losses", kpi["total"])
+with col2: st.metric(f"🎯 Near (<{sel_near:g} m)", kpi["near"])
+with col3: st.metric(f"🔁 Involved (<{sel_press:g} m)", kpi["involved"])
+with col4: st.metric(f"✅ Recovered <{sel_window:g}s", kpi["recovered"])
+
+outcomes = role_outcomes(sel_cube)
+st.dataframe(pd.DataFrame.from_dict({
+    "Involved + Recovered": outcomes[("involved", True)],
+    "Involved + Not recovered": outcomes[("involved", False)],
+    "Near + Recovered": outcomes[("near", True)],
+    "Near + Not recovered": outcomes[("near", False)],
+}, orient="index", columns=["Count"]))
+
+# === Tasa de recuperación según la ventana ===
+st.subheader("⏱️ Recovery Rate by Recovery Window")
+
+plt = pyplot()
+sns = seaborn()
+by_window = rates.xs((sel_near, sel_press), level=["near_radius", "press_radius"])
+fig, ax = plt.subplots(figsize=(6, 3))
+ax.plot(by_window.index, by_window["Recovery_With_Participation"], marker="o", color="#4B7BEC",
+        label=f"{selected_player} involved")
+ax.plot(by_window.index, by_window["Recovery_Without_Participation"], marker="o", color="#ec4b7b",
+        label=f"{selected_player} not involved")
+ax.axvline(sel_window, color="grey", linestyle="--", linewidth=1)
+ax.set_xlabel("Recovery window (s)")
+ax.set_ylabel("Recovery Rate")
+ax.set_ylim(0, 1)
+ax.tick_params(labelsize=8)
+ax.legend(fontsize=7, loc="lower right")
+st.pyplot(fig)
+
+# === Involucramiento según radio de presión y ventana ===
+st.subheader("🔁 Involvement Rate by Pressure Radius and Window")
+
+involvement = rates.xs(sel_near, level="near_radius")["Involvement_Rate"].unstack("recovery_window_s")
+fig, ax = plt.subplots(figsize=(6, 3))
+sns.heatmap(involvement, annot=True, fmt=".0%", cmap="Blues", cbar=False, annot_kws={"fontsize": 6}, ax=ax)
+ax.set_xlabel("Recovery window (s)")
+ax.set_ylabel("Pressure radius (m)")
+ax.tick_params(labelsize=7)
+st.pyplot(fig)
+
+# === Cercanía según radio ===
+st.subheader("🎯 Share of Losses with the Player Nearby")
+
+near_share = rates.xs((sel_window, sel_press), level=["recovery_window_s", "press_radius"])["Near_Rate"]
+fig, ax = plt.subplots(figsize=(6, 2.5))
+ax.bar([f"{r:g} m" for r in near_share.index], near_share.values, color="#4B7BEC")
+for i, value in enumerate(near_share.values):
+    ax.text(i, value + 0.02, f"{value:.0%}", ha="center", fontsize=7)
+ax.set_ylim(0, 1)
+ax.set_yticks([])
+ax.tick_params(labelsize=8)
+st.pyplot(fig)
+
+st.subheader("📋 Sweep Table")
+st.dataframe(rates.round(3))
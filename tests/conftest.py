@@ -0,0 +1,59 @@
+# conftest.py
+# Partidos sintéticos: freeze frames y meta json mínimos escritos en carpetas temporales.
+
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from counterpress.config import BALL_ID, TEAM_ID
+
+OPPONENT_ID = 258
+MATCH_ID = 1
+
+
+def frame_rows(frame, period, ball, players, time=None):
+    """Freeze rows of one frame: the ball at `ball` (or none) and {player_id: (x, y)}."""
+    rows = [{"frame": frame, "period": period, "player_id": pid, "is_detected": True, "is_ball": False,
+             "x": float(x), "y": float(y)} for pid, (x, y) in players.items()]
+    if ball is not None:
+        rows.append({"frame": frame, "period": period, "player_id": BALL_ID, "is_detected": True,
+                     "is_ball": True, "x": float(ball[0]), "y": float(ball[1])})
+    if time is not None:
+        for row in rows:
+            row["time"] = time
+    return rows
+
+
+def match_meta(match_id, players, home_score=1, away_score=0, pitch_length=105, pitch_width=68):
+    """Meta json with the team at home; `players` is {player_id: team_id}."""
+    return {
+        "id": match_id,
+        "home_team": {"id": TEAM_ID, "short_name": "Home"},
+        "away_team": {"id": OPPONENT_ID, "short_name": "Away"},
+        "home_team_kit": {"jersey_color": "#ffffff", "number_color": "#000000"},
+        "away_team_kit": {"jersey_color": "#000000", "number_color": "#ffffff"},
+        "home_team_score": home_score,
+        "away_team_score": away_score,
+        "home_team_side": ["left_to_right", "right_to_left"],
+        "pitch_length": pitch_length,
+        "pitch_width": pitch_width,
+        "players": [{"id": pid, "team_id": team, "number": i + 1, "short_name": f"P{pid}"}
+                    for i, (pid, team) in enumerate(players.items())],
+    }
+
+
+@pytest.fixture
+def write_match(tmp_path):
+    """write_match(rows, meta, match_id) -> (freeze_folder, meta_folder) under tmp_path."""
+    freeze_folder, meta_folder = tmp_path / "freeze", tmp_path / "meta"
+    freeze_folder.mkdir(exist_ok=True)
+    meta_folder.mkdir(exist_ok=True)
+
+    def write(rows, meta, match_id=MATCH_ID):
+        pd.DataFrame(rows).to_parquet(freeze_folder / f"{match_id}.parquet", index=False)
+        with open(meta_folder / f"{match_id}.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        return os.fspath(freeze_folder), os.fspath(meta_folder)
+    return write
@@ -0,0 +1,41 @@
+# test_analysis.py
+
+import os
+import threading
+
+import pandas as pd
+
+from counterpress.analysis import list_players, load_analysis, write_table
+
+
+def analysis_rows(n=300):
+    return pd.DataFrame({
+        "match_id": [i % 7 for i in range(n)],
+        "frame_loss": range(n),
+        "player_tracked": ["A" if i % 2 else "B" for i in range(n)],
+        "recovered_in_5s": [i % 3 == 0 for i in range(n)],
+    })
+
+
+def test_readers_wait_for_the_table_while_it_is_swapped(tmp_path, monkeypatch):
+    folder = os.fspath(tmp_path / "analysis")
+    df = analysis_rows()
+    write_table(df, folder)
+    reads, readers = [], []
+    real_rename = os.rename
+
+    def rename(src, dst):
+        real_rename(src, dst)
+        if dst.endswith(".old"):
+            # Entre los dos renames no hay tabla: el lector tiene que esperar a la nueva
+            reader = threading.Thread(target=lambda: reads.append((len(load_analysis(folder=folder)),
+                                                                   list_players(folder))))
+            reader.start()
+            reader.join(0.2)
+            readers.append(reader)
+            assert reads == []
+
+    monkeypatch.setattr(os, "rename", rename)
+    write_table(df, folder)
+    readers[0].join()
+    assert reads == [(len(df), ["A", "B"])]
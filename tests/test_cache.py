@@ -0,0 +1,122 @@
+# test_cache.py
+
+import threading
+import time
+
+from counterpress.cache import MatchCache
+from counterpress.freeze import FreezeStore
+from counterpress.trajectories import TrajectoryStore
+
+from conftest import MATCH_ID, OPPONENT_ID, frame_rows, match_meta
+
+
+def sized_cache(max_bytes):
+    # Valores de prueba: el tamaño es el propio valor
+    return MatchCache(max_bytes=max_bytes, sizeof=lambda value: value)
+
+
+def test_evicts_least_recently_used_first():
+    cache = sized_cache(30)
+    cache.put((1, "t", "a"), 10)
+    cache.put((2, "t", "a"), 10)
+    cache.put((3, "t", "a"), 10)
+    assert cache.get((1, "t", "a")) == 10  # 1 pasa a ser el más reciente
+    cache.put((4, "t", "a"), 10)
+    assert cache.get((2, "t", "a")) is None
+    assert [cache.get((m, "t", "a")) for m in (1, 3, 4)] == [10, 10, 10]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_budget():
+    cache = sized_cache(100)
+    for match_id in range(10):
+        cache.put((match_id, "t", 0), 30)
+        assert cache.current_bytes <= 100
+    assert cache.stats()["entries"] == 3 and cache.current_bytes == 90
+    # Un valor más grande que todo el tope se devuelve pero no se guarda ni vacía la caché
+    assert cache.put((99, "t", 0), 500) == 500
+    assert cache.get((99, "t", 0)) is None
+    assert cache.current_bytes == 90
+
+
+def test_new_version_replaces_the_old_ones():
+    cache = sized_cache(100)
+    cache.put((1, "t", "v1"), 40)
+    cache.put((2, "t", "v1"), 10)
+    cache.put((1, "t", "v2"), 20)
+    assert cache.get((1, "t", "v1")) is None
+    assert cache.get((1, "t", "v2")) == 20
+    assert cache.current_bytes == 30
+    cache.invalidate(1)
+    assert cache.get((1, "t", "v2")) is None and cache.get((2, "t", "v1")) == 10
+    assert cache.current_bytes == 10
+
+
+def test_get_or_load_decodes_once():
+    cache = sized_cache(100)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return 7
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load((1, "t", 0), loader)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [7] * 4 and len(calls) == 1
+    assert cache._loading == {}
+
+
+def test_clear_resets_entries_and_loading():
+    cache = sized_cache(100)
+    cache.put((1, "t", 0), 10)
+    started, release = threading.Event(), threading.Event()
+
+    def loader():
+        started.set()
+        release.wait(5)
+        return 5
+
+    thread = threading.Thread(target=cache.get_or_load, args=((2, "t", 0), loader))
+    thread.start()
+    started.wait(5)
+    cache.clear()
+    assert cache._loading == {} and cache.current_bytes == 0 and cache.get((1, "t", 0)) is None
+    release.set()
+    thread.join()
+
+
+def test_invalidate_drops_what_the_stores_loaded(write_match, tmp_path):
+    rows = [row for frame in range(5) for row in frame_rows(frame, 1, (0, 0), {7: (1, 1), 8: (-1, -1)})]
+    freeze_folder, meta_folder = write_match(rows, match_meta(MATCH_ID, {7: 1, 8: OPPONENT_ID}))
+    write_match(rows, match_meta(2, {7: 1, 8: OPPONENT_ID}), match_id=2)
+    cache = MatchCache()
+    frames = FreezeStore(freeze_folder, cache, meta_folder, shared_folder=None)
+    shared_frames = FreezeStore(freeze_folder, cache, meta_folder, shared_folder=tmp_path / "frames")
+    trajectories = TrajectoryStore(freeze_folder, folder=tmp_path / "trajectories", cache=cache)
+    for store in (frames, shared_frames, trajectories):
+        store.load(MATCH_ID)
+        store.load(2)
+    assert cache.stats()["entries"] == 6
+
+    cache.invalidate(MATCH_ID)
+    assert cache.stats()["entries"] == 3
+    assert all(key[0] == 2 for key in cache._entries)
+
+
+def test_store_invalidate_drops_shared_folder_and_cache(write_match, tmp_path):
+    rows = [row for frame in range(5) for row in frame_rows(frame, 1, (0, 0), {7: (1, 1)})]
+    freeze_folder, _ = write_match(rows, match_meta(MATCH_ID, {7: 1}))
+    cache = MatchCache()
+    store = TrajectoryStore(freeze_folder, folder=tmp_path / "trajectories", cache=cache)
+    store.load(MATCH_ID)
+    assert store.shared.entries() == [str(MATCH_ID)] and cache.stats()["entries"] == 1
+
+    store.invalidate(MATCH_ID)
+    assert store.shared.entries() == [] and cache.stats()["entries"] == 0
+    assert list(store.load(MATCH_ID).frames) == list(range(5))
@@ -0,0 +1,98 @@
+# test_compact.py
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from counterpress.compact import (COLUMNS, FRAME_LEVEL_COLUMNS, convert_match, encode_frames,
+                                  read_compact, write_compact)
+
+from conftest import frame_rows
+
+AREA_FIELDS = ["x_bottom_left", "x_bottom_right", "x_top_left", "x_top_right",
+               "y_bottom_left", "y_bottom_right", "y_top_left", "y_top_right"]
+
+
+def synthetic_frames(n_frames=600, n_players=22, seed=0, decimals=2):
+    """Sparse frames over two periods with players coming and going, like the freeze parquets."""
+    rng = np.random.default_rng(seed)
+    frames = np.sort(rng.choice(np.arange(10, 10 * n_frames), n_frames, replace=False))
+    rows = []
+    for i, frame in enumerate(frames):
+        period = 1 if i < n_frames // 2 else 2
+        on_pitch = rng.random(n_players) > 0.1
+        players = {1000 + p: np.round(rng.uniform([-52.5, -34], [52.5, 34]), decimals)
+                   for p in range(n_players) if on_pitch[p]}
+        ball = np.round(rng.uniform([-52.5, -34], [52.5, 34]), decimals) if i % 7 else None
+        cs = frame * 10
+        time = f"{cs // 360000:02d}:{cs // 6000 % 60:02d}:{cs // 100 % 60:02d}.{cs % 100:02d}"
+        frame_part = frame_rows(int(frame), period, ball, players, time)
+        area = dict(zip(AREA_FIELDS, np.round(rng.uniform(-400, 400, 8), 2).tolist()))
+        if i % 5 == 0:
+            area = dict.fromkeys(AREA_FIELDS)  # sin área visible: todos los campos nulos
+        for row in frame_part:
+            row["is_detected"] = bool(rng.random() > 0.3)
+            row["visible_area"] = area
+        rows += frame_part
+    return pd.DataFrame(rows)
+
+
+def sorted_rows(df):
+    return df.sort_values(["frame", "is_ball", "player_id"], kind="stable").reset_index(drop=True)
+
+
+def assert_same_rows(expected, decoded, columns):
+    for column in columns:
+        assert np.array_equal(expected[column].to_numpy(object), decoded[column].to_numpy(object)), column
+
+
+def test_round_trip_every_column(tmp_path):
+    df = synthetic_frames()
+    parquet_path = os.fspath(tmp_path / "1.parquet")
+    df.to_parquet(parquet_path, index=False)
+
+    convert_match(parquet_path, block_frames=64)
+    decoded = read_compact(os.fspath(tmp_path / "1.cfz"), columns=COLUMNS + FRAME_LEVEL_COLUMNS)
+    assert_same_rows(sorted_rows(pd.read_parquet(parquet_path)), decoded, COLUMNS + FRAME_LEVEL_COLUMNS)
+
+
+def test_window_reads_only_matching_frames(tmp_path):
+    df = sorted_rows(synthetic_frames())
+    path = os.fspath(tmp_path / "1.cfz")
+    write_compact(df, path, block_frames=32)
+    start, end = int(df["frame"].iloc[1000]), int(df["frame"].iloc[3000])
+    window = read_compact(path, start, end, columns=COLUMNS + ["time"])
+    expected = df[(df["frame"] >= start) & (df["frame"] <= end)].reset_index(drop=True)
+    assert_same_rows(expected, window, COLUMNS + ["time"])
+    assert read_compact(path, 10 ** 9, None).empty
+
+
+def test_off_grid_coordinates_are_quantized_and_parquet_kept(tmp_path):
+    df = synthetic_frames(n_frames=100, decimals=4)
+    path = os.fspath(tmp_path / "q.cfz")
+    with open(path, "wb") as f:
+        f.write(encode_frames(df))
+    decoded = read_compact(path)
+    expected = sorted_rows(df)
+    for column in ["x", "y"]:
+        np.testing.assert_allclose(decoded[column], expected[column], rtol=0, atol=0.005 + 1e-9)
+    assert_same_rows(expected, decoded, ["frame", "period", "player_id", "is_detected", "is_ball"])
+
+    parquet_path = os.fspath(tmp_path / "2.parquet")
+    df.to_parquet(parquet_path, index=False)
+    with pytest.raises(ValueError):
+        convert_match(parquet_path, replace=True)
+    assert os.path.exists(parquet_path) and not os.path.exists(tmp_path / "2.cfz")
+
+
+def test_replace_refuses_columns_it_cannot_store(tmp_path):
+    parquet_path = os.fspath(tmp_path / "3.parquet")
+    synthetic_frames(n_frames=50).assign(extra=1).to_parquet(parquet_path, index=False)
+    with pytest.raises(ValueError, match="extra"):
+        convert_match(parquet_path, replace=True)
+    assert os.path.exists(parquet_path)
+
+    convert_match(parquet_path)  # sin --replace se convierte lo que el formato guarda
+    assert os.path.exists(parquet_path) and os.path.exists(tmp_path / "3.cfz")
@@ -0,0 +1,38 @@
+# test_jobs.py
+
+import threading
+
+from counterpress.jobs import CANCELLED, DONE, RUNNING, JobQueue
+
+
+def wait_for(queue, job_id):
+    while not queue.get(job_id).done:
+        threading.Event().wait(0.01)
+    return queue.get(job_id)
+
+
+def test_cancel_queued_and_running_jobs():
+    queue = JobQueue(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+    ran = []
+
+    def blocking(job):
+        started.set()
+        while not release.is_set():
+            job.report(0.5)
+            release.wait(0.01)
+        return "ok"
+
+    running = queue.submit("blocking", blocking)
+    queued = queue.submit("queued", lambda job: ran.append(job.id))
+    started.wait(5)
+    assert queue.get(running).status == RUNNING
+
+    # La encolada no llega a ejecutarse; la que corre se entera en su siguiente report
+    assert queue.cancel(queued) and queue.get(queued).status == CANCELLED
+    assert queue.cancel(running)
+    assert wait_for(queue, running).status == CANCELLED
+    assert not queue.cancel(running)
+    finished = queue.submit("after", lambda job: 42)
+    assert wait_for(queue, finished).status == DONE and queue.get(finished).result == 42
+    assert ran == []
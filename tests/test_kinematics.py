@@ -0,0 +1,107 @@
+# test_kinematics.py
+
+import numpy as np
+import pytest
+
+from counterpress.config import NAME_TO_ID, TEAM_ID
+from counterpress.kinematics import Kinematics, closing_speeds, derivative
+from counterpress.pipeline import analyze_match
+from counterpress.trajectories import Trajectories
+
+from conftest import MATCH_ID, OPPONENT_ID, frame_rows, match_meta
+
+# Huecos desiguales (0.1 s a 1.8 s), una muestra aislada y un cambio de parte entre frames seguidos
+FRAMES = np.array([0, 1, 2, 3, 4, 7, 12, 30, 31, 32, 33, 34, 60, 80, 81, 82, 83, 84, 85, 86, 87, 88])
+PERIOD = np.where(FRAMES < 85, 1, 2)
+
+
+def runner_x(frames, period):
+    # 5 m/s en la primera parte; en la segunda vuelve desde otro sitio a -5 m/s
+    return np.where(period == 1, 0.5 * frames, 100 - 0.5 * frames)
+
+
+def synthetic_trajectories():
+    n = len(FRAMES)
+    xy = np.zeros((n, 2, 2))
+    xy[:, 0, 0] = runner_x(FRAMES, PERIOD)
+    xy[:, 1] = [10.0, 5.0]  # quieto, pero sin tracking en algunos frames
+    valid = np.ones((n, 2), dtype=bool)
+    valid[[1, 2, 3], 1] = False
+    xy[~valid] = np.nan
+    ball = np.tile([200.0, 0.0], (n, 1))
+    return Trajectories(MATCH_ID, FRAMES, PERIOD, np.array([1, 2]), xy, valid, ball, np.ones(n, dtype=bool))
+
+
+def test_derivative_uses_real_time_between_samples():
+    trajectories = synthetic_trajectories()
+    velocity, defined = derivative(trajectories.xy, trajectories.valid, FRAMES, PERIOD)
+
+    isolated = list(FRAMES).index(60)  # vecinas a 1.8 s y 2 s: sin derivada
+    expected = np.where(PERIOD == 1, 5.0, -5.0)
+    expected[isolated] = np.nan
+    np.testing.assert_allclose(velocity[:, 0, 0], expected)
+    np.testing.assert_allclose(velocity[defined[:, 0], 0, 1], 0.0)
+    assert not defined[isolated, 0]
+
+    # 12 solo tiene la vecina anterior a tiempo (0.5 s) y 30 solo la siguiente
+    assert defined[list(FRAMES).index(12), 0] and defined[list(FRAMES).index(30), 0]
+    # El jugador parado: sin velocidad donde no hay tracking, cero donde sí
+    assert not defined[[1, 2, 3], 1].any()
+    np.testing.assert_allclose(velocity[defined[:, 1], 1], 0.0)
+
+
+def test_from_trajectories():
+    kinematics = Kinematics.from_trajectories(synthetic_trajectories(), dtype=np.float64)
+    defined = ~np.isnan(kinematics.velocity[:, 0, 0])
+    np.testing.assert_allclose(kinematics.speed[defined, 0], 5.0)
+    # Aceleración nula dentro de cada parte: el salto entre partes no se deriva
+    accel = kinematics.acceleration[:, 0, 0]
+    np.testing.assert_allclose(accel[~np.isnan(accel)], 0.0, atol=1e-9)
+    np.testing.assert_allclose(kinematics.ball_velocity[defined], 0.0)
+    assert np.isnan(kinematics.ball_velocity[~defined]).all()
+    tracked = synthetic_trajectories().valid[:, 1]
+    np.testing.assert_allclose(kinematics.ball_dist[tracked, 1], np.hypot(190.0, 5.0))
+    assert np.isnan(kinematics.ball_dist[~tracked, 1]).all()
+    # El balón está por delante en x: la primera parte se acerca y la segunda se aleja
+    closing = kinematics.closing_speed[:, 0]
+    np.testing.assert_allclose(closing[defined & (PERIOD == 1)], 5.0)
+    np.testing.assert_allclose(closing[defined & (PERIOD == 2)], -5.0)
+
+
+def test_closing_speeds_is_the_velocity_towards_the_ball():
+    xy = np.array([[[0.0, 0.0], [0.0, 0.0], [0.0, 0.0]]])
+    velocity = np.array([[[3.0, 4.0], [0.0, 2.0], [-1.0, 0.0]]])
+    ball = np.array([[10.0, 0.0]])
+    np.testing.assert_allclose(closing_speeds(xy, ball, velocity), [[3.0, 0.0, -1.0]])
+
+
+def mbappe_y(frame):
+    if frame <= 10:
+        return 40.0
+    if frame <= 20:
+        return 40 - 0.8 * (frame - 10)   # 8 m/s durante la presión
+    if frame <= 35:
+        return 32.0
+    if frame <= 45:
+        return 32 - 1.2 * (frame - 35)   # 12 m/s tras recuperar, dentro de los 5 s
+    if frame <= 70:
+        return 20.0
+    if frame <= 78:
+        return 20 - 2.0 * (frame - 70)   # 20 m/s, ya fuera de los 5 s
+    return 4.0
+
+
+def test_max_closing_speed_covers_the_full_5s(write_match):
+    mbappe, mate, opponent = NAME_TO_ID["Mbappé"], 100, 200
+    rows = []
+    for frame in range(0, 120):
+        holder = opponent if 10 <= frame < 30 else mate  # pérdida en 10, recuperación en 30
+        players = {mate: (0, -20), opponent: (-20, 0), mbappe: (0, mbappe_y(frame))}
+        players[holder] = (0, 0.5) if holder == mate else (0, -0.5)
+        rows += frame_rows(frame, 1, (0, 0), players)
+    meta = match_meta(MATCH_ID, {mbappe: TEAM_ID, mate: TEAM_ID, opponent: OPPONENT_ID})
+
+    df = analyze_match(MATCH_ID, *write_match(rows, meta))
+    assert list(df["frame_loss"]) == [10]
+    assert df["recovery_time"].iloc[0] == pytest.approx(2.0)
+    assert df["max_closing_speed"].iloc[0] == pytest.approx(12.0)
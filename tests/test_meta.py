@@ -0,0 +1,33 @@
+# test_meta.py
+
+import json
+import os
+from functools import partial
+
+from counterpress import meta
+from counterpress.meta import get_meta_index, load_meta_index
+
+from conftest import MATCH_ID, OPPONENT_ID, match_meta
+
+
+def test_index_rebuilds_when_a_json_changes(write_match, tmp_path):
+    _, meta_folder = write_match([{"frame": 0}], match_meta(MATCH_ID, {7: 1}))
+    index_folder = os.fspath(tmp_path / "index")
+    assert list(load_meta_index(meta_folder, index_folder).players_for(MATCH_ID)["player_id"]) == [7]
+
+    write_match([{"frame": 0}], match_meta(2, {8: OPPONENT_ID}), match_id=2)
+    assert 2 in load_meta_index(meta_folder, index_folder)
+    assert sorted(os.listdir(index_folder)) == ["matches.parquet", "players.parquet", "signature.json"]
+    with open(os.path.join(index_folder, "signature.json"), encoding="utf-8") as f:
+        assert sorted(json.load(f)["files"]) == ["1", "2"]
+
+
+def test_shared_index_checks_the_folder_at_most_every_interval(write_match, monkeypatch, tmp_path):
+    monkeypatch.setattr(meta, "load_meta_index", partial(load_meta_index, index_folder=os.fspath(tmp_path / "index")))
+    monkeypatch.setattr(meta, "CHECK_INTERVAL_S", 3600)
+    _, meta_folder = write_match([{"frame": 0}], match_meta(MATCH_ID, {7: 1}))
+    assert MATCH_ID in get_meta_index(meta_folder, refresh=True)
+
+    write_match([{"frame": 0}], match_meta(2, {8: OPPONENT_ID}), match_id=2)
+    assert 2 not in get_meta_index(meta_folder)
+    assert 2 in get_meta_index(meta_folder, refresh=True)
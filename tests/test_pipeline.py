@@ -0,0 +1,143 @@
+# test_pipeline.py
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from counterpress.config import NAME_TO_ID, TEAM_ID
+from counterpress.pipeline import (ANALYSIS_COLUMNS, analyze_match, build_analysis, classify_zones,
+                                   on_pitch_losses, partial_is_fresh, partial_path, process_match,
+                                   write_analysis)
+
+from conftest import MATCH_ID, OPPONENT_ID, frame_rows, match_meta
+
+MBAPPE = NAME_TO_ID["Mbappé"]
+MATE, OPPONENT = 100, 200
+
+# Quién controla el balón (fijo en el centro) en cada tramo: (primer frame, último + 1, parte, poseedor)
+SEGMENTS = [
+    (0, 10, 1, MATE),
+    (10, 40, 1, OPPONENT),    # pérdida en 10, recuperada a los 3 s
+    (40, 100, 1, MATE),
+    (100, 200, 1, OPPONENT),  # pérdida en 100, recuperada a los 10 s: fuera de la ventana
+    (200, 300, 1, MATE),
+    (300, 320, 1, OPPONENT),  # pérdida en 300, recuperada a los 2 s
+    (320, 400, 1, MATE),
+    # frames 400-449 sin tracking: más de MAX_LOSS_GAP_S entre el control propio y el rival
+    (450, 500, 1, OPPONENT),
+    (500, 600, 1, MATE),
+    (600, 700, 2, OPPONENT),  # cambio de parte: no es pérdida
+    (700, 750, 2, MATE),
+    (750, 760, 2, OPPONENT),  # pérdida en 750, sin recuperación
+]
+
+
+def mbappe_position(frame):
+    if frame < 10:
+        return 0, 12
+    if frame <= 15:
+        return 0, 12 - 2 * (frame - 10)  # corre hacia el balón a 20 m/s y llega a 2 m
+    if frame < 40:
+        return 0, 2
+    if frame == 300:
+        return 0, 1                       # cerca solo en el frame de la pérdida
+    if 321 <= frame < 400:
+        return 0, 1                       # llega tras la recuperación, fuera de la ventana
+    return 0, 40
+
+
+def synthetic_match():
+    rows = []
+    for first, last, period, holder in SEGMENTS:
+        for frame in range(first, last):
+            players = {MATE: (0, 20), OPPONENT: (0, -20), MBAPPE: mbappe_position(frame)}
+            players[holder] = (0, 0.5)
+            rows += frame_rows(frame, period, (0, 0), players)
+    meta = match_meta(MATCH_ID, {MBAPPE: TEAM_ID, MATE: TEAM_ID, OPPONENT: OPPONENT_ID})
+    return rows, meta
+
+
+@pytest.fixture
+def match(write_match):
+    return write_match(*synthetic_match())
+
+
+def test_losses_and_recoveries(match):
+    df = analyze_match(MATCH_ID, *match).set_index("frame_loss")
+    assert list(df.index) == [10, 100, 300, 750]
+    assert (df["player_tracked"] == "Mbappé").all()
+    assert list(df["recovered_in_5s"]) == [True, False, True, False]
+    np.testing.assert_allclose(df["recovery_time"], [3.0, np.nan, 2.0, np.nan])
+    assert list(df["player_near_loss"]) == [True, False, True, False]
+    assert (df["game_state"] == "winning").all()
+    assert (df["third_start"] == "middle_third").all() and (df["channel_start"] == "center").all()
+
+
+def test_counterpress_window_boundaries(match):
+    df = analyze_match(MATCH_ID, *match).set_index("frame_loss")
+    # 10: llega a 2 m antes de la recuperación. 300: solo cerca en el frame de la pérdida y
+    # después de recuperar, ninguno de los dos cuenta
+    assert list(df["player_involved_in_counterpress"]) == [True, False, False, False]
+    assert df.loc[10, "max_closing_speed"] == pytest.approx(20.0)
+
+
+def test_losses_only_while_player_on_pitch(write_match):
+    rows, meta = synthetic_match()
+    rows = [r for r in rows if r["player_id"] != MBAPPE or r["frame"] < 200]
+    df = analyze_match(MATCH_ID, *write_match(rows, meta))
+    assert list(df["frame_loss"]) == [10, 100]
+
+
+def test_player_never_near_a_tracked_ball_has_no_losses(write_match):
+    # Mbappé solo aparece en frames sin balón: su distancia es NaN en todo el partido
+    rows, meta = synthetic_match()
+    rows = [r for r in rows if not (r["player_id"] == MBAPPE and r["frame"] >= 5)
+            and not (r["is_ball"] and r["frame"] < 5)]
+    assert analyze_match(MATCH_ID, *write_match(rows, meta)).empty
+    assert not on_pitch_losses(np.full(5, np.nan), np.array([1, 3])).any()
+
+
+def test_classify_zones_follows_attack_direction():
+    third, channel = classify_zones(np.array([40.0, 40.0]), np.array([25.0, 25.0]),
+                                    np.array([True, False]), 105)
+    assert list(third) == ["attacking_third", "defensive_third"]
+    assert list(channel) == ["wide_left", "wide_right"]
+
+
+def test_partial_freshness(match, tmp_path):
+    freeze_folder, meta_folder = match
+    partials = os.fspath(tmp_path / "partials")
+    os.makedirs(partials)
+    assert not partial_is_fresh(MATCH_ID, freeze_folder, meta_folder, partials)
+
+    process_match(MATCH_ID, freeze_folder, meta_folder, partials)
+    path = partial_path(MATCH_ID, partials)
+    assert partial_is_fresh(MATCH_ID, freeze_folder, meta_folder, partials)
+    assert build_analysis([MATCH_ID], freeze_folder, meta_folder, partials, workers=1)[1] == []
+
+    # Un json más reciente que el parcial lo deja viejo
+    meta_file = os.path.join(meta_folder, f"{MATCH_ID}.json")
+    later = os.path.getmtime(path) + 10
+    os.utime(meta_file, (later, later))
+    assert not partial_is_fresh(MATCH_ID, freeze_folder, meta_folder, partials)
+
+    # Y también un parcial escrito antes de añadir una columna
+    process_match(MATCH_ID, freeze_folder, meta_folder, partials)
+    pd.read_parquet(path).drop(columns="max_closing_speed").to_parquet(path, index=False)
+    os.utime(path, (later + 10, later + 10))
+    assert not partial_is_fresh(MATCH_ID, freeze_folder, meta_folder, partials)
+    assert build_analysis([MATCH_ID], freeze_folder, meta_folder, partials, workers=1)[1] == [MATCH_ID]
+    assert "max_closing_speed" in pq.read_schema(path).names
+
+
+def test_csv_schema(match, tmp_path):
+    df = analyze_match(MATCH_ID, *match)
+    out_path = os.fspath(tmp_path / "out" / "analysis.csv")
+    write_analysis(df, out_path)
+    written = pd.read_csv(out_path)
+    assert list(written.columns) == ANALYSIS_COLUMNS
+    assert len(written) == len(df)
+    assert set(os.listdir(os.path.dirname(out_path))) >= {"analysis.csv", "analysis", "aggregates"}
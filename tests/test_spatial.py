@@ -0,0 +1,83 @@
+# test_spatial.py
+
+import numpy as np
+
+from counterpress.spatial import OPPONENT, TEAM, SpatialQuery, window_min
+from counterpress.trajectories import Trajectories
+
+TEAM_ID, OPPONENT_ID = 1, 2
+
+
+def synthetic_query(n_frames=40, n_players=10, seed=0):
+    """Random positions; some players missing in some frames and a few frames without ball."""
+    rng = np.random.default_rng(seed)
+    frames = np.cumsum(rng.integers(1, 4, n_frames))
+    xy = rng.uniform([-52.5, -34], [52.5, 34], (n_frames, n_players, 2))
+    valid = rng.random((n_frames, n_players)) > 0.2
+    xy[~valid] = np.nan
+    ball = rng.uniform([-20, -10], [20, 10], (n_frames, 2))
+    ball_valid = np.arange(n_frames) % 9 != 0
+    ball[~ball_valid] = np.nan
+    player_ids = np.arange(100, 100 + n_players)
+    team_ids = np.where(np.arange(n_players) < n_players // 2, TEAM_ID, OPPONENT_ID)
+    trajectories = Trajectories(1, frames, np.ones(n_frames, dtype=np.int64), player_ids, xy, valid,
+                                ball, ball_valid)
+    return SpatialQuery(trajectories, team_ids, TEAM_ID)
+
+
+def brute_force_distances(query):
+    t = query.trajectories
+    return {(int(t.frames[i]), int(t.player_ids[s])): float(np.hypot(*(t.xy[i, s] - t.ball[i])))
+            for i in range(len(t.frames)) for s in range(len(t.player_ids))
+            if t.valid[i, s] and t.ball_valid[i]}
+
+
+def test_nearest_to_ball_matches_brute_force():
+    query = synthetic_query()
+    distances = brute_force_distances(query)
+    t = query.trajectories
+    for side, team in [(None, None), (TEAM, TEAM_ID), (OPPONENT, OPPONENT_ID)]:
+        frames, ids, dist = query.nearest_to_ball(k=3, side=side)
+        for i, frame in enumerate(frames):
+            candidates = sorted((d, p) for (f, p), d in distances.items()
+                                if f == frame and (team is None or query.team_ids[p - 100] == team))
+            expected = [d for d, _ in candidates[:3]]
+            got = dist[i][~np.isnan(dist[i])]
+            np.testing.assert_allclose(got, expected)
+            assert list(ids[i][:len(expected)]) == [p for _, p in candidates[:3]]
+        assert np.array_equal(frames, t.frames)
+
+
+def test_within_radius_matches_brute_force():
+    query = synthetic_query()
+    distances = brute_force_distances(query)
+    start, end = int(query.trajectories.frames[5]), int(query.trajectories.frames[30])
+    for side, team in [(None, None), (TEAM, TEAM_ID)]:
+        hits = query.within_radius(25.0, side=side, start=start, end=end)
+        expected = {(f, p): d for (f, p), d in distances.items()
+                    if d <= 25.0 and start <= f <= end and (team is None or query.team_ids[p - 100] == team)}
+        got = {(int(f), int(p)): d for f, p, d in hits.itertuples(index=False)}
+        assert got.keys() == expected.keys()
+        np.testing.assert_allclose([got[k] for k in expected], list(expected.values()))
+
+
+def test_distance_series_and_side_min():
+    query = synthetic_query()
+    distances = brute_force_distances(query)
+    series = query.distance_series([101, 107, 999])  # 999 no juega: se ignora
+    assert list(series.columns) == [101, 107]
+    for frame, row in series.iterrows():
+        for player_id in (101, 107):
+            expected = distances.get((frame, player_id), np.nan)
+            np.testing.assert_allclose(row[player_id], expected)
+
+    own_min = query.side_min(TEAM)
+    for i, frame in enumerate(query.trajectories.frames):
+        own = [d for (f, p), d in distances.items() if f == frame and query.team_ids[p - 100] == TEAM_ID]
+        assert own_min[i] == (min(own) if own else np.inf)
+
+
+def test_window_min_ignores_nan_and_empty_windows():
+    values = np.array([5.0, np.nan, 3.0, 4.0, np.nan])
+    np.testing.assert_allclose(window_min(values, [0, 1, 3, 4, 2], [2, 3, 5, 5, 2]),
+                               [5.0, 3.0, 4.0, np.nan, np.nan])